@@ -0,0 +1,19 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import LoginRequiredMixin
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """
+    LoginRequiredMixin for views whose handlers are ``async def``
+    
+    ``request.user`` is loaded lazily from the session, which is a sync
+    database call, so it is resolved in a worker thread before the handler
+    runs. Handlers can then read ``request.user`` freely.
+    """
+    
+    async def dispatch(self, request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return self.handle_no_permission()
+        # Skip LoginRequiredMixin.dispatch, which would check synchronously again
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
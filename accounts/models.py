@@ -1,3 +1,5 @@
+import secrets
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import RegexValidator
@@ -37,6 +39,15 @@ class User(AbstractUser):
         help_text="Email verification status"
     )
     
+    calendar_token = models.CharField(
+        max_length=64,
+        unique=True,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Secret token for the read-only ICS calendar feed"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -63,6 +74,18 @@ class User(AbstractUser):
     def get_role_display(self):
         return dict(self.ROLE_CHOICES)[self.role]
     
+    def get_calendar_token(self):
+        """Return the ICS feed token, creating one on first use"""
+        if not self.calendar_token:
+            self.rotate_calendar_token()
+        return self.calendar_token
+    
+    def rotate_calendar_token(self):
+        """Issue a new ICS feed token, invalidating any previously shared feed URL"""
+        self.calendar_token = secrets.token_urlsafe(32)
+        self.save(update_fields=['calendar_token'])
+        return self.calendar_token
+    
     def get_full_name(self):
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name}"
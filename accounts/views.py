@@ -5,11 +5,12 @@ from django.contrib.auth.views import LoginView as BaseLoginView
 from django.views.generic import TemplateView, FormView
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Count, Q
-from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
+from .mixins import AsyncLoginRequiredMixin
 from .models import User
 from schedules.models import Schedule
 from clients.models import Client
+from reports import figures
 
 
 class LoginView(BaseLoginView):
@@ -52,128 +53,81 @@ class RegisterView(FormView):
         return super().form_valid(form)
 
 
-class DashboardView(LoginRequiredMixin, TemplateView):
-    """Main dashboard view with role-based content"""
+class DashboardView(AsyncLoginRequiredMixin, TemplateView):
+    """Main dashboard view with role-based content (async)"""
     template_name = 'accounts/dashboard.html'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        user = self.request.user
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
+        user = request.user
         
         # Get current month data
-        now = datetime.now()
-        month_start = now.replace(day=1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        month_start, month_end = figures.current_month()
         
         if user.is_employee:
-            context.update(self.get_employee_dashboard_data(user, month_start, month_end))
+            context.update(await self.get_employee_dashboard_data(user, month_start, month_end))
         elif user.is_supervisor:
-            context.update(self.get_supervisor_dashboard_data(user, month_start, month_end))
+            context.update(await self.get_supervisor_dashboard_data(user, month_start, month_end))
         elif user.is_client:
-            context.update(self.get_client_dashboard_data(user, month_start, month_end))
+            context.update(await self.get_client_dashboard_data(user, month_start, month_end))
         
-        return context
+        return self.render_to_response(context)
     
-    def get_employee_dashboard_data(self, user, month_start, month_end):
+    async def get_employee_dashboard_data(self, user, month_start, month_end):
         """Get dashboard data for employees"""
         schedules = Schedule.objects.filter(
             employee=user,
             start_date__gte=month_start,
             start_date__lte=month_end
-        ).select_related('client')
-        
-        # Statistics
-        total_schedules = schedules.count()
-        approved_schedules = schedules.filter(status='approved').count()
-        pending_schedules = schedules.filter(status='submitted').count()
-        rejected_schedules = schedules.filter(status='rejected').count()
-        
-        # Recent schedules
-        recent_schedules = schedules.order_by('-created_at')[:5]
+        )
         
-        # Hours by client
-        hours_by_client = {}
-        for schedule in schedules.filter(status='approved'):
-            client_name = schedule.client.name
-            if client_name not in hours_by_client:
-                hours_by_client[client_name] = 0
-            hours_by_client[client_name] += schedule.duration_hours
+        # Statistics and hours by client are cached figures
+        data = await sync_to_async(figures.cached)('dashboard', ('employee', user.pk), month_start, month_end)
+        recent_schedules = await sync_to_async(list)(schedules.select_related('client').order_by('-created_at')[:5])
         
         return {
-            'total_schedules': total_schedules,
-            'approved_schedules': approved_schedules,
-            'pending_schedules': pending_schedules,
-            'rejected_schedules': rejected_schedules,
+            **data,
             'recent_schedules': recent_schedules,
-            'hours_by_client': hours_by_client,
             'dashboard_type': 'employee',
         }
     
-    def get_supervisor_dashboard_data(self, user, month_start, month_end):
+    async def get_supervisor_dashboard_data(self, user, month_start, month_end):
         """Get dashboard data for supervisors"""
         # All schedules in the system
         all_schedules = Schedule.objects.filter(
             start_date__gte=month_start,
             start_date__lte=month_end
-        ).select_related('employee', 'client')
+        )
         
-        # Statistics
-        total_schedules = all_schedules.count()
-        pending_approvals = all_schedules.filter(status='submitted').count()
-        approved_schedules = all_schedules.filter(status='approved').count()
-        rejected_schedules = all_schedules.filter(status='rejected').count()
-        
-        # Recent submissions
-        recent_submissions = all_schedules.filter(status='submitted').order_by('-submitted_at')[:5]
-        
-        # Employee performance
-        employee_stats = all_schedules.values('employee__first_name', 'employee__last_name').annotate(
-            total_schedules=Count('id'),
-            approved_schedules=Count('id', filter=Q(status='approved')),
-            pending_schedules=Count('id', filter=Q(status='submitted')),
-        ).order_by('-total_schedules')[:5]
+        # Statistics and employee performance are cached figures
+        data = await sync_to_async(figures.cached)('dashboard', ('all',), month_start, month_end)
+        recent_submissions = await sync_to_async(list)(
+            all_schedules.filter(status='submitted').select_related('employee', 'client').order_by('-submitted_at')[:5]
+        )
         
         return {
-            'total_schedules': total_schedules,
-            'pending_approvals': pending_approvals,
-            'approved_schedules': approved_schedules,
-            'rejected_schedules': rejected_schedules,
+            **data,
             'recent_submissions': recent_submissions,
-            'employee_stats': employee_stats,
             'dashboard_type': 'supervisor',
         }
     
-    def get_client_dashboard_data(self, user, month_start, month_end):
+    async def get_client_dashboard_data(self, user, month_start, month_end):
         """Get dashboard data for clients"""
         # Schedules assigned to this client
+        client_name = user.get_full_name()  # Assuming client name matches user name
         schedules = Schedule.objects.filter(
-            client__name=user.get_full_name(),  # Assuming client name matches user name
+            client__name=client_name,
             start_date__gte=month_start,
             start_date__lte=month_end
-        ).select_related('employee')
-        
-        # Statistics
-        total_schedules = schedules.count()
-        approved_schedules = schedules.filter(status='approved').count()
-        pending_schedules = schedules.filter(status='submitted').count()
-        
-        # Recent schedules
-        recent_schedules = schedules.order_by('-created_at')[:5]
+        )
         
-        # Hours by employee
-        hours_by_employee = {}
-        for schedule in schedules.filter(status='approved'):
-            employee_name = schedule.employee.get_full_name()
-            if employee_name not in hours_by_employee:
-                hours_by_employee[employee_name] = 0
-            hours_by_employee[employee_name] += schedule.duration_hours
+        # Statistics and hours by employee (keyed like User.get_full_name()) are cached figures
+        data = await sync_to_async(figures.cached)('dashboard', ('client', client_name), month_start, month_end)
+        recent_schedules = await sync_to_async(list)(schedules.select_related('employee').order_by('-created_at')[:5])
         
         return {
-            'total_schedules': total_schedules,
-            'approved_schedules': approved_schedules,
-            'pending_schedules': pending_schedules,
+            **data,
             'recent_schedules': recent_schedules,
-            'hours_by_employee': hours_by_employee,
             'dashboard_type': 'client',
         }
 
@@ -0,0 +1,53 @@
+"""
+Activity figures for the client directory
+
+Each client on a directory page is annotated with three correlated
+subqueries: schedules coming up, approved minutes this month and the date of
+the latest schedule so far. Each one reads a single client's slice of the
+``(client, start_date)`` index, and the database only evaluates them for the
+rows of the page, so the cost of a page does not grow with the number of
+clients or schedules. The latest schedule is read through the
+``schedule_history`` view, so a client whose recent work has all been
+archived still shows when they were last active; the client filter reaches
+both halves of the view and their own ``(client, start_date)`` indexes.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from schedules.models import Schedule, ScheduleHistory
+
+# Clients listed per directory page
+PAGE_SIZE = 25
+
+
+def _client_schedules():
+    return Schedule.objects.filter(client=OuterRef('pk')).order_by()
+
+
+def _per_client(queryset, aggregate):
+    """Scalar subquery of ``aggregate`` over each client's schedules in ``queryset``"""
+    return Subquery(queryset.values('client').annotate(value=aggregate).values('value'))
+
+
+def with_activity(queryset, today=None):
+    """
+    Annotate clients with ``upcoming_schedules``, ``approved_minutes`` (this
+    month) and ``last_activity`` (latest schedule date up to today, archived
+    ones included, or None)
+    """
+    today = today or timezone.now().date()
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    upcoming = _client_schedules().filter(start_date__gte=today).exclude(status='rejected')
+    approved = _client_schedules().filter(status='approved', start_date__gte=month_start, start_date__lte=month_end)
+    past = ScheduleHistory.objects.filter(client=OuterRef('pk'), start_date__lte=today).order_by('-start_date')
+
+    return queryset.annotate(
+        upcoming_schedules=Coalesce(_per_client(upcoming, Count('id')), Value(0), output_field=IntegerField()),
+        approved_minutes=Coalesce(_per_client(approved, Sum('duration_minutes')), Value(0), output_field=IntegerField()),
+        last_activity=Subquery(past.values('start_date')[:1]),
+    )
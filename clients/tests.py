@@ -1,3 +1,63 @@
+from datetime import time, timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from schedules.archive import archive_batch
+from schedules.models import Schedule
+from . import directory
+from .models import Client
+
 
-# Create your tests here.
+class DirectoryActivityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann = User.objects.create(username='ann', first_name='Ann', last_name='Lee', role='employee')
+        cls.acme = Client.objects.create(name='Acme')
+    
+    def day(self, offset):
+        return timezone.now().date() + timedelta(days=offset)
+    
+    def schedule(self, offset, status='approved'):
+        """A schedule ``offset`` days away (saving refuses past dates, so it is moved there afterwards)"""
+        schedule = Schedule.objects.create(
+            employee=self.ann, client=self.acme, start_date=self.day(1), start_time=time(9),
+            end_date=self.day(1), end_time=time(17),
+        )
+        Schedule.objects.filter(pk=schedule.pk).update(start_date=self.day(offset), end_date=self.day(offset), status=status)
+        return schedule
+    
+    def activity(self, client=None):
+        return directory.with_activity(Client.objects.filter(pk=(client or self.acme).pk)).get()
+    
+    def test_last_activity_is_the_latest_past_schedule(self):
+        self.schedule(-20)
+        self.schedule(-5, status='submitted')
+        self.schedule(3)
+        
+        acme = self.activity()
+        self.assertEqual(acme.last_activity, self.day(-5))
+        self.assertEqual(acme.upcoming_schedules, 1)
+    
+    def test_archived_schedules_still_count_as_activity(self):
+        self.schedule(-400)
+        self.schedule(3)
+        self.assertEqual(archive_batch(self.day(-365)), 1)
+        
+        self.assertEqual(self.activity().last_activity, self.day(-400))
+    
+    def test_older_live_schedule_does_not_hide_a_later_archived_one(self):
+        self.schedule(-500, status='submitted')
+        self.schedule(-400)
+        archive_batch(self.day(-365))
+        
+        self.assertEqual(self.activity().last_activity, self.day(-400))
+    
+    def test_no_past_schedules_means_no_activity(self):
+        self.schedule(3)
+        quiet = Client.objects.create(name='Quiet')
+        
+        self.assertIsNone(self.activity().last_activity)
+        self.assertIsNone(self.activity(quiet).last_activity)
+        self.assertEqual(self.activity(quiet).upcoming_schedules, 0)
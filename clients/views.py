@@ -3,18 +3,47 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, TemplateView
 from django.db.models import Q
 from datetime import datetime, timedelta
+from . import directory
 from .models import Client
 from schedules.models import Schedule
 
 
 class ClientListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
-    """List view for clients (supervisors only)"""
+    """Client directory with activity figures, searchable by name or email (supervisors only)"""
     model = Client
     template_name = 'clients/list.html'
     context_object_name = 'clients'
+    paginate_by = directory.PAGE_SIZE
     
     def test_func(self):
         return self.request.user.is_supervisor
+    
+    def get_queryset(self):
+        queryset = Client.objects.all()
+        
+        query = self.request.GET.get('q', '').strip()
+        if query:
+            queryset = queryset.filter(Q(name__icontains=query) | Q(contact_email__icontains=query))
+        
+        if self.request.GET.get('active') == '1':
+            queryset = queryset.filter(is_active=True)
+        
+        # Annotations are only computed for the page's rows; the paginator's
+        # count() leaves them out
+        return directory.with_activity(queryset.order_by('name', 'id'))
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        for client in context['clients']:
+            client.approved_hours = round(client.approved_minutes / 60, 2)
+        context['query'] = self.request.GET.get('q', '').strip()
+        context['active_only'] = self.request.GET.get('active') == '1'
+        
+        # Filters carried over by the pagination links
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        context['filter_params'] = params.urlencode()
+        return context
 
 
 class ClientScheduleView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration for production
+
+    gunicorn -c gunicorn.conf.py
+
+Serves scheduler/asgi.py with Uvicorn workers (the event stream and the
+async views need an event loop) under scheduler.settings_production. The
+app is loaded and warmed once in the master (scheduler/preload.py) and
+workers are forked from it, so a worker starts without importing anything
+and shares the master's code, URLconf and compiled templates. Workers keep
+no state of their own between requests: event streams follow the schedule
+event log (schedules/broadcast.py), so a status change made in one worker
+reaches the streams open in all the others.
+
+Following the gc.freeze() documentation, the collector is off in the master
+until the workers are forked and switched back on in each worker.
+"""
+import gc
+import multiprocessing
+import os
+
+from decouple import config
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scheduler.settings_production')
+
+wsgi_app = 'scheduler.asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+bind = config('BIND', default='0.0.0.0:8000')
+workers = config('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+preload_app = True
+
+# Workers are replaced now and then so pages they copied are returned; a
+# replacement is forked from the warm master and is ready immediately
+max_requests = config('GUNICORN_MAX_REQUESTS', default=2000, cast=int)
+max_requests_jitter = max_requests // 10
+
+timeout = config('GUNICORN_TIMEOUT', default=60, cast=int)
+
+# Fewer freed holes in the pages the workers will share
+gc.disable()
+
+
+def when_ready(server):
+    from scheduler.preload import warm
+    patterns, templates = warm()
+    server.log.info("Preloaded %d URL patterns and %d templates", patterns, templates)
+
+
+def post_fork(server, worker):
+    gc.enable()
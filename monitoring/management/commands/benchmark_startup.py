@@ -0,0 +1,63 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SETTINGS_MODULES = ('scheduler.settings', 'scheduler.settings_production')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare process startup time and memory of the development and production settings, "
+        "and the memory of forked workers with and without preloading (see monitoring/startup.py)"
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per settings module; medians are reported')
+        parser.add_argument('--workers', type=int, default=4, help='Workers forked for the memory comparison (0 skips it)')
+        parser.add_argument('--settings-modules', nargs='+', default=SETTINGS_MODULES, metavar='MODULE')
+    
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'settings':<32} {'setup s':>8} {'+views s':>9} {'+templates s':>13} {'RSS MB':>7} {'modules':>8}")
+        for module in options['settings_modules']:
+            runs = [self.probe(module, 'start') for _ in range(options['runs'])]
+            
+            def median(step, key):
+                return statistics.median(run['steps'][step][key] for run in runs)
+            
+            self.stdout.write(
+                f"{module:<32} {median('setup', 'seconds'):>8.3f} {median('views', 'seconds'):>9.3f} "
+                f"{median('templates', 'seconds'):>13.3f} {median('templates', 'rss_mb'):>7.1f} "
+                f"{statistics.median(run['modules'] for run in runs):>8.0f}"
+            )
+        
+        if options['workers'] and os.path.exists('/proc/self/smaps_rollup'):
+            module = options['settings_modules'][-1]
+            self.stdout.write(f"\n{options['workers']} forked workers under {module}:")
+            for probe in ('lazy', 'preload'):
+                result = self.probe(module, probe, options['workers'])
+                private = result['workers_private_mb']
+                self.stdout.write(
+                    f"  {probe:<8} private per worker {statistics.mean(private):>6.1f} MB, "
+                    f"all workers {sum(private):>6.1f} MB, master RSS {result['master_rss_mb']:.1f} MB"
+                )
+    
+    def probe(self, module, name, *args):
+        environment = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': module,
+            # settings_production requires both
+            'SECRET_KEY': os.environ.get('SECRET_KEY', 'benchmark-startup'),
+            'ALLOWED_HOSTS': os.environ.get('ALLOWED_HOSTS', 'localhost'),
+        }
+        completed = subprocess.run(
+            [sys.executable, '-m', 'monitoring.startup', name, *map(str, args)],
+            cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"{name} probe failed under {module}:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,60 @@
+import io
+import pstats
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from monitoring import profiling
+
+
+class Command(BaseCommand):
+    help = 'List the slowest profiled requests and the functions costing the most across them'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10, help='Requests listed')
+        parser.add_argument('--functions', type=int, default=25, help='Functions listed')
+        parser.add_argument('--path', default='', help='Only requests whose path contains this')
+        parser.add_argument('--hours', type=float, help='Only requests profiled in the last N hours')
+        parser.add_argument(
+            '--sort',
+            choices=['tottime', 'cumulative', 'ncalls'],
+            default='tottime',
+            help='Function ordering: own time, time including callees, or calls',
+        )
+        parser.add_argument('--dir', help='Profile directory (defaults to PROFILING_DIR)')
+    
+    def handle(self, *args, **options):
+        profiles = [profile for profile in profiling.load(options['dir']) if options['path'] in profile['path']]
+        if options['hours'] is not None:
+            since = timezone.now() - timedelta(hours=options['hours'])
+            profiles = [profile for profile in profiles if parse_datetime(profile['started_at']) >= since]
+        if not profiles:
+            raise CommandError('No matching profiles; request a page with "X-Profile: 1" or ?profile=1 as staff')
+        
+        profiles.sort(key=lambda profile: -profile['duration_ms'])
+        self.stdout.write(f"{len(profiles)} profiled requests, slowest first:\n")
+        self.stdout.write(f"{'ms':>9} {'sql ms':>8} {'queries':>7}  {'orm':>5} {'tmpl':>5} {'app':>5}  request")
+        for profile in profiles[:options['limit']]:
+            times = profiling.layer_times(pstats.Stats(profile['stats_file']))
+            total = sum(times.values()) or 1
+            self.stdout.write(
+                f"{profile['duration_ms']:>9.1f} {profile['sql_ms']:>8.1f} {profile['queries']:>7}  "
+                f"{times['orm'] / total:>5.0%} {times['templates'] / total:>5.0%} {times['app'] / total:>5.0%}  "
+                f"{profile['method']} {profile['path']} ({profile['status']}, {profile['id']})"
+            )
+        
+        # Every matching profile merged, so functions slow across many requests stand out
+        output = io.StringIO()
+        stats = pstats.Stats(*[profile['stats_file'] for profile in profiles], stream=output)
+        self.stdout.write('\nOwn time by layer across all matching requests:')
+        times = profiling.layer_times(stats)
+        total = sum(times.values()) or 1
+        for layer_name, seconds in sorted(times.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {layer_name:<10} {seconds * 1000:>10.1f} ms  {seconds / total:>5.0%}")
+        
+        # print_stats would otherwise start with one line per merged file
+        stats.files = []
+        stats.sort_stats(options['sort']).print_stats(options['functions'])
+        self.stdout.write(output.getvalue(), ending='')
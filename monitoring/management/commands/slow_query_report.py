@@ -0,0 +1,83 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from monitoring import slowqueries
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the slow-query log by query shape, flagging full scans and temporary sorts'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Shapes listed')
+        parser.add_argument('--hours', type=float, help='Only queries logged in the last N hours')
+        parser.add_argument('--flagged', action='store_true', help='Only shapes with a full scan or temporary sort')
+        parser.add_argument('--plans', action='store_true', help='Print the latest plan of each shape')
+        parser.add_argument('--log', help='Log file (defaults to SLOW_QUERY_LOG)')
+    
+    def handle(self, *args, **options):
+        entries = slowqueries.read(options['log'])
+        if options['hours'] is not None:
+            since = timezone.now() - timedelta(hours=options['hours'])
+            entries = [entry for entry in entries if parse_datetime(entry['at']) >= since]
+        if not entries:
+            raise CommandError('No slow queries logged; set SLOW_QUERY_MS to start recording')
+        
+        shapes = {}
+        for entry in entries:
+            group = shapes.setdefault(entry['fingerprint'], {'count': 0, 'total': 0.0, 'max': 0.0, 'flags': set(), 'scanned': set()})
+            group['count'] += 1
+            group['total'] += entry['ms']
+            group['max'] = max(group['max'], entry['ms'])
+            group['flags'].update(entry['flags'])
+            group['scanned'].update(entry.get('scanned', []))
+            # Entries are oldest first, so this ends on the latest capture
+            group['latest'] = entry
+        
+        groups = sorted(shapes.values(), key=lambda group: -group['total'])
+        if options['flagged']:
+            groups = [group for group in groups if group['flags']]
+        
+        self.stdout.write(f"{len(entries)} slow queries in {len(shapes)} shapes, by total time:\n")
+        self.stdout.write(f"{'count':>6} {'total ms':>10} {'mean ms':>8} {'max ms':>8}  flags")
+        for group in groups[:options['limit']]:
+            latest = group['latest']
+            flags = ', '.join(sorted(group['flags'])) or '-'
+            self.stdout.write(
+                f"{group['count']:>6} {group['total']:>10.1f} {group['total'] / group['count']:>8.1f} "
+                f"{group['max']:>8.1f}  {flags}  [{latest['fingerprint']}]"
+            )
+            self.stdout.write(f"       {self.abridged(latest['shape'])}")
+            for table in sorted(group['scanned']):
+                self.stdout.write(f"       {self.advice(latest['sql'], table)}")
+            table = slowqueries.main_table(latest['sql'])
+            if 'temp_sort' in group['flags'] and table not in group['scanned']:
+                self.stdout.write(f"       {self.advice(latest['sql'], table, sort=True)}")
+            if options['plans']:
+                for line in latest['plan']:
+                    self.stdout.write(f"         | {line}")
+            self.stdout.write('')
+    
+    def abridged(self, shape):
+        """Shape without its select list, cut to a line or two"""
+        shape = re.sub(r'^SELECT (DISTINCT )?.*? FROM ', r'SELECT \1... FROM ', shape)
+        return shape if len(shape) <= 300 else shape[:297] + '...'
+    
+    def advice(self, sql, table, sort=False):
+        """Index suggestion for a scanned or sorted table, noting an existing index that already matches"""
+        columns = slowqueries.suggest_index(sql, table, sort)
+        if not columns:
+            return f"{table}: {'sorted' if sort else 'scanned'} without a filter or ordering on its own columns"
+        try:
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, table)
+        except Exception:
+            constraints = {}
+        for name, constraint in constraints.items():
+            if constraint['columns'][:len(columns)] == columns:
+                return f"{table}: index {name} ({', '.join(constraint['columns'])}) matches but was not used; check statistics (ANALYZE)"
+        return f"{table}: consider an index on ({', '.join(columns)})"
@@ -0,0 +1,96 @@
+import cProfile
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils import timezone
+
+from . import profiling
+
+
+class QueryTimer:
+    """``execute_wrapper`` that counts queries and the time spent in them"""
+    
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class ProfilingMiddleware:
+    """
+    Profile the rest of the request (view, ORM, template rendering) on demand
+    
+    Goes after AuthenticationMiddleware, which it needs to recognise staff.
+    See monitoring/profiling.py for how requests are picked. Under ASGI the
+    middleware stays async; only a request that is profiled runs the rest of
+    the chain in a thread, as a sync middleware would.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        if not profiling.ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reason = profiling.trigger(request)
+        if reason is None:
+            return self.get_response(request)
+        return self.profile(request, reason, self.get_response)
+    
+    async def __acall__(self, request):
+        reason = profiling.requested(request)
+        if reason is not None and not await sync_to_async(profiling.is_staff)(request):
+            reason = None
+        reason = reason or profiling.sampled()
+        if reason is None:
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(request, reason, async_to_sync(self.get_response))
+    
+    def profile(self, request, reason, get_response):
+        """Run ``get_response`` under cProfile and save the profile"""
+        profiler = cProfile.Profile()
+        queries = QueryTimer()
+        started_at = timezone.now()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is already active in this thread
+                return get_response(request)
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        elapsed = time.perf_counter() - started
+        
+        profile_id = profiling.save(profiler, {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', ''),
+            'user_id': request.user.pk if request.user.is_authenticated else None,
+            'status': response.status_code,
+            'trigger': reason,
+            'started_at': started_at.isoformat(),
+            'duration_ms': round(elapsed * 1000, 1),
+            'queries': queries.count,
+            'sql_ms': round(queries.seconds * 1000, 1),
+        })
+        if reason != 'sample':
+            response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,136 @@
+"""
+Opt-in per-request profiles
+
+``ProfilingMiddleware`` runs a request under cProfile when a staff user asks
+for it (an ``X-Profile: 1`` header or ``?profile=1``) or when the request is
+picked at ``PROFILING_SAMPLE_RATE``. Each profile is a pstats file in
+``PROFILING_DIR`` with a JSON file beside it describing the request:
+
+    20250114T083012-4f2a9c.prof   open with pstats, snakeviz or flameprof
+    20250114T083012-4f2a9c.json   path, user, status, duration, SQL time
+
+``manage.py profile_report`` lists the slowest profiled requests, splits
+their time between the ORM, templates and application code, and aggregates
+the functions that cost the most across them.
+
+Only the request thread is profiled. Under ASGI a profiled request runs the
+rest of the middleware chain in a thread; async views still run their own
+code in the event loop thread, so for them the profile shows the ORM and
+other work done through ``sync_to_async`` plus template rendering.
+
+The header and parameter are checked before the user, so requests that do
+not ask to be profiled never load ``request.user`` here. With
+``PROFILING_ENABLED`` off the middleware removes itself at startup.
+"""
+import json
+import os
+import random
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_DIR = Path(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+
+# Off removes ProfilingMiddleware from the chain
+ENABLED = getattr(settings, 'PROFILING_ENABLED', True)
+
+# Share of other requests profiled; 0 turns sampling off
+SAMPLE_RATE = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+
+# Newest profiles kept; older ones are deleted as new ones are written
+KEEP = getattr(settings, 'PROFILING_KEEP', 500)
+
+HEADER = 'X-Profile'
+PARAM = 'profile'
+
+# Own time is attributed to the first layer whose marker appears in the
+# function's "file:name"; C functions are matched by name (sqlite3.Cursor)
+LAYERS = (
+    ('orm', (f'{os.sep}django{os.sep}db{os.sep}', 'sqlite3', 'psycopg')),
+    ('templates', (f'{os.sep}django{os.sep}template{os.sep}',)),
+    ('django', (f'{os.sep}django{os.sep}',)),
+    ('app', (str(settings.BASE_DIR),)),
+)
+
+
+def trigger(request):
+    """Why ``request`` should be profiled ('header', 'param' or 'sample'), or None"""
+    reason = requested(request)
+    if reason is not None and is_staff(request):
+        return reason
+    return sampled()
+
+
+def requested(request):
+    """'header' or 'param' if ``request`` asks to be profiled, else None; does not check who asks"""
+    if request.headers.get(HEADER) == '1':
+        return 'header'
+    if request.GET.get(PARAM) == '1':
+        return 'param'
+    return None
+
+
+def is_staff(request):
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and user.is_staff
+
+
+def sampled():
+    """'sample' for the share of requests picked at SAMPLE_RATE, else None"""
+    if SAMPLE_RATE and random.random() < SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+def save(profiler, meta):
+    """Write a profile and its description; returns the profile's id"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+    profiler.dump_stats(PROFILE_DIR / f'{profile_id}.prof')
+    with open(PROFILE_DIR / f'{profile_id}.json', 'w') as handle:
+        json.dump({'id': profile_id, **meta}, handle)
+    prune()
+    return profile_id
+
+
+def prune(keep=None):
+    """Delete all but the newest ``keep`` profiles"""
+    keep = KEEP if keep is None else keep
+    for meta_file in sorted(PROFILE_DIR.glob('*.json'), reverse=True)[keep:]:
+        meta_file.unlink(missing_ok=True)
+        meta_file.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def load(directory=None):
+    """Descriptions of the saved profiles, newest first, with a ``stats_file`` path each"""
+    directory = Path(directory or PROFILE_DIR)
+    profiles = []
+    for meta_file in sorted(directory.glob('*.json'), reverse=True):
+        stats_file = meta_file.with_suffix('.prof')
+        if not stats_file.exists():
+            continue
+        with open(meta_file) as handle:
+            meta = json.load(handle)
+        meta['stats_file'] = str(stats_file)
+        profiles.append(meta)
+    return profiles
+
+
+def layer(filename, name):
+    """Layer a profiled function belongs to"""
+    location = f'{filename}:{name}'
+    for layer_name, markers in LAYERS:
+        if any(marker in location for marker in markers):
+            return layer_name
+    return 'other'
+
+
+def layer_times(stats):
+    """{layer: seconds of own time} for a pstats.Stats"""
+    times = {layer_name: 0.0 for layer_name, _ in LAYERS}
+    times['other'] = 0.0
+    for (filename, _, name), (_, _, own_time, _, _) in stats.stats.items():
+        times[layer(filename, name)] += own_time
+    return times
@@ -0,0 +1,226 @@
+"""
+Slow-query log with EXPLAIN plans
+
+When ``SLOW_QUERY_MS`` is set, every database connection gets an execute
+wrapper that times its queries. A SELECT slower than the threshold is
+explained on a separate cursor and appended as one JSON line to
+``SLOW_QUERY_LOG``:
+
+    {"at": ..., "ms": 412.5, "vendor": "sqlite", "sql": ..., "shape": ...,
+     "fingerprint": ..., "plan": [...], "flags": ["full_scan", "temp_sort"],
+     "scanned": ["schedules"]}
+
+``shape`` is the SQL with literals and IN lists collapsed, so the same query
+with other values groups together. ``manage.py slow_query_report`` aggregates
+the log by shape and suggests indexes for flagged shapes.
+
+Inside a transaction the EXPLAIN runs in a savepoint, so an EXPLAIN that
+fails (on PostgreSQL any error aborts the transaction) is rolled back alone
+and the caller's transaction carries on.
+
+``ms`` is the time spent in ``execute()``. PostgreSQL returns every row
+from it, but SQLite only steps to the first row and produces the rest as
+the caller fetches them. A query that sorts, groups or aggregates does its
+work before the first row and is timed in full; one that streams rows from
+a scan is timed to its first row only, so on SQLite it can be slower than
+logged, or missing from the log.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+THRESHOLD_MS = getattr(settings, 'SLOW_QUERY_MS', 0)
+
+LOG_FILE = Path(getattr(settings, 'SLOW_QUERY_LOG', settings.BASE_DIR / 'profiles' / 'slow_queries.jsonl'))
+
+# The log is moved to "<name>.1" when it grows past this
+MAX_BYTES = 10 * 1024 * 1024
+
+# Slow queries logged with their full text are cut at this length
+MAX_SQL_LENGTH = 4000
+
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+SPACE_RE = re.compile(r'\s+')
+
+_lock = threading.Lock()
+
+
+def shape(sql):
+    """SQL with literals replaced by ? and IN lists collapsed"""
+    sql = STRING_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(query_shape):
+    return hashlib.md5(query_shape.encode()).hexdigest()[:12]
+
+
+def plan_summary(vendor, plan):
+    """
+    (flags, scanned tables) of a plan
+
+    Flags are 'full_scan' when a table is read in full (in SQLite, also in
+    index order) and 'temp_sort' when rows are sorted or grouped in a
+    temporary structure.
+    """
+    scanned = []
+    temp_sort = False
+    for line in plan:
+        line = line.strip().lstrip('->').strip()
+        if vendor == 'sqlite':
+            if line.startswith('SCAN ') and line != 'SCAN CONSTANT ROW':
+                scanned.append(line.split()[1])
+            temp_sort = temp_sort or line.startswith('USE TEMP B-TREE')
+        elif vendor == 'postgresql':
+            if line.startswith('Seq Scan on '):
+                scanned.append(line.split()[3])
+            temp_sort = temp_sort or re.match(r'(Incremental )?Sort\b', line) is not None
+    flags = (['full_scan'] if scanned else []) + (['temp_sort'] if temp_sort else [])
+    return flags, scanned
+
+
+def explain(connection, sql, params):
+    """Plan lines of a SELECT, run on a fresh cursor so the caller's results are untouched"""
+    prefix = EXPLAIN_PREFIX.get(connection.vendor)
+    if prefix is None:
+        return []
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail); indent by depth like the sqlite3 shell
+        depth = {}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return lines
+    return [row[0] for row in rows]
+
+
+def _clause(sql, keyword, ends):
+    """Text of a top-level clause such as WHERE, up to the first of ``ends``"""
+    start = sql.find(f' {keyword} ')
+    if start == -1:
+        return ''
+    start += len(keyword) + 2
+    stops = [sql.find(f' {end} ', start) for end in ends]
+    stops = [stop for stop in stops if stop != -1]
+    return sql[start:min(stops)] if stops else sql[start:]
+
+
+def suggest_index(sql, table, sort=False):
+    """
+    Columns of an index that would let ``table`` be searched instead of scanned
+
+    Equality filters come first, then the first range filter, or the ORDER BY
+    columns when nothing is filtered by range, so the index also saves the
+    sort. With ``sort`` the ORDER BY columns always follow the equality
+    filters, for queries that search an index but still sort. A heuristic
+    for Django's quoted SQL; returns [] when ``table`` has no filtered or
+    ordered columns.
+    """
+    where = _clause(sql, 'WHERE', ('GROUP BY', 'ORDER BY', 'LIMIT'))
+    order_by = _clause(sql, 'ORDER BY', ('LIMIT', 'OFFSET'))
+    column = rf'"{re.escape(table)}"\."(\w+)"'
+    equal = re.findall(column + r' (?:= |IN \()', where)
+    ranged = re.findall(column + r' (?:>=|<=|>|<|BETWEEN) ', where)
+    ordered = re.findall(column, order_by)
+
+    columns = list(dict.fromkeys(equal))
+    tail = ranged[:1] if ranged and not sort else ordered
+    columns += [name for name in dict.fromkeys(tail) if name not in columns]
+    return columns
+
+
+def main_table(sql):
+    """Table named by the first FROM of a query"""
+    match = re.search(r'\bFROM "?(\w+)"?', sql)
+    return match.group(1) if match else None
+
+
+def write(entry):
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(entry) + '\n'
+    with _lock:
+        if LOG_FILE.exists() and LOG_FILE.stat().st_size > MAX_BYTES:
+            LOG_FILE.replace(LOG_FILE.with_name(LOG_FILE.name + '.1'))
+        with open(LOG_FILE, 'a') as handle:
+            handle.write(line)
+
+
+def record(execute, sql, params, many, context):
+    """Execute wrapper: run the query and log it with its plan when slow"""
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms < THRESHOLD_MS or many or not sql.lstrip()[:6].upper() == 'SELECT':
+        return result
+
+    connection = context['connection']
+    try:
+        if connection.in_atomic_block:
+            with transaction.atomic(using=connection.alias, savepoint=True):
+                plan = explain(connection, sql, params)
+        else:
+            plan = explain(connection, sql, params)
+    except Exception as error:  # the plan is best effort; never fail the query over it
+        plan = [f'EXPLAIN failed: {error}']
+    query_shape = shape(sql)
+    flags, scanned = plan_summary(connection.vendor, plan)
+    write({
+        'at': timezone.now().isoformat(),
+        'ms': round(elapsed_ms, 1),
+        'vendor': connection.vendor,
+        'alias': connection.alias,
+        'sql': sql[:MAX_SQL_LENGTH],
+        'shape': query_shape,
+        'fingerprint': fingerprint(query_shape),
+        'plan': plan,
+        'flags': flags,
+        'scanned': scanned,
+    })
+    return result
+
+
+def attach(sender, connection, **kwargs):
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record)
+
+
+def install():
+    """Time every new database connection's queries when SLOW_QUERY_MS is set"""
+    if THRESHOLD_MS:
+        connection_created.connect(attach, dispatch_uid='monitoring.slowqueries')
+
+
+def read(log_file=None):
+    """Logged entries, oldest first, including the rotated log"""
+    log_file = Path(log_file or LOG_FILE)
+    entries = []
+    for path in (log_file.with_name(log_file.name + '.1'), log_file):
+        if path.exists():
+            with open(path) as handle:
+                entries.extend(json.loads(line) for line in handle if line.strip())
+    return entries
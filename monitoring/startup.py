@@ -0,0 +1,102 @@
+"""
+Startup probes for ``manage.py benchmark_startup``
+
+Each probe runs in a fresh interpreter, started by the command as
+
+    python -m monitoring.startup <probe> [workers]
+
+with DJANGO_SETTINGS_MODULE set, and prints one JSON object:
+
+``start``
+    Seconds and resident memory after ``django.setup()``, after importing the
+    views and after compiling the templates, plus the number of modules
+    loaded.
+``preload`` / ``lazy``
+    Forks ``workers`` processes and reports the memory private to each (not
+    shared with any other process), from /proc/<pid>/smaps_rollup. With
+    ``preload`` the app is set up and warmed (scheduler/preload.py) before
+    forking, as gunicorn.conf.py does; with ``lazy`` every worker sets it up
+    itself after the fork.
+"""
+import gc
+import json
+import os
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+
+def rss_mb():
+    """Resident memory of this process in MB"""
+    with open('/proc/self/status') as handle:
+        for line in handle:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def private_mb():
+    """Memory of this process not shared with any other, in MB"""
+    private = 0
+    with open('/proc/self/smaps_rollup') as handle:
+        for line in handle:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                private += int(line.split()[1])
+    return private / 1024
+
+
+def setup():
+    import django
+    django.setup()
+
+
+def start():
+    from scheduler import preload
+
+    steps = {}
+    for name, step in (('setup', setup), ('views', preload.import_views), ('templates', preload.compile_templates)):
+        step()
+        steps[name] = {'seconds': time.perf_counter() - STARTED, 'rss_mb': rss_mb()}
+    return {'steps': steps, 'modules': len(sys.modules)}
+
+
+def forked(probe, workers):
+    """Fork ``workers`` processes and collect their private memory through pipes"""
+    if probe == 'preload':
+        gc.disable()
+        setup()
+        from scheduler.preload import warm
+        warm()
+
+    pipes = []
+    for _ in range(workers):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            gc.enable()
+            if probe == 'lazy':
+                setup()
+                from scheduler import preload
+                preload.import_views()
+                preload.compile_templates()
+            # Busy workers collect garbage too
+            gc.collect()
+            os.write(write_end, json.dumps(private_mb()).encode())
+            os._exit(0)
+        os.close(write_end)
+        pipes.append((pid, read_end))
+
+    private = []
+    for pid, read_end in pipes:
+        with os.fdopen(read_end) as handle:
+            private.append(json.loads(handle.read()))
+        os.waitpid(pid, 0)
+    return {'workers_private_mb': private, 'master_rss_mb': rss_mb()}
+
+
+if __name__ == '__main__':
+    probe = sys.argv[1]
+    result = start() if probe == 'start' else forked(probe, int(sys.argv[2]))
+    print(json.dumps(result))
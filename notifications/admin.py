@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import EmailOutbox
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """Email outbox admin configuration"""
+    
+    list_display = ('recipient', 'subject', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('recipient', 'subject')
+    ordering = ('-id',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
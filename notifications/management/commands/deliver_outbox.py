@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches over one reused mail connection"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Outbox rows claimed per batch')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before a message is marked failed')
+        parser.add_argument('--backoff', type=int, default=60, help='Base retry delay in seconds (doubles per attempt)')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the outbox is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls with --loop')
+    
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_batch(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+                backoff_seconds=options['backoff'],
+            )
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Delivered {sent}, failed {failed}")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        
+        self.stdout.write(self.style.SUCCESS(f"Outbox drained: {total_sent} sent, {total_failed} failed"))
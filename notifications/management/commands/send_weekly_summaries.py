@@ -0,0 +1,129 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q, Sum
+from django.template.loader import get_template
+from django.utils import timezone
+
+from accounts.models import User
+from notifications.models import EmailOutbox
+from notifications.outbox import queue_emails
+from schedules.models import Schedule
+
+
+def _figures(**aggregates):
+    """Per-group weekly figures shared by the employee and client queries"""
+    return dict(
+        total_schedules=Count('id'),
+        approved_schedules=Count('id', filter=Q(status='approved')),
+        pending_schedules=Count('id', filter=Q(status='submitted')),
+        rejected_schedules=Count('id', filter=Q(status='rejected')),
+        approved_minutes=Sum('duration_minutes', filter=Q(status='approved'), default=0),
+        **aggregates,
+    )
+
+
+class Command(BaseCommand):
+    help = "Queue weekly summary emails for every active user using grouped aggregate queries"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--week-start', help='Monday of the week to summarise (YYYY-MM-DD); defaults to last week')
+        parser.add_argument('--dry-run', action='store_true', help='Render the summaries without queueing them')
+        parser.add_argument('--force', action='store_true',
+                            help='Queue summaries again for users who already have one for the week')
+    
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        week_start = self._week_start(options['week_start'])
+        week_end = week_start + timedelta(days=6)
+        
+        week = Schedule.objects.filter(start_date__gte=week_start, start_date__lte=week_end).order_by()
+        
+        # One grouped query per audience instead of one report per user
+        employee_figures = {
+            row['employee_id']: row
+            for row in week.values('employee_id').annotate(**_figures(clients=Count('client', distinct=True)))
+        }
+        client_figures = {
+            row['client__name']: row
+            for row in week.values('client__name').annotate(**_figures(employees=Count('employee', distinct=True)))
+        }
+        team_figures = week.aggregate(**_figures(
+            employees=Count('employee', distinct=True),
+            clients=Count('client', distinct=True),
+        ))
+        team_figures['awaiting_approval'] = Schedule.objects.filter(status='submitted').count()
+        
+        users = User.objects.filter(is_active=True).exclude(email='').only(
+            'id', 'email', 'first_name', 'last_name', 'username', 'role'
+        )
+        
+        # Reruns skip users whose summary for the week is already queued or sent
+        key_prefix = f'weekly_summary:{week_start.isoformat()}:'
+        already_queued = set()
+        if not options['force']:
+            already_queued = {
+                int(key[len(key_prefix):])
+                for key in EmailOutbox.objects.filter(dedupe_key__startswith=key_prefix).values_list('dedupe_key', flat=True)
+            }
+        
+        # Compile the template once and reuse it for every recipient
+        template = get_template('notifications/weekly_summary.txt')
+        subject = f"Weekly summary: {week_start:%b %d} - {week_end:%b %d, %Y}"
+        empty = _empty_figures()
+        
+        messages = []
+        for user in users.iterator(chunk_size=2000):
+            if user.pk in already_queued:
+                continue
+            if user.is_employee:
+                figures = employee_figures.get(user.pk, empty)
+            elif user.is_client:
+                figures = client_figures.get(user.get_full_name(), empty)
+            else:
+                figures = team_figures
+            body = template.render({
+                'user': user,
+                'figures': figures,
+                'approved_hours': round((figures['approved_minutes'] or 0) / 60, 2),
+                'week_start': week_start,
+                'week_end': week_end,
+            }).strip()
+            # Forced copies carry no key, so they never collide with the first one
+            key = None if options['force'] else f'{key_prefix}{user.pk}'
+            messages.append((user.email, subject, body, 'weekly_summary', key))
+        
+        if not options['dry_run']:
+            for offset in range(0, len(messages), 1000):
+                queue_emails(messages[offset:offset + 1000])
+        
+        elapsed = time.perf_counter() - started
+        action = 'Rendered' if options['dry_run'] else 'Queued'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {len(messages)} weekly summaries for {week_start} - {week_end} in {elapsed:.2f}s"
+        ))
+        if already_queued:
+            self.stdout.write(f"Skipped {len(already_queued)} users already sent this week's summary (use --force to resend)")
+    
+    def _week_start(self, value):
+        if value:
+            try:
+                start = date.fromisoformat(value)
+            except ValueError:
+                raise CommandError('--week-start must be a date in YYYY-MM-DD format')
+            return start - timedelta(days=start.weekday())
+        today = timezone.now().date()
+        return today - timedelta(days=today.weekday() + 7)
+
+
+def _empty_figures():
+    return {
+        'total_schedules': 0,
+        'approved_schedules': 0,
+        'pending_schedules': 0,
+        'rejected_schedules': 0,
+        'approved_minutes': 0,
+        'clients': 0,
+        'employees': 0,
+    }
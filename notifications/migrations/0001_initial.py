@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(help_text='Address the message is delivered to', max_length=254)),
+                ('subject', models.CharField(help_text='Subject used when the message is sent on its own', max_length=255)),
+                ('body', models.TextField(help_text='Plain-text message body')),
+                ('kind', models.CharField(help_text='Notification type, e.g. schedule_submitted', max_length=50)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', help_text='Delivery status', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='Number of failed delivery attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time the worker may try to deliver the message')),
+                ('last_error', models.TextField(blank=True, help_text='Error from the most recent failed attempt', null=True)),
+                ('sent_at', models.DateTimeField(blank=True, help_text='When the message was handed to the mail server', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox Email',
+                'verbose_name_plural': 'Outbox Emails',
+                'db_table': 'email_outbox',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='email_outbo_status_c5a6aa_idx')],
+            },
+        ),
+    ]
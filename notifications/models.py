@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.db import models
+from django.utils import timezone
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email queued in the same transaction as the change that caused it
+    Based on REQUIREMENTS.md section 6.1 Email Notifications
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    recipient = models.EmailField(
+        help_text="Address the message is delivered to"
+    )
+    
+    subject = models.CharField(
+        max_length=255,
+        help_text="Subject used when the message is sent on its own"
+    )
+    
+    body = models.TextField(
+        help_text="Plain-text message body"
+    )
+    
+    kind = models.CharField(
+        max_length=50,
+        help_text="Notification type, e.g. schedule_submitted"
+    )
+    
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        help_text="Delivery status"
+    )
+    
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Number of failed delivery attempts"
+    )
+    
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time the worker may try to deliver the message; "
+                  "while sending, when the claim lapses"
+    )
+    
+    last_error = models.TextField(
+        blank=True,
+        null=True,
+        help_text="Error from the most recent failed attempt"
+    )
+    
+    sent_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the message was handed to the mail server"
+    )
+    
+    dedupe_key = models.CharField(
+        max_length=100,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text="Set on messages that must be queued only once, e.g. weekly_summary:<week>:<user>"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'email_outbox'
+        verbose_name = 'Outbox Email'
+        verbose_name_plural = 'Outbox Emails'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient}: {self.subject} ({self.get_status_display()})"
+    
+    @staticmethod
+    def retry_delay(attempts, base_seconds=60, max_seconds=3600):
+        """Exponential backoff delay after the given number of failed attempts"""
+        return timedelta(seconds=min(base_seconds * 2 ** max(attempts - 1, 0), max_seconds))
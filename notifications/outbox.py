@@ -0,0 +1,150 @@
+"""
+Helpers for queueing outbox emails and delivering them in batches
+
+Delivery never holds a transaction open across network I/O. A worker first
+claims a batch in one short transaction: the rows become ``sending`` with
+``next_attempt_at`` pushed out by a lease. The messages are then sent with
+no transaction open, and each outcome is saved on its own, so a message
+that went out is marked sent even if a later one fails. Rows of a worker
+that died mid-batch are claimed again once their lease runs out, so a
+message is delivered at least once.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+# Seconds a claimed batch belongs to its worker before others may take it over
+LEASE_SECONDS = 300
+
+# Kinds merged into one digest per recipient; any other kind (e.g. the
+# weekly summary) is always sent as its own message
+DIGEST_KIND_PREFIX = 'schedule_'
+
+
+def queue_emails(messages):
+    """
+    Queue ``(recipient, subject, body, kind)`` tuples in one INSERT
+
+    Call this inside the transaction that makes the change being reported so
+    the email exists if, and only if, the change is committed. A tuple may
+    carry a fifth item, a dedupe key: a message whose key is already in the
+    outbox is left out.
+    """
+    rows = [
+        EmailOutbox(
+            recipient=recipient, subject=subject, body=body, kind=kind,
+            dedupe_key=dedupe_key[0] if dedupe_key else None,
+        )
+        for recipient, subject, body, kind, *dedupe_key in messages
+        if recipient
+    ]
+    keyed = any(row.dedupe_key for row in rows)
+    return EmailOutbox.objects.bulk_create(rows, ignore_conflicts=keyed)
+
+
+def coalesce(rows):
+    """Group pending status updates by recipient into ``(recipient, subject, body, rows)`` messages"""
+    grouped = {}
+    for row in rows:
+        if row.kind.startswith(DIGEST_KIND_PREFIX):
+            grouped.setdefault(row.recipient, []).append(row)
+        else:
+            yield row.recipient, row.subject, row.body, [row]
+    
+    for recipient, group in grouped.items():
+        if len(group) == 1:
+            yield recipient, group[0].subject, group[0].body, group
+        else:
+            subject = f"{len(group)} schedule updates"
+            body = "\n\n----------------------------------------\n\n".join(
+                f"{row.subject}\n\n{row.body}" for row in group
+            )
+            yield recipient, subject, body, group
+
+
+def claim(batch_size=100, lease_seconds=LEASE_SECONDS):
+    """Mark up to ``batch_size`` due rows as sending and return them"""
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets several workers drain the outbox side by side
+        rows = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        if rows:
+            lease = now + timedelta(seconds=lease_seconds)
+            EmailOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(status='sending', next_attempt_at=lease)
+    return rows
+
+
+def deliver_batch(batch_size=100, max_attempts=5, backoff_seconds=60):
+    """
+    Deliver one batch of due outbox emails over a single mail connection
+
+    Returns ``(sent, failed)`` counts of outbox rows.
+    """
+    sent = failed = 0
+    rows = claim(batch_size)
+    if not rows:
+        return sent, failed
+    
+    messages = list(coalesce(rows))
+    connection = get_connection()
+    try:
+        for index, (recipient, subject, body, group) in enumerate(messages):
+            try:
+                # Opens on first use, and again after a failed send closed it
+                connection.open()
+            except Exception as exc:
+                # The server is unreachable: back off the rest of the batch
+                rest = [row for *_, pending in messages[index:] for row in pending]
+                failed += len(rest)
+                _record_failure(rest, exc, max_attempts, backoff_seconds)
+                break
+            message = EmailMessage(
+                subject=subject,
+                body=body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[recipient],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as exc:
+                failed += len(group)
+                _record_failure(group, exc, max_attempts, backoff_seconds)
+                # A broken connection must not fail the rest of the batch
+                _close(connection)
+            else:
+                sent += len(group)
+                EmailOutbox.objects.filter(pk__in=[row.pk for row in group]).update(status='sent', sent_at=timezone.now())
+    finally:
+        _close(connection)
+    
+    return sent, failed
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def _record_failure(rows, exc, max_attempts, backoff_seconds):
+    now = timezone.now()
+    for row in rows:
+        row.attempts += 1
+        row.last_error = f"{exc.__class__.__name__}: {exc}"
+        if row.attempts >= max_attempts:
+            row.status = 'failed'
+        else:
+            row.status = 'pending'
+            row.next_attempt_at = now + EmailOutbox.retry_delay(row.attempts, base_seconds=backoff_seconds)
+    EmailOutbox.objects.bulk_update(rows, ['attempts', 'last_error', 'status', 'next_attempt_at'])
@@ -0,0 +1,51 @@
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+
+from accounts.models import User
+from schedules.signals import schedule_status_changed
+from .outbox import queue_emails
+
+SUBJECTS = {
+    'submitted': "Schedule submitted for approval",
+    'approved': "Your schedule was approved",
+    'rejected': "Your schedule was rejected",
+    'modified': "Changes requested for your schedule",
+}
+
+
+def _render(context, audience):
+    return render_to_string('notifications/schedule_status.txt', {**context, 'audience': audience}).strip()
+
+
+@receiver(schedule_status_changed)
+def queue_status_emails(sender, schedule, previous_status, actor=None, **kwargs):
+    """Write status notification emails to the outbox in the caller's transaction"""
+    subject = SUBJECTS.get(schedule.status)
+    if subject is None:
+        return
+    
+    context = {'schedule': schedule, 'actor': actor, 'previous_status': previous_status}
+    messages = []
+    
+    if schedule.status == 'submitted':
+        # Confirmation to the employee, review request to every supervisor
+        messages.append((
+            schedule.employee.email,
+            "Schedule submitted",
+            _render(context, 'employee'),
+            'schedule_submitted',
+        ))
+        body = _render(context, 'supervisor')
+        supervisor_emails = User.objects.filter(
+            role='supervisor', is_active=True
+        ).exclude(email='').values_list('email', flat=True)
+        messages.extend((email, subject, body, 'schedule_submitted') for email in supervisor_emails)
+    else:
+        messages.append((
+            schedule.employee.email,
+            subject,
+            _render(context, 'employee'),
+            f'schedule_{schedule.status}',
+        ))
+    
+    queue_emails(messages)
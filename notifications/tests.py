@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from .models import EmailOutbox
+from .outbox import claim, deliver_batch, queue_emails
+
+
+class FailingBackend(EmailBackend):
+    """Refuses messages to addresses starting with "bounce" """
+    
+    def send_messages(self, messages):
+        if any(address.startswith('bounce') for message in messages for address in message.to):
+            raise ConnectionError('Connection reset')
+        return super().send_messages(messages)
+
+
+class UnreachableBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+
+class OutboxDeliveryTests(TestCase):
+    def queue(self, *recipients):
+        return queue_emails([
+            (recipient, f"Update {number}", f"Body {number}", 'schedule_approved')
+            for number, recipient in enumerate(recipients)
+        ])
+    
+    def test_claim_leases_due_rows(self):
+        self.queue('ann@example.com', 'bob@example.com')
+        
+        rows = claim()
+        
+        self.assertEqual(len(rows), 2)
+        for row in EmailOutbox.objects.all():
+            self.assertEqual(row.status, 'sending')
+            self.assertGreater(row.next_attempt_at, timezone.now())
+        self.assertEqual(claim(), [])
+    
+    def test_claim_takes_over_expired_lease(self):
+        self.queue('ann@example.com')
+        claim()
+        EmailOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        
+        self.assertEqual(len(claim()), 1)
+    
+    def test_sent_rows_are_marked_sent(self):
+        self.queue('ann@example.com', 'bob@example.com')
+        
+        self.assertEqual(deliver_batch(), (2, 0))
+        
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['ann@example.com', 'bob@example.com'])
+        for row in EmailOutbox.objects.all():
+            self.assertEqual(row.status, 'sent')
+            self.assertIsNotNone(row.sent_at)
+        self.assertEqual(deliver_batch(), (0, 0))
+    
+    def test_messages_to_one_recipient_are_coalesced(self):
+        self.queue('ann@example.com', 'ann@example.com', 'ann@example.com')
+        
+        self.assertEqual(deliver_batch(), (3, 0))
+        
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.subject, '3 schedule updates')
+        for number in range(3):
+            self.assertIn(f"Update {number}", message.body)
+        self.assertFalse(EmailOutbox.objects.exclude(status='sent').exists())
+    
+    def test_other_kinds_are_not_coalesced(self):
+        self.queue('ann@example.com', 'ann@example.com')
+        queue_emails([('ann@example.com', "Your week", "Summary", 'weekly_summary')])
+        
+        self.assertEqual(deliver_batch(), (3, 0))
+        
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ['2 schedule updates', 'Your week'])
+    
+    @override_settings(EMAIL_BACKEND='notifications.tests.FailingBackend')
+    def test_failed_send_is_backed_off(self):
+        self.queue('ann@example.com', 'bounce@example.com')
+        before = timezone.now()
+        
+        self.assertEqual(deliver_batch(backoff_seconds=60), (1, 1))
+        
+        self.assertEqual(EmailOutbox.objects.get(recipient='ann@example.com').status, 'sent')
+        failed = EmailOutbox.objects.get(recipient='bounce@example.com')
+        self.assertEqual(failed.status, 'pending')
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('Connection reset', failed.last_error)
+        self.assertGreaterEqual(failed.next_attempt_at, before + timedelta(seconds=60))
+        self.assertEqual(deliver_batch(), (0, 0))
+    
+    @override_settings(EMAIL_BACKEND='notifications.tests.FailingBackend')
+    def test_row_is_abandoned_after_max_attempts(self):
+        self.queue('bounce@example.com')
+        EmailOutbox.objects.update(attempts=4)
+        
+        self.assertEqual(deliver_batch(max_attempts=5), (0, 1))
+        
+        row = EmailOutbox.objects.get()
+        self.assertEqual(row.status, 'failed')
+        self.assertEqual(row.attempts, 5)
+        self.assertEqual(claim(), [])
+    
+    @override_settings(EMAIL_BACKEND='notifications.tests.UnreachableBackend')
+    def test_unreachable_server_backs_off_the_batch(self):
+        self.queue('ann@example.com', 'bob@example.com')
+        
+        self.assertEqual(deliver_batch(), (0, 2))
+        
+        for row in EmailOutbox.objects.all():
+            self.assertEqual(row.status, 'pending')
+            self.assertEqual(row.attempts, 1)
+            self.assertIn('Connection refused', row.last_error)
+            self.assertGreater(row.next_attempt_at, timezone.now())
+
+
+class WeeklySummaryTests(TestCase):
+    def setUp(self):
+        User.objects.create(username='ann', email='ann@example.com', role='employee')
+        User.objects.create(username='sue', email='sue@example.com', role='supervisor')
+    
+    def send(self, *args):
+        call_command('send_weekly_summaries', '--week-start', '2026-10-05', *args, stdout=StringIO())
+        return EmailOutbox.objects.filter(kind='weekly_summary').count()
+    
+    def test_rerun_skips_users_with_a_summary(self):
+        self.assertEqual(self.send(), 2)
+        self.assertEqual(self.send(), 2)
+    
+    def test_summary_is_queued_for_new_users_on_rerun(self):
+        self.send()
+        User.objects.create(username='bob', email='bob@example.com', role='employee')
+        
+        self.assertEqual(self.send(), 3)
+    
+    def test_force_queues_again(self):
+        self.send()
+        
+        self.assertEqual(self.send('--force'), 4)
+        self.assertEqual(self.send(), 4)
@@ -0,0 +1,150 @@
+"""
+Report windows as NumPy columns
+
+A report loads the schedules of its window once, with ``values_list``, as
+five integer columns (employee id, client id, status code, start and end
+minute since 1970-01-01) and computes every total, group-by and time series
+from those arrays:
+
+    frame = ReportFrame.load(schedules_for_range(start).filter(...))
+    approved = frame.with_status('approved')
+    approved.total_hours(), approved.minutes_by('client_id'), frame.status_counts()
+
+Status codes, start minutes and end minutes are computed by the database
+(SQLite or PostgreSQL), so no date, time or string objects are built per
+schedule.
+"""
+import numpy as np
+from django.db.models import Case, F, Func, IntegerField, Value, When
+
+from schedules.models import Schedule
+
+STATUSES = tuple(status for status, _ in Schedule.STATUS_CHOICES)
+
+COLUMNS = ('employee_id', 'client_id', 'status', 'start', 'end')
+
+# Column dtypes; minutes since 1970 fit in 32 bits until the year 6053
+DTYPES = {
+    'employee_id': np.int32,
+    'client_id': np.int32,
+    'status': np.int8,
+    'start': np.int32,
+    'end': np.int32,
+}
+
+
+def _day_and_minute(compiler, connection, expressions):
+    """SQL for (days since 1970-01-01, minute of the day) of a date and time expression"""
+    (date_sql, date_params), (time_sql, time_params) = (compiler.compile(expression) for expression in expressions)
+    if connection.vendor == 'postgresql':
+        days = f"({date_sql} - DATE '1970-01-01')"
+        minute = f"(EXTRACT(HOUR FROM {time_sql})::int * 60 + EXTRACT(MINUTE FROM {time_sql})::int)"
+    else:
+        days = f"CAST(julianday({date_sql}) - 2440587.5 AS INTEGER)"
+        minute = f"(CAST(substr({time_sql}, 1, 2) AS INTEGER) * 60 + CAST(substr({time_sql}, 4, 2) AS INTEGER))"
+    return days, minute, date_params, time_params
+
+
+class EpochMinute(Func):
+    """Minutes from 1970-01-01 00:00 to a date and time"""
+    arity = 2
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        days, minute, date_params, time_params = _day_and_minute(compiler, connection, self.get_source_expressions())
+        return f"({days} * 1440 + {minute})", [*date_params, *time_params, *time_params]
+
+    as_postgresql = as_sqlite
+
+
+class WeekMinute(Func):
+    """Minutes from the Monday 00:00 before a date and time (0-10079)"""
+    arity = 2
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        days, minute, date_params, time_params = _day_and_minute(compiler, connection, self.get_source_expressions())
+        # 1970-01-01 was a Thursday; shift so Monday is 0
+        return f"((({days} + 3) %% 7) * 1440 + {minute})", [*date_params, *time_params, *time_params]
+
+    as_postgresql = as_sqlite
+
+
+def status_code():
+    """Index of a schedule's status in STATUSES"""
+    return Case(
+        *[When(status=status, then=Value(code)) for code, status in enumerate(STATUSES)],
+        default=Value(-1),
+        output_field=IntegerField(),
+    )
+
+
+class ReportFrame:
+    """Schedules of a report window as NumPy columns (see COLUMNS)"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def load(cls, queryset):
+        """Load ``queryset`` (Schedule or ScheduleHistory) in one query"""
+        start = EpochMinute('start_date', 'start_time')
+        rows = list(
+            queryset.order_by()
+            .annotate(_status=status_code(), _start=start, _end=start + F('duration_minutes'))
+            .values_list('employee_id', 'client_id', '_status', '_start', '_end')
+        )
+        data = np.array(rows, dtype=np.int64).reshape(-1, len(COLUMNS))
+        return cls({name: data[:, i].astype(DTYPES[name]) for i, name in enumerate(COLUMNS)})
+
+    def __len__(self):
+        return len(self.columns['status'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def minutes(self):
+        return self['end'].astype(np.int64) - self['start']
+
+    def where(self, mask):
+        """Frame of the rows where ``mask`` is true"""
+        return ReportFrame({name: column[mask] for name, column in self.columns.items()})
+
+    def with_status(self, *statuses):
+        return self.where(np.isin(self['status'], [STATUSES.index(status) for status in statuses]))
+
+    def total_minutes(self):
+        return int(self.minutes.sum())
+
+    def total_hours(self):
+        return round(self.total_minutes() / 60, 2)
+
+    def status_counts(self):
+        """{status: count} in STATUS_CHOICES order, zeros included"""
+        counts = np.bincount(self['status'][self['status'] >= 0], minlength=len(STATUSES))
+        return dict(zip(STATUSES, counts.tolist()))
+
+    def minutes_by(self, column):
+        """{id: booked minutes} for every distinct value of ``column``"""
+        keys, index = np.unique(self[column], return_inverse=True)
+        return dict(zip(keys.tolist(), np.bincount(index, weights=self.minutes, minlength=len(keys)).astype(np.int64).tolist()))
+
+    def status_counts_by(self, column):
+        """(ids, counts): counts[i, code] schedules of ids[i] with status STATUSES[code]"""
+        keys, index = np.unique(self[column], return_inverse=True)
+        known = self['status'] >= 0
+        flat = index[known] * len(STATUSES) + self['status'][known]
+        counts = np.bincount(flat, minlength=len(keys) * len(STATUSES)).reshape(len(keys), len(STATUSES))
+        return keys.tolist(), counts
+
+    def series(self, unit='D'):
+        """
+        {date: booked minutes} by start day ('D'), month ('M') or year ('Y')
+
+        Buckets are keyed by the date they begin on.
+        """
+        buckets = self['start'].astype('datetime64[m]').astype(f'datetime64[{unit}]')
+        keys, index = np.unique(buckets, return_inverse=True)
+        totals = np.bincount(index, weights=self.minutes, minlength=len(keys)).astype(np.int64)
+        return dict(zip(keys.astype('datetime64[D]').tolist(), totals.tolist()))
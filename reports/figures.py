@@ -0,0 +1,296 @@
+"""
+Report and dashboard figures, cached by data version
+
+Every schedule write appends a ScheduleEvent (see schedules/eventlog.py), so
+the latest event identifies the data a figure was computed from. Figures are
+cached under keys that include it: after any change the next request computes
+fresh figures under a new key, and nothing is invalidated explicitly.
+``manage.py warm_report_cache`` computes the default windows ahead of time so
+that request is cheap as well.
+
+Only figures (counts, hours, names) are cached; the schedule lists shown next
+to them are still queried per request. A scope says whose schedules a figure
+covers: ``('all',)``, ``('employee', id)`` or ``('client', name)``.
+"""
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.models import User
+from clients.models import Client
+from schedules.archive import schedules_for_range
+from schedules.models import Schedule, ScheduleEvent
+
+from .analytics import STATUSES, ReportFrame
+
+TIMEOUT = getattr(settings, 'REPORT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Days before today covered by the default report window
+DEFAULT_WINDOW_DAYS = 30
+
+# Employees listed on the supervisor dashboard
+DASHBOARD_EMPLOYEES = 5
+
+
+def hours(minutes):
+    return round((minutes or 0) / 60, 2)
+
+
+def default_window():
+    """(start, end) of the reports' default "last 30 days" window"""
+    end_date = datetime.now().date()
+    return end_date - timedelta(days=DEFAULT_WINDOW_DAYS), end_date
+
+
+def current_month():
+    """(first, last) day of the current month, the dashboards' window"""
+    month_start = datetime.now().date().replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return month_start, month_end
+
+
+def user_scope(user):
+    """Scope of the schedules ``user`` sees in reports"""
+    if user.is_employee:
+        return ('employee', user.pk)
+    if user.is_client:
+        return ('client', user.get_full_name())
+    return ('all',)
+
+
+def scoped(queryset, scope):
+    if scope[0] == 'employee':
+        return queryset.filter(employee_id=scope[1])
+    if scope[0] == 'client':
+        return queryset.filter(client__name=scope[1])
+    return queryset
+
+
+def window_schedules(scope, start_date, end_date):
+    """Schedules of a scope starting in a window, archived ones included"""
+    return scoped(schedules_for_range(start_date), scope).filter(start_date__gte=start_date, start_date__lte=end_date)
+
+
+def employee_names(ids):
+    """{id: (first name, last name)} of the given employees"""
+    return {pk: (first_name, last_name) for pk, first_name, last_name in User.objects.filter(pk__in=ids).values_list('id', 'first_name', 'last_name')}
+
+
+def client_names(ids):
+    """{id: name} of the given clients"""
+    return dict(Client.objects.filter(pk__in=ids).values_list('id', 'name'))
+
+
+def hours_by_employee_name(frame):
+    """{"First Last": hours} keyed like User.get_full_name(); namesakes are summed"""
+    minutes_by_employee = frame.minutes_by('employee_id')
+    names = employee_names(list(minutes_by_employee))
+    result = {}
+    for employee_id, minutes in minutes_by_employee.items():
+        employee_name = ' '.join(names.get(employee_id, ('', ''))).strip()
+        result[employee_name] = result.get(employee_name, 0) + hours(minutes)
+    return result
+
+
+def hours_by_client_name(frame):
+    """{client name: hours}; clients sharing a name are summed"""
+    minutes_by_client = frame.minutes_by('client_id')
+    names = client_names(list(minutes_by_client))
+    result = {}
+    for client_id, minutes in minutes_by_client.items():
+        client_name = names.get(client_id)
+        result[client_name] = result.get(client_name, 0) + hours(minutes)
+    return result
+
+
+def employee_stats(frame, limit=None):
+    """Schedule counts per employee, busiest first"""
+    employee_ids, counts = frame.status_counts_by('employee_id')
+    totals = counts.sum(axis=1)
+    order = np.argsort(-totals, kind='stable')[:limit]
+    names = employee_names([employee_ids[i] for i in order])
+    return [
+        {
+            'employee__first_name': names.get(employee_ids[i], ('', ''))[0],
+            'employee__last_name': names.get(employee_ids[i], ('', ''))[1],
+            'total_schedules': int(totals[i]),
+            'approved_schedules': int(counts[i, STATUSES.index('approved')]),
+            'pending_schedules': int(counts[i, STATUSES.index('submitted')]),
+            'rejected_schedules': int(counts[i, STATUSES.index('rejected')]),
+        }
+        for i in order
+    ]
+
+
+def client_stats(frame):
+    """Schedule counts per client, busiest first"""
+    client_ids, counts = frame.status_counts_by('client_id')
+    names = client_names(client_ids)
+    stats = [
+        {
+            'client__name': names.get(client_id),
+            'total_schedules': int(row.sum()),
+            'approved_schedules': int(row[STATUSES.index('approved')]),
+        }
+        for client_id, row in zip(client_ids, counts)
+    ]
+    stats.sort(key=lambda entry: -entry['total_schedules'])
+    return stats
+
+
+def index_figures(scope, start_date, end_date, status=None):
+    """Summary cards, status distribution and hours by month of the reports index"""
+    schedules = window_schedules(scope, start_date, end_date)
+    if status:
+        schedules = schedules.filter(status=status)
+    frame = ReportFrame.load(schedules)
+    approved = frame.with_status('approved')
+    status_breakdown = frame.status_counts()
+    return {
+        'total_schedules': len(frame),
+        'approved_schedules': status_breakdown['approved'],
+        'pending_schedules': status_breakdown['submitted'] + status_breakdown['draft'],
+        'total_hours': approved.total_hours(),
+        'status_distribution': {status: count for status, count in status_breakdown.items() if count > 0},
+        'minutes_by_month': {(month.year, month.month): minutes for month, minutes in approved.series('M').items()},
+    }
+
+
+def employee_figures(employee_id, start_date, end_date):
+    frame = ReportFrame.load(window_schedules(('employee', employee_id), start_date, end_date))
+    approved = frame.with_status('approved')
+    return {
+        'hours_by_client': hours_by_client_name(approved),
+        'total_hours': approved.total_hours(),
+        'status_breakdown': frame.status_counts(),
+    }
+
+
+def client_figures(client_name, start_date, end_date):
+    approved = ReportFrame.load(window_schedules(('client', client_name), start_date, end_date)).with_status('approved')
+    return {
+        'hours_by_employee': hours_by_employee_name(approved),
+        'total_hours': approved.total_hours(),
+    }
+
+
+def supervisor_figures(start_date, end_date):
+    frame = ReportFrame.load(window_schedules(('all',), start_date, end_date))
+    return {
+        'total_hours': frame.with_status('approved').total_hours(),
+        'employee_stats': employee_stats(frame),
+        'status_breakdown': frame.status_counts(),
+        'client_stats': client_stats(frame),
+    }
+
+
+def dashboard_figures(scope, month_start, month_end):
+    """Statistics of the role dashboards (live schedules only)"""
+    schedules = scoped(Schedule.objects.all(), scope).filter(start_date__gte=month_start, start_date__lte=month_end)
+    frame = ReportFrame.load(schedules)
+    counts = frame.status_counts()
+    figures = {
+        'total_schedules': len(frame),
+        'approved_schedules': counts['approved'],
+    }
+    if scope[0] == 'employee':
+        figures.update({
+            'pending_schedules': counts['submitted'],
+            'rejected_schedules': counts['rejected'],
+            'hours_by_client': hours_by_client_name(frame.with_status('approved')),
+        })
+    elif scope[0] == 'client':
+        figures.update({
+            'pending_schedules': counts['submitted'],
+            'hours_by_employee': hours_by_employee_name(frame.with_status('approved')),
+        })
+    else:
+        figures.update({
+            'pending_approvals': counts['submitted'],
+            'rejected_schedules': counts['rejected'],
+            'employee_stats': employee_stats(frame, DASHBOARD_EMPLOYEES),
+        })
+    return figures
+
+
+FIGURES = {
+    'index': index_figures,
+    'employee': employee_figures,
+    'client': client_figures,
+    'supervisor': supervisor_figures,
+    'dashboard': dashboard_figures,
+}
+
+
+def data_version():
+    """
+    Latest schedule event as "id.timestamp", or "0" before any event
+
+    The timestamp keeps versions unique when a database is recreated and
+    event ids start over (test runs, restored backups).
+    """
+    latest = ScheduleEvent.objects.order_by('-id').values_list('id', 'created_at').first()
+    return f"{latest[0]}.{latest[1].timestamp():.0f}" if latest else '0'
+
+
+def cache_key(name, args, version):
+    digest = hashlib.md5(repr(args).encode()).hexdigest()
+    return f'reports:{name}:{version}:{digest}'
+
+
+def cached(name, *args):
+    """FIGURES[name](*args), from the cache when computed for the current data"""
+    key = cache_key(name, args, data_version())
+    figures = cache.get(key)
+    if figures is None:
+        figures = FIGURES[name](*args)
+        cache.set(key, figures, TIMEOUT)
+    return figures
+
+
+def warm(name, args, version):
+    """
+    Cache FIGURES[name](*args) for ``version`` unless already there
+
+    Returns (name, seconds spent computing or None when it was cached).
+    ``version`` is read before computing, so figures are never older than
+    the version they are stored under.
+    """
+    key = cache_key(name, args, version)
+    if cache.get(key) is not None:
+        return name, None
+    started = time.perf_counter()
+    cache.set(key, FIGURES[name](*args), TIMEOUT)
+    return name, time.perf_counter() - started
+
+
+def default_tasks():
+    """(name, args) of every default window the views ask for"""
+    start_date, end_date = default_window()
+    month_start, month_end = current_month()
+    everyone = ('all',)
+    tasks = [
+        ('index', (everyone, start_date, end_date, None)),
+        ('supervisor', (start_date, end_date)),
+        ('dashboard', (everyone, month_start, month_end)),
+    ]
+    for employee_id in User.objects.filter(role='employee', is_active=True).values_list('id', flat=True):
+        scope = ('employee', employee_id)
+        tasks += [
+            ('index', (scope, start_date, end_date, None)),
+            ('employee', (employee_id, start_date, end_date)),
+            ('dashboard', (scope, month_start, month_end)),
+        ]
+    client_users = User.objects.filter(role='client', is_active=True).only('first_name', 'last_name', 'username')
+    for client_name in sorted({user.get_full_name() for user in client_users}):
+        scope = ('client', client_name)
+        tasks += [
+            ('index', (scope, start_date, end_date, None)),
+            ('client', (client_name, start_date, end_date)),
+            ('dashboard', (scope, month_start, month_end)),
+        ]
+    return tasks
@@ -0,0 +1,69 @@
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from reports import figures
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Compute and cache the default report and dashboard windows of every user (run from cron)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes; 1 computes everything in this process',
+        )
+    
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be >= 1')
+        
+        started = time.perf_counter()
+        # Read before computing, so nothing is stored under a newer version than it saw
+        version = figures.data_version()
+        tasks = figures.default_tasks()
+        
+        if workers == 1:
+            results = [figures.warm(name, args, version) for name, args in tasks]
+        else:
+            # Forked workers must not share this process's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                results = list(pool.map(
+                    figures.warm,
+                    [name for name, _ in tasks],
+                    [args for _, args in tasks],
+                    [version] * len(tasks),
+                    chunksize=max(1, len(tasks) // (workers * 4)),
+                ))
+        elapsed = time.perf_counter() - started
+        
+        timings = defaultdict(list)
+        for name, seconds in results:
+            if seconds is not None:
+                timings[name].append(seconds)
+        computed = sum(len(seconds) for seconds in timings.values())
+        
+        if options['verbosity'] > 1:
+            for name, seconds in sorted(timings.items()):
+                self.stdout.write(
+                    f"{name}: {len(seconds)} computed, {sum(seconds):.2f}s total, "
+                    f"slowest {max(seconds):.3f}s"
+                )
+        summary = (
+            f"Warmed {computed} of {len(tasks)} report caches in {elapsed:.2f}s "
+            f"with {workers} worker(s), data version {version}"
+        )
+        logger.info(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -8,5 +8,6 @@ urlpatterns = [
     path('employee/', views.EmployeeReportsView.as_view(), name='employee'),
     path('client/', views.ClientReportsView.as_view(), name='client'),
     path('supervisor/', views.SupervisorReportsView.as_view(), name='supervisor'),
+    path('utilization/', views.UtilizationHeatmapView.as_view(), name='utilization'),
     path('export/', views.ExportReportsView.as_view(), name='export'),
 ]
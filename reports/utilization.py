@@ -0,0 +1,186 @@
+"""
+Utilization heatmap: booked minutes per hour of the week
+
+Approved schedules in a date range are binned into the 168 hours of the week
+(Monday 00:00 first) per employee or per client. A bucket's booked minutes
+divided by the minutes that hour occurred in the range is its utilization;
+above 1 means overlapping bookings.
+
+Turning a year of schedules into Python rows costs far more than binning
+them, so the database returns one comma-separated string of packed
+``week_minute * PACK + duration`` values per employee or client and NumPy
+does everything else on whole arrays.
+"""
+import numpy as np
+from django.db import connections
+from django.db.models import Aggregate, TextField, Value
+from django.db.models.functions import Least
+
+from .analytics import WeekMinute
+
+WEEK_MINUTES = 7 * 24 * 60
+WEEK_HOURS = 7 * 24
+
+# A schedule starting late on Sunday ends in the next week, so intervals are
+# binned over two weeks and the second one is folded onto the first
+SPAN_HOURS = 2 * WEEK_HOURS
+
+# Durations are capped at a week and packed below the start minute
+PACK = 16384
+
+# Cell shading by utilization quartile; above 1 is overbooked
+LEVEL_CLASSES = (
+    'bg-white text-gray-400',
+    'bg-blue-100 text-blue-900',
+    'bg-blue-200 text-blue-900',
+    'bg-blue-400 text-white',
+    'bg-blue-600 text-white',
+    'bg-red-500 text-white',
+)
+
+DAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+# Fields a heatmap can be grouped by
+GROUP_FIELDS = {
+    'employee': 'employee_id',
+    'client': 'client_id',
+}
+
+
+class PackedList(Aggregate):
+    """Comma-separated integers of a group, in no particular order"""
+    function = 'GROUP_CONCAT'
+    output_field = TextField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="STRING_AGG((%(expressions)s)::text, ',')", **extra_context)
+
+
+def packed_intervals(queryset, by):
+    """
+    (ids, groups, starts, durations) arrays for the schedules of ``queryset``
+
+    ``ids`` holds the distinct employee or client ids; ``groups`` indexes into
+    it for every schedule, ``starts`` is its week minute.
+    """
+    field = GROUP_FIELDS[by]
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor in ('sqlite', 'postgresql'):
+        packed = WeekMinute('start_date', 'start_time') * Value(PACK) + Least('duration_minutes', Value(WEEK_MINUTES))
+        rows = list(queryset.values_list(field).annotate(packed=PackedList(packed)))
+        if not rows:
+            return (np.zeros(0, dtype=np.int64),) * 4
+        ids = np.array([pk for pk, _ in rows], dtype=np.int64)
+        values = np.array(','.join(text for _, text in rows).split(','), dtype=np.int64)
+        groups = np.repeat(np.arange(len(rows)), [text.count(',') + 1 for _, text in rows])
+        return ids, groups, values // PACK, values % PACK
+
+    # Other databases return plain rows and the offsets are computed here
+    rows = list(queryset.values_list(field, 'start_date', 'start_time', 'duration_minutes'))
+    if not rows:
+        return (np.zeros(0, dtype=np.int64),) * 4
+    pks, dates, times, durations = zip(*rows)
+    ids, groups = np.unique(np.array(pks, dtype=np.int64), return_inverse=True)
+    days = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+    minutes = np.array([t.hour * 60 + t.minute for t in times], dtype=np.int64)
+    starts = (days + 3) % 7 * 1440 + minutes
+    return ids, groups, starts, np.minimum(np.array(durations, dtype=np.int64), WEEK_MINUTES)
+
+
+def bin_week_hours(groups, starts, durations, count):
+    """
+    Booked minutes per group and hour of the week, shape (count, 168)
+
+    Up to hour boundary T an interval has booked ``clip(T - start, 0, duration)``
+    minutes, which is ``ramp(T - start) - ramp(T - end)``. Summed over a group,
+    ``ramp(T - x)`` is ``T * (number of x < T) - (sum of x < T)``, so two
+    bincounts and a cumulative sum per endpoint give every boundary at once.
+    """
+    size = count * SPAN_HOURS
+    boundaries = 60 * np.arange(1, SPAN_HOURS + 1)
+
+    def ramp_sums(points):
+        index = groups * SPAN_HOURS + points // 60
+        below = np.bincount(index, minlength=size).reshape(count, SPAN_HOURS).cumsum(axis=1)
+        total = np.bincount(index, weights=points, minlength=size).reshape(count, SPAN_HOURS).cumsum(axis=1)
+        return boundaries * below - total
+
+    booked = ramp_sums(starts) - ramp_sums(starts + durations)
+    minutes = np.diff(booked, axis=1, prepend=0)
+    return np.rint(minutes[:, :WEEK_HOURS] + minutes[:, WEEK_HOURS:]).astype(np.int64)
+
+
+def hour_capacity(start_date, end_date):
+    """Minutes each hour of the week occurs between two dates, inclusive"""
+    days = max((end_date - start_date).days + 1, 0)
+    weekdays = np.bincount((np.arange(days) + start_date.weekday()) % 7, minlength=7)
+    return np.repeat(weekdays * 60, 24)
+
+
+class Heatmap:
+    """Booked minutes per employee or client and hour of the week"""
+
+    def __init__(self, by, ids, minutes, capacity):
+        self.by = by
+        self.ids = ids
+        self.minutes = minutes
+        self.capacity = capacity
+
+    @property
+    def utilization(self):
+        """Booked share of every hour, shape (len(ids), 168)"""
+        return np.divide(self.minutes, self.capacity, out=np.zeros(self.minutes.shape), where=self.capacity > 0)
+
+    def overall(self):
+        """Average number of simultaneous bookings in each hour of the week"""
+        total = self.minutes.sum(axis=0)
+        return np.divide(total, self.capacity, out=np.zeros(WEEK_HOURS), where=self.capacity > 0)
+
+    def row(self, pk):
+        """Utilization of one employee or client, or None when it has no bookings"""
+        index = np.flatnonzero(self.ids == pk)
+        return self.utilization[index[0]] if len(index) else None
+
+    def ranking(self, limit=20):
+        """Busiest employees or clients by peak hour: (id, peak, overbooked hours, booked hours)"""
+        utilization = self.utilization
+        peaks = utilization.max(axis=1, initial=0)
+        overbooked = (utilization > 1).sum(axis=1)
+        booked = self.minutes.sum(axis=1)
+        order = np.lexsort((-booked, -peaks))[:limit]
+        return [
+            (int(self.ids[i]), float(peaks[i]), int(overbooked[i]), round(float(booked[i]) / 60, 2))
+            for i in order
+        ]
+
+
+def utilization_heatmap(queryset, start_date, end_date, by='employee'):
+    """Heatmap of the approved schedules of ``queryset`` starting between two dates"""
+    queryset = queryset.filter(status='approved', start_date__gte=start_date, start_date__lte=end_date)
+    ids, groups, starts, durations = packed_intervals(queryset, by)
+    minutes = bin_week_hours(groups, starts, durations, len(ids))
+    return Heatmap(by, ids, minutes, hour_capacity(start_date, end_date))
+
+
+def grid(values, relative=False):
+    """
+    Seven rows of 24 cells for the template, Monday first
+
+    Values are utilization shares; ``relative`` shades them against the
+    largest value instead, for grids that are not shares (like ``overall``).
+    """
+    peak = values.max(initial=0) if relative else 1.0
+    scaled = values / peak if peak else values
+    levels = np.ceil(np.clip(scaled, 0, 1) * 4).astype(int)
+    if not relative:
+        levels[values > 1] = len(LEVEL_CLASSES) - 1
+    return [
+        {
+            'name': name,
+            'cells': [
+                {'hour': hour, 'value': round(float(values[day * 24 + hour]), 2), 'css': LEVEL_CLASSES[levels[day * 24 + hour]]}
+                for hour in range(24)
+            ],
+        }
+        for day, name in enumerate(DAY_NAMES)
+    ]
@@ -1,216 +1,209 @@
 from django.shortcuts import render
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import TemplateView
-from django.db.models import Count, Sum, Q
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.utils.dateparse import parse_date
+from asgiref.sync import sync_to_async
 from datetime import datetime, timedelta
+from accounts.mixins import AsyncLoginRequiredMixin
 from schedules.models import Schedule
+from schedules.archive import schedules_for_range
 from clients.models import Client
 from accounts.models import User
+from . import figures
+from .utilization import GROUP_FIELDS, grid, utilization_heatmap
 
 
-class ReportsIndexView(LoginRequiredMixin, TemplateView):
-    """Main reports index view"""
+class ReportsIndexView(AsyncLoginRequiredMixin, TemplateView):
+    """Main reports index view (async)"""
     template_name = 'reports/index.html'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
         
         # Get date range from filters
-        start_date = self.request.GET.get('start_date')
-        end_date = self.request.GET.get('end_date')
-        status_filter = self.request.GET.get('status')
+        start_date = request.GET.get('start_date')
+        end_date = request.GET.get('end_date')
+        status_filter = request.GET.get('status') or None
+        default_start, default_end = figures.default_window()
         
         if start_date:
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
         else:
-            start_date = datetime.now().date() - timedelta(days=30)
+            start_date = default_start
             
         if end_date:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
         else:
-            end_date = datetime.now().date()
+            end_date = default_end
         
         # Get schedules based on user role and filters
-        schedules = Schedule.objects.filter(
-            start_date__gte=start_date,
-            start_date__lte=end_date
-        ).select_related('employee', 'client', 'approved_by')
-        
-        if self.request.user.is_employee:
-            schedules = schedules.filter(employee=self.request.user)
-        elif self.request.user.is_client:
-            schedules = schedules.filter(client__name=self.request.user.get_full_name())
-        
+        scope = figures.user_scope(request.user)
+        schedules = await sync_to_async(figures.window_schedules)(scope, start_date, end_date)
         if status_filter:
             schedules = schedules.filter(status=status_filter)
         
-        # Calculate summary statistics
-        total_schedules = schedules.count()
-        approved_schedules = schedules.filter(status='approved').count()
-        pending_schedules = schedules.filter(status__in=['submitted', 'draft']).count()
-        total_hours = sum(schedule.duration_hours for schedule in schedules.filter(status='approved'))
-        
-        # Status distribution
-        status_distribution = {}
-        for status, _ in Schedule.STATUS_CHOICES:
-            count = schedules.filter(status=status).count()
-            if count > 0:
-                status_distribution[status] = count
+        # Summary statistics, status distribution and monthly hours are cached figures
+        report = await sync_to_async(figures.cached)('index', scope, start_date, end_date, status_filter)
+        recent_schedules = await sync_to_async(list)(schedules.select_related('employee', 'client', 'approved_by').order_by('-created_at')[:10])
         
         # Monthly hours (last 6 months)
+        minutes_by_month = report['minutes_by_month']
         monthly_hours = {}
         for i in range(6):
             month_date = datetime.now().date().replace(day=1) - timedelta(days=30*i)
-            month_schedules = schedules.filter(
-                start_date__year=month_date.year,
-                start_date__month=month_date.month,
-                status='approved'
-            )
-            month_hours = sum(schedule.duration_hours for schedule in month_schedules)
+            month_hours = figures.hours(minutes_by_month.get((month_date.year, month_date.month)))
             if month_hours > 0:
                 monthly_hours[month_date.strftime('%B %Y')] = month_hours
         
-        # Recent schedules (last 10)
-        recent_schedules = schedules.order_by('-created_at')[:10]
-        
         context.update({
-            'user_role': self.request.user.role,
-            'total_schedules': total_schedules,
-            'approved_schedules': approved_schedules,
-            'pending_schedules': pending_schedules,
-            'total_hours': total_hours,
-            'status_distribution': status_distribution,
+            'user_role': request.user.role,
+            'total_schedules': report['total_schedules'],
+            'approved_schedules': report['approved_schedules'],
+            'pending_schedules': report['pending_schedules'],
+            'total_hours': report['total_hours'],
+            'status_distribution': report['status_distribution'],
             'monthly_hours': monthly_hours,
             'recent_schedules': recent_schedules,
         })
         
-        return context
+        return self.render_to_response(context)
 
 
-class EmployeeReportsView(LoginRequiredMixin, TemplateView):
-    """Employee reports view"""
+class EmployeeReportsView(AsyncLoginRequiredMixin, TemplateView):
+    """Employee reports view (async)"""
     template_name = 'reports/employee.html'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
         
-        # Get date range
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=30)  # Last 30 days
+        # Last 30 days
+        start_date, end_date = figures.default_window()
         
         # Get employee's schedules
-        schedules = Schedule.objects.filter(
-            employee=self.request.user,
-            start_date__gte=start_date,
-            start_date__lte=end_date
-        ).select_related('client')
+        schedules = await sync_to_async(figures.window_schedules)(('employee', request.user.pk), start_date, end_date)
         
-        context['schedules'] = schedules
-        context['total_hours'] = sum(schedule.duration_hours for schedule in schedules.filter(status='approved'))
+        # Hours by client, total hours and status breakdown are cached figures
+        context['schedules'] = await sync_to_async(list)(schedules.select_related('client'))
+        report = await sync_to_async(figures.cached)('employee', request.user.pk, start_date, end_date)
+        context.update(report)
         
-        # Hours by client
-        hours_by_client = {}
-        for schedule in schedules.filter(status='approved'):
-            client_name = schedule.client.name
-            if client_name not in hours_by_client:
-                hours_by_client[client_name] = 0
-            hours_by_client[client_name] += schedule.duration_hours
-        
-        context['hours_by_client'] = hours_by_client
-        
-        # Status breakdown
-        status_breakdown = {}
-        for status, _ in Schedule.STATUS_CHOICES:
-            count = schedules.filter(status=status).count()
-            status_breakdown[status] = count
-        
-        context['status_breakdown'] = status_breakdown
-        
-        return context
+        return self.render_to_response(context)
 
 
-class ClientReportsView(LoginRequiredMixin, TemplateView):
-    """Client reports view"""
+class ClientReportsView(AsyncLoginRequiredMixin, TemplateView):
+    """Client reports view (async)"""
     template_name = 'reports/client.html'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
         
-        # Get date range
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=30)  # Last 30 days
+        # Last 30 days
+        start_date, end_date = figures.default_window()
         
         # Get client's schedules
-        schedules = Schedule.objects.filter(
-            client__name=self.request.user.get_full_name(),
-            start_date__gte=start_date,
-            start_date__lte=end_date
-        ).select_related('employee', 'client')
-        
-        context['schedules'] = schedules
-        context['total_hours'] = sum(schedule.duration_hours for schedule in schedules.filter(status='approved'))
+        client_name = request.user.get_full_name()
+        schedules = await sync_to_async(figures.window_schedules)(('client', client_name), start_date, end_date)
         
-        # Hours by employee
-        hours_by_employee = {}
-        for schedule in schedules.filter(status='approved'):
-            employee_name = schedule.employee.get_full_name()
-            if employee_name not in hours_by_employee:
-                hours_by_employee[employee_name] = 0
-            hours_by_employee[employee_name] += schedule.duration_hours
+        # Hours by employee (keyed like User.get_full_name()) and total hours are cached figures
+        context['schedules'] = await sync_to_async(list)(schedules.select_related('employee', 'client'))
+        report = await sync_to_async(figures.cached)('client', client_name, start_date, end_date)
+        context.update(report)
         
-        context['hours_by_employee'] = hours_by_employee
-        
-        return context
+        return self.render_to_response(context)
 
 
-class SupervisorReportsView(LoginRequiredMixin, TemplateView):
-    """Supervisor reports view"""
+class SupervisorReportsView(AsyncLoginRequiredMixin, TemplateView):
+    """Supervisor reports view (async)"""
     template_name = 'reports/supervisor.html'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
         
-        # Get date range
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=30)  # Last 30 days
+        # Last 30 days
+        start_date, end_date = figures.default_window()
         
         # Get all schedules
-        schedules = Schedule.objects.filter(
-            start_date__gte=start_date,
-            start_date__lte=end_date
-        ).select_related('employee', 'client', 'approved_by')
+        schedules = await sync_to_async(figures.window_schedules)(('all',), start_date, end_date)
         
-        context['schedules'] = schedules
-        context['total_hours'] = sum(schedule.duration_hours for schedule in schedules.filter(status='approved'))
+        # Total hours, employee performance, status breakdown and client distribution are cached figures
+        context['schedules'] = await sync_to_async(list)(schedules.select_related('employee', 'client', 'approved_by'))
+        report = await sync_to_async(figures.cached)('supervisor', start_date, end_date)
+        context.update(report)
         
-        # Employee performance
-        employee_stats = schedules.values('employee__first_name', 'employee__last_name').annotate(
-            total_schedules=Count('id'),
-            approved_schedules=Count('id', filter=Q(status='approved')),
-            pending_schedules=Count('id', filter=Q(status='submitted')),
-            rejected_schedules=Count('id', filter=Q(status='rejected')),
-        ).order_by('-total_schedules')
-        
-        context['employee_stats'] = employee_stats
-        
-        # Status breakdown
-        status_breakdown = {}
-        for status, _ in Schedule.STATUS_CHOICES:
-            count = schedules.filter(status=status).count()
-            status_breakdown[status] = count
-        
-        context['status_breakdown'] = status_breakdown
-        
-        # Client distribution
-        client_stats = schedules.values('client__name').annotate(
-            total_schedules=Count('id'),
-            approved_schedules=Count('id', filter=Q(status='approved')),
-        ).order_by('-total_schedules')
+        return self.render_to_response(context)
+
+
+class UtilizationHeatmapView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Booked share of every hour of the week per employee or client (supervisors only)"""
+    template_name = 'reports/utilization.html'
+    
+    # Default range: the last twelve full weeks up to today
+    DEFAULT_WEEKS = 12
+    
+    def test_func(self):
+        return self.request.user.is_supervisor
+    
+    def get(self, request, *args, **kwargs):
+        end_date = datetime.now().date()
+        if request.GET.get('end_date'):
+            end_date = parse_date(request.GET['end_date'])
+        start_date = end_date - timedelta(weeks=self.DEFAULT_WEEKS) + timedelta(days=1) if end_date else None
+        if request.GET.get('start_date'):
+            start_date = parse_date(request.GET['start_date'])
+        if start_date is None or end_date is None or start_date > end_date:
+            return HttpResponseBadRequest('Invalid date range, expected ISO start_date <= end_date')
+        
+        by = request.GET.get('by', 'employee')
+        if by not in GROUP_FIELDS:
+            return HttpResponseBadRequest('"by" must be employee or client')
+        
+        heatmap = utilization_heatmap(schedules_for_range(start_date), start_date, end_date, by)
+        
+        if request.GET.get('format') == 'json':
+            return JsonResponse({
+                'by': by,
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'capacity_minutes': heatmap.capacity.tolist(),
+                'ids': heatmap.ids.tolist(),
+                'booked_minutes': heatmap.minutes.tolist(),
+            })
+        
+        ranking = heatmap.ranking()
+        names = self.names(by, [pk for pk, *_ in ranking] + [self.selected_id()])
+        
+        context = self.get_context_data(**kwargs)
+        context.update({
+            'by': by,
+            'start_date': start_date,
+            'end_date': end_date,
+            'overall': grid(heatmap.overall(), relative=True),
+            'hours': range(24),
+            'ranking': [
+                {'id': pk, 'name': names.get(pk, pk), 'peak': round(peak * 100), 'overbooked': overbooked, 'hours': booked}
+                for pk, peak, overbooked, booked in ranking
+            ],
+        })
         
-        context['client_stats'] = client_stats
+        selected = self.selected_id()
+        if selected is not None:
+            row = heatmap.row(selected)
+            context['selected_name'] = names.get(selected, selected)
+            context['selected'] = grid(row) if row is not None else None
         
-        return context
+        return self.render_to_response(context)
+    
+    def selected_id(self):
+        """Employee or client picked for the drill-down grid, if any"""
+        value = self.request.GET.get('id', '')
+        return int(value) if value.isdigit() else None
+    
+    def names(self, by, ids):
+        """{id: display name} of the given employees or clients"""
+        if by == 'client':
+            return dict(Client.objects.filter(pk__in=ids).values_list('id', 'name'))
+        return {employee.pk: employee.get_full_name() or employee.username for employee in User.objects.filter(pk__in=ids)}
 
 
 class ExportReportsView(LoginRequiredMixin, TemplateView):
@@ -237,19 +230,19 @@ class ExportReportsView(LoginRequiredMixin, TemplateView):
         
         # Get schedules based on user role
         if request.user.is_employee:
-            schedules = Schedule.objects.filter(
+            schedules = schedules_for_range(start_date).filter(
                 employee=request.user,
                 start_date__gte=start_date,
                 start_date__lte=end_date
             ).select_related('client')
         elif request.user.is_client:
-            schedules = Schedule.objects.filter(
+            schedules = schedules_for_range(start_date).filter(
                 client__name=request.user.get_full_name(),
                 start_date__gte=start_date,
                 start_date__lte=end_date
             ).select_related('employee', 'client')
         else:  # supervisor
-            schedules = Schedule.objects.filter(
+            schedules = schedules_for_range(start_date).filter(
                 start_date__gte=start_date,
                 start_date__lte=end_date
             ).select_related('employee', 'client', 'approved_by')
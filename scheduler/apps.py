@@ -0,0 +1,9 @@
+from django.contrib.staticfiles.apps import StaticFilesConfig as BaseStaticFilesConfig
+
+
+class StaticFilesConfig(BaseStaticFilesConfig):
+    """Staticfiles app that leaves build inputs out of collectstatic"""
+    
+    # The Tailwind source only feeds ``npm run build-css``; its bare
+    # ``@import "tailwindcss"`` would also break the hashed-name rewriting
+    ignore_patterns = BaseStaticFilesConfig.ignore_patterns + ['css/input.css']
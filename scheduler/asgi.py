@@ -3,6 +3,14 @@ ASGI config for scheduler project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Long-lived endpoints such as the schedule status stream
+(``schedules:events``) are async views and should be served from here,
+e.g. ``uvicorn scheduler.asgi:application``, so idle connections do not each
+hold a worker thread. The read-heavy HTMX endpoints (dashboard, calendar
+month, table data, reports) are async as well and await their queries.
+Static files are answered before the middleware chain (scheduler/staticfiles.py),
+which keeps the chain async.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -11,6 +19,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from .staticfiles import ASGIStaticFiles
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scheduler.settings')
 
-application = get_asgi_application()
+application = ASGIStaticFiles(get_asgi_application())
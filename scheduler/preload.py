@@ -0,0 +1,60 @@
+"""
+Warm a server process before it forks its workers
+
+With gunicorn's ``preload_app`` the app is loaded once in the master and
+workers are forked from it (see gunicorn.conf.py). ``warm()`` then also does
+the work a worker would otherwise repeat on its first requests: importing
+every view through the URLconf (NumPy and the report code included) and
+compiling the project's templates into the cached template loader. Forked
+workers share those memory pages with the master until they write to them.
+
+``warm()`` ends with ``gc.freeze()``: objects created so far move to a
+permanent generation, so the workers' garbage collections never write to
+them (and so never copy their pages).
+"""
+import gc
+from pathlib import Path
+
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import URLResolver, get_resolver
+
+# Template files compiled ahead of time
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def import_views(resolver=None):
+    """Import the URLconf and every view it routes to; returns the number of patterns"""
+    count = 0
+    for pattern in (resolver or get_resolver()).url_patterns:
+        count += import_views(pattern) if isinstance(pattern, URLResolver) else 1
+    return count
+
+
+def compile_templates():
+    """Compile the templates under the engines' DIRS into their cached loaders; returns how many"""
+    compiled = 0
+    for engine in engines.all():
+        for directory in engine.engine.dirs:
+            directory = Path(directory)
+            for path in sorted(directory.rglob('*')):
+                if path.suffix not in TEMPLATE_SUFFIXES:
+                    continue
+                try:
+                    engine.get_template(path.relative_to(directory).as_posix())
+                except TemplateSyntaxError:
+                    # e.g. demo pages loading tag libraries of apps not installed here
+                    continue
+                compiled += 1
+    return compiled
+
+
+def warm():
+    """Import views, compile templates and freeze the collector; returns (patterns, templates)"""
+    patterns = import_views()
+    templates = compile_templates()
+    # Connections must not be shared with forked workers
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+    return patterns, templates
@@ -29,6 +29,9 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 
 ALLOWED_HOSTS = ['*']
 
+# Serve the UI library demo pages (see scheduler/urls.py)
+DEMO_PAGES = config('DEMO_PAGES', default=True, cast=bool)
+
 
 # Application definition
 
@@ -38,7 +41,9 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    # Serve static files through WhiteNoise under runserver too, as in production
+    'whitenoise.runserver_nostatic',
+    'scheduler.apps.StaticFilesConfig',
     
     # Third party apps
     'rest_framework',
@@ -54,8 +59,11 @@ INSTALLED_APPS = [
     'schedules',
     'clients',
     'reports',
+    'notifications',
+    'monitoring',
 ]
 
+# Static files are served before this chain runs (scheduler/staticfiles.py)
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -63,6 +71,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'monitoring.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
@@ -152,6 +161,29 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# collectstatic writes content-hashed copies plus .gz/.br variants, which
+# WhiteNoise serves with far-future immutable cache headers. Development
+# serves the source files directly, so collectstatic is not needed there.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Only the hashed copies are needed once collectstatic has run
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
+
+# Follow the configured DEBUG, not the test runner's, so development and
+# tests serve from the finders instead of expecting collectstatic output
+WHITENOISE_AUTOREFRESH = DEBUG
+WHITENOISE_USE_FINDERS = DEBUG
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -194,14 +226,43 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 
-# Cache Configuration (optional - using database sessions by default)
-# CACHE_TTL = 60 * 15  # 15 minutes
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-#         'LOCATION': config('REDIS_URL', default='redis://localhost:6379/1'),
-#     }
-# }
+# Cache Configuration
+# Report figures are cached (see reports/figures.py) and warmed by
+# ``manage.py warm_report_cache`` from another process, so the cache has to be
+# shared: Redis when REDIS_URL is set (needs the redis package), otherwise
+# files on this host
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=str(BASE_DIR / '.cache')),
+        }
+    }
+
+# Cached report figures are keyed by data version, so this only bounds how
+# long renamed employees or clients can show their old names
+REPORT_CACHE_TIMEOUT = config('REPORT_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# Request profiling (see monitoring/profiling.py): staff add "X-Profile: 1" or
+# ?profile=1 to a request; others are profiled at PROFILING_SAMPLE_RATE (0-1).
+# PROFILING_ENABLED=False takes the middleware out of the chain.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=True, cast=bool)
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_KEEP = config('PROFILING_KEEP', default=500, cast=int)
+
+# SELECTs slower than SLOW_QUERY_MS are logged with their EXPLAIN plan to
+# SLOW_QUERY_LOG (0 turns the log off); see monitoring/slowqueries.py
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=0, cast=float)
+SLOW_QUERY_LOG = config('SLOW_QUERY_LOG', default=str(BASE_DIR / 'profiles' / 'slow_queries.jsonl'))
 
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
@@ -210,6 +271,15 @@ EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='scheduler@localhost')
+
+# Scheduling rules (see schedules/rules.py)
+SCHEDULE_MIN_GAP_MINUTES = config('SCHEDULE_MIN_GAP_MINUTES', default=30, cast=int)
+SCHEDULE_MAX_DAILY_HOURS = config('SCHEDULE_MAX_DAILY_HOURS', default=12, cast=int)
+SCHEDULE_MAX_WEEKLY_HOURS = config('SCHEDULE_MAX_WEEKLY_HOURS', default=40, cast=int)
+
+# Closed schedules that ended this many days ago move to the archive (see schedules/archive.py)
+SCHEDULE_ARCHIVE_AFTER_DAYS = config('SCHEDULE_ARCHIVE_AFTER_DAYS', default=365, cast=int)
 
 # Login/Logout URLs
 LOGIN_URL = '/accounts/login/'
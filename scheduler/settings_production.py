@@ -0,0 +1,64 @@
+"""
+Production settings
+
+    DJANGO_SETTINGS_MODULE=scheduler.settings_production
+
+Everything in settings.py, minus what only development needs: debug mode,
+the UI demo pages, django_extensions, the crispy forms packs (no template
+uses them) and WhiteNoise's runserver hook. The simplejwt app is dropped as
+well: it has no models or templates, and importing its app config costs
+about 0.2 s per process (it loads pkg_resources). JWTAuthentication is still
+configured in REST_FRAMEWORK and is imported by DRF on first use.
+
+SECRET_KEY and ALLOWED_HOSTS (comma-separated) must be set in the
+environment. gunicorn.conf.py serves this profile with preloaded workers.
+"""
+from decouple import Csv, config
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, STORAGES, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = config('SECRET_KEY')
+
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', cast=Csv())
+
+DEMO_PAGES = False
+
+# Apps left out of production processes
+EXCLUDED_APPS = (
+    'whitenoise.runserver_nostatic',
+    'django_extensions',
+    'crispy_forms',
+    'crispy_tailwind',
+    'rest_framework_simplejwt',
+)
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in EXCLUDED_APPS]
+
+# settings.py derives these from the environment's DEBUG, so set them again
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+WHITENOISE_AUTOREFRESH = False
+WHITENOISE_USE_FINDERS = False
+
+# The debug context processor only adds anything with DEBUG on
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'context_processors': [
+                processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+                if processor != 'django.template.context_processors.debug'
+            ],
+        },
+    },
+]
+
+SESSION_COOKIE_SECURE = config('SECURE_COOKIES', default=True, cast=bool)
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
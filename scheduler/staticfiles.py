@@ -0,0 +1,81 @@
+"""
+Static files served in front of Django's handlers
+
+WhiteNoise's Django middleware is sync-only. Anywhere in MIDDLEWARE it makes
+the ASGI handler run every async view behind a sync adapter, one thread hop
+per request. So it is not installed; ``asgi.py`` and ``wsgi.py`` wrap their
+application instead, and requests under STATIC_URL are answered before the
+middleware chain runs. The files, headers and settings are WhiteNoise's own:
+a ``WhiteNoiseMiddleware`` instance is only used as the file table.
+
+The table is built when the application is created, so a preloaded gunicorn
+master builds it once for all its workers.
+"""
+from wsgiref.util import FileWrapper
+
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.string_utils import decode_path_info
+
+# Bytes read from a file per ASGI body message
+CHUNK_SIZE = 64 * 1024
+
+
+class StaticFiles:
+    def __init__(self, application):
+        self.application = application
+        self.whitenoise = WhiteNoiseMiddleware()
+
+    def find(self, path):
+        """WhiteNoise's file for a request path, or None"""
+        if not path.startswith(self.whitenoise.static_prefix):
+            return None
+        if self.whitenoise.autorefresh:
+            return self.whitenoise.find_file(path)
+        return self.whitenoise.files.get(path)
+
+
+class ASGIStaticFiles(StaticFiles):
+    """ASGI application serving static files and passing everything else on"""
+
+    async def __call__(self, scope, receive, send):
+        static_file = self.find(scope['path']) if scope['type'] == 'http' else None
+        if static_file is None:
+            await self.application(scope, receive, send)
+            return
+
+        headers = {
+            'HTTP_' + name.decode('latin-1').upper().replace('-', '_'): value.decode('latin-1')
+            for name, value in scope['headers']
+        }
+        response = static_file.get_response(scope['method'], headers)
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers],
+        })
+        if response.file is None:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        # Small files the page cache already holds; reading them inline is
+        # cheaper than handing each chunk to a thread
+        with response.file as file:
+            while True:
+                chunk = file.read(CHUNK_SIZE)
+                more = len(chunk) == CHUNK_SIZE
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+                if not more:
+                    return
+
+
+class WSGIStaticFiles(StaticFiles):
+    """WSGI application serving static files and passing everything else on"""
+
+    def __call__(self, environ, start_response):
+        static_file = self.find(decode_path_info(environ.get('PATH_INFO', '')))
+        if static_file is None:
+            return self.application(environ, start_response)
+        response = static_file.get_response(environ['REQUEST_METHOD'], environ)
+        start_response(f'{response.status.value} {response.status.phrase}', list(response.headers))
+        if response.file is None:
+            return []
+        return FileWrapper(response.file)
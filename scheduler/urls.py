@@ -20,17 +20,20 @@ urlpatterns = [
     
     # Root redirect to dashboard
     path('', RedirectView.as_view(url='/dashboard/', permanent=False)),
-    
-    # Demo page
-    path('demo/', TemplateView.as_view(template_name='demo.html'), name='demo'),
-    # Demo page for shadcn-django components
-    path('shadcn-demo/', TemplateView.as_view(template_name='shadcn_demo.html'), name='shadcn_demo'),
-    path('basecoat-demo/', TemplateView.as_view(template_name='basecoat_demo.html'), name='basecoat_demo'),
-    path('tailwind-demo/', TemplateView.as_view(template_name='tailwind_demo.html'), name='tailwind_demo'),
-    path('bootstrap-demo/', TemplateView.as_view(template_name='bootstrap_demo.html'), name='bootstrap_demo'),
 ]
 
-# Serve static and media files in development
+# UI library demo pages (off in settings_production)
+if settings.DEMO_PAGES:
+    urlpatterns += [
+        path('demo/', TemplateView.as_view(template_name='demo.html'), name='demo'),
+        # Demo page for shadcn-django components
+        path('shadcn-demo/', TemplateView.as_view(template_name='shadcn_demo.html'), name='shadcn_demo'),
+        path('basecoat-demo/', TemplateView.as_view(template_name='basecoat_demo.html'), name='basecoat_demo'),
+        path('tailwind-demo/', TemplateView.as_view(template_name='tailwind_demo.html'), name='tailwind_demo'),
+        path('bootstrap-demo/', TemplateView.as_view(template_name='bootstrap_demo.html'), name='bootstrap_demo'),
+    ]
+
+# Serve media files in development; static files are served by WhiteNoise
+# in front of the application (scheduler/staticfiles.py)
 if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
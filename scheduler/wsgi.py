@@ -2,6 +2,7 @@
 WSGI config for scheduler project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Static files are answered before Django's handler (scheduler/staticfiles.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
@@ -11,6 +12,8 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from .staticfiles import WSGIStaticFiles
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scheduler.settings')
 
-application = get_wsgi_application()
+application = WSGIStaticFiles(get_wsgi_application())
@@ -1,6 +1,59 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import Schedule, ScheduleConflict
+from . import search
+from .models import (
+    ArchivedSchedule, ConcurrentUpdateError, EventCursor, Schedule, ScheduleConflict, ScheduleEvent,
+    ScheduleRecurrence, ScheduleRecurrenceException,
+)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs a full COUNT(*) over a big table
+    
+    An unfiltered changelist uses the planner's row estimate: reltuples on
+    PostgreSQL, sqlite_stat1 on SQLite (both refreshed by ANALYZE). Without
+    one, and for filtered changelists, at most COUNT_LIMIT rows are counted;
+    past that the page links stop at the limit and the filters or search
+    should be narrowed instead.
+    """
+    
+    COUNT_LIMIT = 10000
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self.estimate(queryset.model)
+            if estimate is not None and estimate > self.COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+    
+    def estimate(self, model):
+        """Approximate row count of ``model``'s table, or None when unknown"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+                row = cursor.fetchone()
+            # reltuples is -1 (or 0) until the table is first analyzed
+            if row and row[0] > 0:
+                return int(row[0])
+            return None
+        if connection.vendor == 'sqlite':
+            # The first number of an index's stat is the table's row count
+            with connection.cursor() as cursor:
+                try:
+                    cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [model._meta.db_table])
+                except DatabaseError:
+                    # No sqlite_stat1 until the database is first analyzed
+                    return None
+                row = cursor.fetchone()
+            if row and row[0]:
+                return int(row[0].split()[0])
+        return None
 
 
 @admin.register(Schedule)
@@ -8,10 +61,15 @@ class ScheduleAdmin(admin.ModelAdmin):
     """Schedule admin configuration"""
     
     list_display = ('employee', 'client', 'start_date', 'start_time', 'end_date', 'end_time', 'status_badge', 'duration_hours', 'created_at')
-    list_filter = ('status', 'employee__role', 'client', 'start_date', 'created_at')
+    # Only filters whose choices need no queries; find a client with the search box
+    list_filter = ('status', 'employee__role', 'start_date', 'created_at')
     search_fields = ('employee__first_name', 'employee__last_name', 'client__name', 'notes')
-    ordering = ('-created_at',)
-    date_hierarchy = 'start_date'
+    # Newest first by primary key, which is indexed, unlike created_at
+    ordering = ('-id',)
+    autocomplete_fields = ('employee', 'client', 'approved_by')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('approve_selected', 'reject_selected')
     
     fieldsets = (
         ('Schedule Information', {
@@ -28,6 +86,13 @@ class ScheduleAdmin(admin.ModelAdmin):
     
     readonly_fields = ('created_at', 'updated_at', 'submitted_at', 'approved_at')
     
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index (best matches only) instead of icontains scans
+        ids = search.ranked_ids(search_term, queryset=queryset)
+        if ids is None or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids), False
+    
     def status_badge(self, obj):
         """Display status as colored badge"""
         colors = {
@@ -48,6 +113,36 @@ class ScheduleAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('employee', 'client', 'approved_by')
     
+    def has_approve_permission(self, request):
+        # The same check as Schedule.approve() and the approval views
+        return request.user.is_supervisor
+    
+    def transition_selected(self, request, queryset, to_status, transition):
+        """Apply ``transition`` to the submitted schedules in ``queryset`` one by one"""
+        done = skipped = 0
+        for schedule in queryset.filter(status='submitted').iterator(chunk_size=500):
+            try:
+                transition(schedule)
+            except ConcurrentUpdateError:
+                skipped += 1
+            else:
+                done += 1
+        
+        self.message_user(request, f"{done} schedule(s) {to_status}.", messages.SUCCESS)
+        if skipped:
+            self.message_user(request, f"{skipped} schedule(s) were changed by someone else and were skipped.", messages.WARNING)
+    
+    @admin.action(description='Approve selected submitted schedules', permissions=['approve'])
+    def approve_selected(self, request, queryset):
+        self.transition_selected(request, queryset, 'approved', lambda schedule: schedule.approve(request.user))
+    
+    @admin.action(description='Reject selected submitted schedules', permissions=['approve'])
+    def reject_selected(self, request, queryset):
+        self.transition_selected(
+            request, queryset, 'rejected',
+            lambda schedule: schedule.reject(request.user, 'Rejected from the admin'),
+        )
+    
     def get_readonly_fields(self, request, obj=None):
         """Make certain fields read-only based on user role"""
         readonly_fields = list(self.readonly_fields)
@@ -67,9 +162,76 @@ class ScheduleConflictAdmin(admin.ModelAdmin):
     list_filter = ('conflict_type', 'created_at')
     search_fields = ('schedule__employee__first_name', 'schedule__employee__last_name', 'schedule__client__name')
     ordering = ('-created_at',)
+    raw_id_fields = ('schedule', 'conflicting_schedule')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'schedule__employee', 'schedule__client',
             'conflicting_schedule__employee', 'conflicting_schedule__client'
-        )
\ No newline at end of file
+        )
+
+
+class ScheduleRecurrenceExceptionInline(admin.TabularInline):
+    """Skipped dates shown on the recurrence page"""
+    
+    model = ScheduleRecurrenceException
+    extra = 0
+
+
+@admin.register(ScheduleRecurrence)
+class ScheduleRecurrenceAdmin(admin.ModelAdmin):
+    """Recurring schedule admin configuration"""
+    
+    list_display = ('employee', 'client', 'weekday_names', 'start_time', 'end_time', 'starts_on', 'ends_on', 'is_active')
+    list_filter = ('is_active', 'starts_on')
+    search_fields = ('employee__first_name', 'employee__last_name', 'client__name', 'notes')
+    ordering = ('-created_at',)
+    autocomplete_fields = ('employee', 'client')
+    inlines = [ScheduleRecurrenceExceptionInline]
+
+
+@admin.register(ArchivedSchedule)
+class ArchivedScheduleAdmin(admin.ModelAdmin):
+    """Read-only view of the schedule archive"""
+    
+    list_display = ('id', 'employee', 'client', 'start_date', 'status', 'duration_minutes', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('employee__first_name', 'employee__last_name', 'client__name')
+    list_select_related = ('employee', 'client')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ScheduleEvent)
+class ScheduleEventAdmin(admin.ModelAdmin):
+    """Read-only view of the schedule event log"""
+    
+    list_display = ('id', 'schedule_id', 'kind', 'previous_status', 'status', 'version', 'actor_id', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('=schedule_id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EventCursor)
+class EventCursorAdmin(admin.ModelAdmin):
+    """Event log consumers and how far each has read"""
+    
+    list_display = ('name', 'position', 'updated_at')
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class SchedulesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'schedules'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .archive import create_history_view, drop_history_view
+        
+        pre_migrate.connect(drop_history_view, sender=self)
+        post_migrate.connect(create_history_view, sender=self)
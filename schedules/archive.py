@@ -0,0 +1,134 @@
+"""
+Archive tier for closed schedules
+
+Approved and rejected schedules that ended before the archive horizon are
+moved from ``schedules`` to ``archived_schedules`` in small transactions,
+keeping the hot table (and its indexes) sized to the working set. Reports
+and exports read through ``schedules_for_range``, which switches to the
+``schedule_history`` union view only when a range reaches archived dates.
+
+Archiving is bookkeeping, not a change to the schedules, so the hot rows are
+removed with a plain DELETE that sends no signals: no event log entries, and
+the search documents of a batch are dropped in one statement. Delta sync
+never reports an archived schedule as deleted, so mirrors keep them. Conflict records involving an archived schedule
+are deleted with it, on purpose: they only matter while a schedule can
+still change.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search
+from .models import ArchivedSchedule, Schedule, ScheduleConflict, ScheduleHistory, ScheduleRecurrenceException
+
+# Statuses that can no longer change
+ARCHIVABLE_STATUSES = ('approved', 'rejected')
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'SCHEDULE_ARCHIVE_AFTER_DAYS', 365)
+
+# Columns copied verbatim from the hot row
+ARCHIVE_FIELDS = (
+    'id', 'employee_id', 'client_id', 'start_date', 'start_time', 'end_date',
+    'end_time', 'status', 'notes', 'submitted_at', 'approved_by_id',
+    'approved_at', 'rejection_reason', 'duration_minutes', 'created_at',
+    'updated_at',
+)
+
+
+# The view is dropped before and recreated after every ``migrate`` (see
+# SchedulesConfig.ready), so migrations that rebuild ``schedules`` never
+# trip over it and it always matches the current columns.
+HISTORY_VIEW = 'schedule_history'
+
+HISTORY_COLUMNS = ', '.join(ARCHIVE_FIELDS)
+
+
+def drop_history_view(using='default', **kwargs):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DROP VIEW IF EXISTS {HISTORY_VIEW}')
+
+
+def create_history_view(using='default', **kwargs):
+    connection = connections[using]
+    tables = connection.introspection.table_names()
+    if Schedule._meta.db_table not in tables or ArchivedSchedule._meta.db_table not in tables:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP VIEW IF EXISTS {HISTORY_VIEW}')
+        cursor.execute(
+            f'CREATE VIEW {HISTORY_VIEW} AS '
+            f'SELECT {HISTORY_COLUMNS}, FALSE AS is_archived FROM {Schedule._meta.db_table} '
+            f'UNION ALL '
+            f'SELECT {HISTORY_COLUMNS}, TRUE AS is_archived FROM {ArchivedSchedule._meta.db_table}'
+        )
+
+
+def archive_cutoff(older_than_days=ARCHIVE_AFTER_DAYS):
+    """Schedules ending before this date are eligible for archiving"""
+    return timezone.now().date() - timedelta(days=older_than_days)
+
+
+def archive_batch(cutoff, batch_size=500):
+    """
+    Move up to ``batch_size`` closed schedules ending before ``cutoff``
+
+    Runs in one transaction, so a batch is either fully archived or not at
+    all. Returns the number of schedules moved.
+    """
+    with transaction.atomic():
+        rows = list(
+            Schedule.objects
+            .select_for_update(skip_locked=True)
+            .filter(status__in=ARCHIVABLE_STATUSES, end_date__lt=cutoff)
+            .order_by('id')
+            .values('recurrence_id', 'recurrence_date', *ARCHIVE_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        # Keep recurrences from re-expanding dates whose schedule moved away
+        ScheduleRecurrenceException.objects.bulk_create(
+            [
+                ScheduleRecurrenceException(recurrence_id=row['recurrence_id'], date=row['recurrence_date'])
+                for row in rows if row['recurrence_id'] and row['recurrence_date']
+            ],
+            ignore_conflicts=True,
+        )
+        for row in rows:
+            del row['recurrence_id'], row['recurrence_date']
+
+        ids = [row['id'] for row in rows]
+        ArchivedSchedule.objects.bulk_create([ArchivedSchedule(**row) for row in rows])
+        ScheduleConflict.objects.filter(Q(schedule_id__in=ids) | Q(conflicting_schedule_id__in=ids)).delete()
+        search.remove_schedules(ids)
+        # A plain DELETE sends no post_delete signals, see the module docstring
+        with connections[router.db_for_write(Schedule)].cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f'DELETE FROM {Schedule._meta.db_table} WHERE id IN ({placeholders})', ids)
+    return len(rows)
+
+
+def archive_schedules(cutoff, batch_size=500):
+    """Archive batches until nothing eligible remains; yields each batch size"""
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if moved:
+            yield moved
+        if moved < batch_size:
+            return
+
+
+def schedules_for_range(start_date):
+    """
+    Base queryset for reports starting at ``start_date``
+
+    The hot table when no archived schedule falls on or after ``start_date``,
+    otherwise the history view so archived rows are counted too. Both expose
+    the same fields, so callers filter and aggregate them the same way.
+    """
+    if ArchivedSchedule.objects.filter(start_date__gte=start_date).exists():
+        return ScheduleHistory.objects.all()
+    return Schedule.objects.all()
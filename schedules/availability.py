@@ -0,0 +1,155 @@
+"""
+Availability search: which employees are free for a client's time window
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count
+
+from accounts.models import User
+from . import rules
+from .models import Schedule, ScheduleRecurrence
+from .recurrence import expand
+
+# How far back previous visits to the client are counted for tie-breaking
+FAMILIARITY_DAYS = 90
+
+
+class EmployeeCalendar:
+    """One employee's booked intervals with per-day and per-week totals"""
+    
+    def __init__(self):
+        self.intervals = []
+        self.daily_minutes = defaultdict(int)
+        self.weekly_minutes = defaultdict(int)
+    
+    def add(self, start_date, start_time, end_date, end_time, duration_minutes):
+        start = rules.to_minutes(start_date, start_time)
+        end = rules.to_minutes(end_date, end_time)
+        self.intervals.append((start, end))
+        self.daily_minutes[start_date] += duration_minutes
+        self.weekly_minutes[rules.week_start(start_date)] += duration_minutes
+    
+    def finalize(self):
+        self.intervals.sort()
+        self._starts = [start for start, _ in self.intervals]
+    
+    def reserve(self, day, start, end):
+        """Book ``[start, end)`` minutes starting on ``day``, keeping intervals sorted"""
+        index = bisect_left(self._starts, start)
+        self._starts.insert(index, start)
+        self.intervals.insert(index, (start, end))
+        self.daily_minutes[day] += end - start
+        self.weekly_minutes[rules.week_start(day)] += end - start
+    
+    def can_take(self, day, start, end):
+        """Whether booking ``[start, end)`` respects the gap and daily/weekly caps"""
+        minutes = end - start
+        return (
+            self.daily_minutes.get(day, 0) + minutes <= rules.MAX_DAILY_MINUTES
+            and self.weekly_minutes.get(rules.week_start(day), 0) + minutes <= rules.MAX_WEEKLY_MINUTES
+            and self.is_free(start, end)
+        )
+    
+    def is_free(self, start, end, gap=rules.MIN_GAP_MINUTES):
+        """Whether ``[start, end)`` keeps the gap rule against every booking"""
+        # Bookings last at most 12 hours, so only those starting shortly before matter
+        index = bisect_left(self._starts, start - rules.MAX_DURATION_MINUTES - gap)
+        for other_start, other_end in self.intervals[index:]:
+            if other_start >= end + gap:
+                break
+            if rules.overlaps(start, end, other_start, other_end, gap):
+                return False
+        return True
+
+
+def load_calendars(first_day, last_day):
+    """
+    Booked intervals per employee for schedules starting in the date range
+
+    A single range scan on the ``start_date`` index; as schedules never run
+    longer than 12 hours, starting one day early catches overnight bookings.
+    Occurrences of recurring schedules that are not materialized yet are
+    booked too, so a recurring slot is never offered to someone else.
+    """
+    calendars = defaultdict(EmployeeCalendar)
+    rows = Schedule.objects.filter(
+        start_date__gte=first_day - timedelta(days=1),
+        start_date__lte=last_day,
+        status__in=rules.BLOCKING_STATUSES,
+    ).order_by().values_list('employee_id', 'start_date', 'start_time', 'end_date', 'end_time', 'duration_minutes')
+    
+    for employee_id, *booking in rows.iterator(chunk_size=5000):
+        calendars[employee_id].add(*booking)
+    recurrences = ScheduleRecurrence.objects.select_related('employee', 'client')
+    for occurrence in expand(recurrences, first_day - timedelta(days=1), last_day):
+        calendars[occurrence.employee.pk].add(
+            occurrence.start_date, occurrence.start_time, occurrence.end_date, occurrence.end_time,
+            occurrence.duration_minutes,
+        )
+    for calendar in calendars.values():
+        calendar.finalize()
+    return calendars
+
+
+def find_available_employees(client, start_date, end_date, start_time, end_time):
+    """
+    Employees free for the daily ``start_time``-``end_time`` window on every
+    day from ``start_date`` to ``end_date``
+
+    Results respect the 1-12 hour duration, minimum gap and daily/weekly hour
+    caps, and are ranked by hours already booked in the first week (least
+    booked first), then by recent visits to the client.
+    """
+    days = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+    windows = [(day, *rules.window_bounds(day, start_time, end_time)) for day in days]
+    window_minutes = windows[0][2] - windows[0][1]
+    
+    # Load whole weeks so the weekly cap and ranking see every booking
+    calendars = load_calendars(rules.week_start(start_date), rules.week_start(end_date) + timedelta(days=6))
+    
+    familiarity = dict(
+        Schedule.objects.filter(
+            client=client,
+            start_date__gte=start_date - timedelta(days=FAMILIARITY_DAYS),
+            start_date__lt=start_date,
+        ).order_by().values_list('employee_id').annotate(visits=Count('id'))
+    )
+    
+    # Minutes each window adds per week, for the weekly cap
+    added_per_week = defaultdict(int)
+    for day, _, _ in windows:
+        added_per_week[rules.week_start(day)] += window_minutes
+    
+    empty = EmployeeCalendar()
+    empty.finalize()
+    first_week = rules.week_start(start_date)
+    
+    results = []
+    employees = User.objects.filter(role='employee', is_active=True).only(
+        'id', 'username', 'first_name', 'last_name', 'email'
+    )
+    for employee in employees:
+        calendar = calendars.get(employee.pk, empty)
+        if any(
+            calendar.weekly_minutes.get(week, 0) + added > rules.MAX_WEEKLY_MINUTES
+            for week, added in added_per_week.items()
+        ):
+            continue
+        if any(
+            calendar.daily_minutes.get(day, 0) + window_minutes > rules.MAX_DAILY_MINUTES
+            or not calendar.is_free(start, end)
+            for day, start, end in windows
+        ):
+            continue
+        booked_minutes = calendar.weekly_minutes.get(first_week, 0)
+        results.append({
+            'employee': employee,
+            'booked_minutes': booked_minutes,
+            'booked_hours': round(booked_minutes / 60, 2),
+            'client_visits': familiarity.get(employee.pk, 0),
+        })
+    
+    results.sort(key=lambda r: (r['booked_minutes'], -r['client_visits'], r['employee'].get_full_name()))
+    return results
@@ -0,0 +1,289 @@
+"""
+Real-time schedule status updates for Server-Sent Events streams
+
+Status transitions are read from the schedule event log (see
+schedules/eventlog.py), so a stream sees every change whichever process,
+worker or management command made it. Each serving process runs one
+``EventTail`` thread while it has open streams: it polls the log every
+``SSE_POLL_SECONDS`` and hands new transitions to the in-process ``Broker``,
+which fans them out to the subscribed streams on their event loops with
+``call_soon_threadsafe``. An idle stream costs one bounded ``asyncio.Queue``
+and one suspended coroutine; the database sees one query per poll per
+process, however many streams are open.
+
+The SSE id of each event is its log sequence number. A browser reconnecting
+sends it back as Last-Event-ID and the new stream first replays what it
+missed, so streams can be short: Django 4.2 does not notice a client that
+went away, and a stream of a closed tab runs until ``SSE_MAX_STREAM_SECONDS``.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection
+from django.db.models import Max, Q
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = getattr(settings, 'SSE_HEARTBEAT_SECONDS', 15)
+
+# Streams are closed after this long; EventSource reconnects by itself
+MAX_STREAM_SECONDS = getattr(settings, 'SSE_MAX_STREAM_SECONDS', 60)
+
+# Seconds between event log polls while a process has open streams
+POLL_SECONDS = getattr(settings, 'SSE_POLL_SECONDS', 1)
+
+# Milliseconds a browser waits before reconnecting a closed stream
+RETRY_MILLISECONDS = 2000
+
+# Events buffered per subscriber before the oldest are dropped; also the
+# most a reconnecting stream replays
+QUEUE_SIZE = 100
+
+SUPERVISOR_CHANNEL = 'supervisors'
+
+
+class Subscription:
+    """One connected stream listening on a set of channels"""
+
+    def __init__(self, channels, loop):
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, event_id, event):
+        """Queue an event; must run on the subscriber's loop"""
+        if self.queue.full():
+            # Slow consumer: keep the newest state rather than blocking publishers
+            self.queue.get_nowait()
+        self.queue.put_nowait((event_id, event))
+
+
+class Broker:
+    """Fan events out to the subscriptions registered on each channel"""
+
+    def __init__(self):
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, asyncio.get_running_loop())
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channels, event, event_id):
+        """Deliver ``event`` once to every subscription on any of ``channels``"""
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._channels.get(channel, ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event_id, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down; it will unsubscribe itself
+                pass
+        return len(targets)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._channels.values())) if self._channels else 0
+
+
+broker = Broker()
+
+
+class EventTail:
+    """Thread publishing the status transitions appended to the event log to ``broker``"""
+
+    def __init__(self, broker, interval=POLL_SECONDS):
+        self.broker = broker
+        self.interval = interval
+        self.position = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self, position):
+        """
+        Start following the log after ``position`` unless already running
+
+        The thread stops by itself once the process has no subscribers left.
+        """
+        with self._lock:
+            if self._thread is None:
+                self.position = position
+                self._thread = threading.Thread(target=self._run, name='schedule-event-tail', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self.broker.subscriber_count:
+                        self._thread = None
+                        return
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception("Could not read the schedule event log")
+                    close_old_connections()
+                time.sleep(self.interval)
+        finally:
+            connection.close()
+
+    def poll(self):
+        """Publish the transitions after ``position`` and move past them"""
+        for event_id, channels, event in transitions_after(self.position):
+            self.broker.publish(channels, event, event_id)
+            self.position = event_id
+
+
+tail = EventTail(broker)
+
+
+def channels_for_schedule(schedule):
+    """Channels concerned by a change to ``schedule``"""
+    return [
+        f'user:{schedule.employee_id}',
+        f'client:{schedule.client_id}',
+        SUPERVISOR_CHANNEL,
+    ]
+
+
+def channels_for_user(user):
+    """Channels a user's stream listens on (sync, may query the database)"""
+    if user.is_supervisor:
+        return [SUPERVISOR_CHANNEL]
+    elif user.is_client:
+        from clients.models import Client
+        client_ids = Client.objects.filter(name=user.get_full_name()).values_list('id', flat=True)
+        return [f'client:{client_id}' for client_id in client_ids]
+    return [f'user:{user.pk}']
+
+
+def status_event(event, actor=None):
+    """Serializable payload describing a logged status transition"""
+    from .models import Schedule
+
+    return {
+        'id': event.schedule_id,
+        'status': event.status,
+        'status_display': dict(Schedule.STATUS_CHOICES).get(event.status, event.status),
+        'previous_status': event.previous_status,
+        'actor': actor,
+        'updated_at': event.created_at,
+    }
+
+
+def latest_event_id():
+    """Sequence number of the newest logged event, 0 for an empty log (sync)"""
+    from .models import ScheduleEvent
+
+    return ScheduleEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def _scope(channels):
+    """Event log filter matching the events published on ``channels``"""
+    if SUPERVISOR_CHANNEL in channels:
+        return Q()
+    employee_ids = [channel.split(':', 1)[1] for channel in channels if channel.startswith('user:')]
+    client_ids = [channel.split(':', 1)[1] for channel in channels if channel.startswith('client:')]
+    return Q(employee_id__in=employee_ids) | Q(client_id__in=client_ids)
+
+
+def transitions_after(position, channels=None, limit=500):
+    """
+    Status transitions logged after ``position`` as ``(event_id, channels, event)``,
+    oldest first; restricted to ``channels`` when given, keeping the newest
+    ``limit`` (sync)
+    """
+    from accounts.models import User
+    from .models import ScheduleEvent
+
+    events = ScheduleEvent.objects.filter(id__gt=position, kind='transition')
+    if channels is None:
+        events = list(events.order_by('id')[:limit])
+    else:
+        events = list(events.filter(_scope(channels)).order_by('-id')[:limit])[::-1]
+    actor_ids = {event.actor_id for event in events if event.actor_id}
+    actors = {user.pk: user.get_full_name() for user in User.objects.filter(pk__in=actor_ids)} if actor_ids else {}
+    return [
+        (event.pk, channels_for_schedule(event), status_event(event, actors.get(event.actor_id)))
+        for event in events
+    ]
+
+
+def format_event(event, event_id):
+    """Encode an event in the text/event-stream wire format"""
+    data = json.dumps(event, cls=DjangoJSONEncoder)
+    return f"id: {event_id}\nevent: schedule-status\ndata: {data}\n\n"
+
+
+def catch_up(channels, last_event_id=None):
+    """
+    ``(latest, missed)``: the newest log sequence number and the transitions
+    on ``channels`` after ``last_event_id`` (sync)
+    """
+    latest = latest_event_id()
+    if last_event_id is None or last_event_id >= latest:
+        return latest, []
+    return latest, transitions_after(last_event_id, channels, QUEUE_SIZE)
+
+
+async def iter_events(channels, last_event_id=None, follow_log=True, heartbeat=HEARTBEAT_SECONDS,
+                      max_duration=MAX_STREAM_SECONDS):
+    """
+    Subscribe to ``channels`` and yield SSE frames until ``max_duration`` elapses
+
+    The stream starts with the transitions logged after ``last_event_id``
+    and makes sure this process follows the log. With ``follow_log`` off it
+    only carries what is published to ``broker`` directly.
+    """
+    subscription = broker.subscribe(channels)
+    deadline = time.monotonic() + max_duration
+    last_id = 0
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        if follow_log:
+            # Subscribed first: whatever the tail publishes from here on
+            # reaches this stream, and anything before is in the replay
+            last_id, missed = await sync_to_async(catch_up)(channels, last_event_id)
+            tail.ensure_running(last_id)
+            for event_id, _, event in missed:
+                last_id = max(last_id, event_id)
+                yield format_event(event, event_id)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event_id, event = await asyncio.wait_for(subscription.queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            # A running tail may still be publishing what the replay covered
+            if follow_log and event_id <= last_id:
+                continue
+            last_id = event_id
+            yield format_event(event, event_id)
+    finally:
+        broker.unsubscribe(subscription)
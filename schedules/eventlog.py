@@ -0,0 +1,274 @@
+"""
+Append-only schedule event log and consumer cursors
+
+Every create, edit, status transition and delete of a schedule appends one
+``ScheduleEvent``; an edit that moves a schedule to another employee or
+client also appends a ``moved`` event filed under the previous ones. Its primary key is a monotonic sequence number, so a
+background processor keeps a named ``EventCursor`` and reads only the events
+after it instead of rescanning or diffing ``schedules``:
+
+    def handle(events):
+        for event in events:
+            ...
+
+    eventlog.consume('analytics', handle)
+
+``consume`` advances the cursor in the same transaction that hands the
+batch to the handler. Database work done by the handler is therefore
+exactly-once; external side effects are at-least-once.
+
+A cursor only works if no event can ever appear below it, so sequence
+numbers are allocated at commit time: events are built when the change is
+made and inserted by an on-commit callback, in a short transaction of their
+own. On PostgreSQL those transactions take an advisory lock first, which
+makes them commit in sequence order; SQLite serializes write transactions
+anyway. Events of a rolled back change are never written.
+
+The price is that logging is at most once: a process dying between the
+commit and the callback loses that change's events, and delta sync, the
+status streams and the report cache version miss it. ``reconcile`` (run
+periodically by ``manage.py reconcile_event_log``) repairs that: a schedule
+whose version is ahead of its newest event gets an event for whatever its
+events do not account for, and a schedule that is gone without a
+``deleted`` event gets one. Consumers see the repair as a late change.
+"""
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import ArchivedSchedule, EventCursor, Schedule, ScheduleEvent
+
+# Fields whose values are copied into ``changes``
+EVENT_FIELDS = (
+    'employee_id',
+    'client_id',
+    'start_date',
+    'start_time',
+    'end_date',
+    'end_time',
+    'status',
+    'notes',
+)
+
+# pg_advisory_xact_lock key serializing event inserts on PostgreSQL
+SEQUENCE_LOCK = 0x5ced01e
+
+# Changes younger than this are left to their own on-commit callbacks by ``reconcile``
+RECONCILE_GRACE_SECONDS = 60
+
+_encoder = DjangoJSONEncoder()
+
+
+def _json(value):
+    """Make a field value JSON friendly (dates and times become ISO strings)"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return _encoder.default(value)
+
+
+def _event(schedule, kind, changes=None, actor=None, previous_status=''):
+    return ScheduleEvent(
+        schedule_id=schedule.pk,
+        employee_id=schedule.employee_id,
+        client_id=schedule.client_id,
+        kind=kind,
+        status=schedule.status,
+        previous_status=previous_status,
+        version=schedule.version,
+        actor_id=actor.pk if actor is not None else None,
+        changes=changes or {},
+    )
+
+
+def _insert(events):
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [SEQUENCE_LOCK])
+        ScheduleEvent.objects.bulk_create(events)
+
+
+def _append(*events):
+    """Insert the events once the current transaction commits (at once outside one)"""
+    if events:
+        transaction.on_commit(lambda: _insert(list(events)))
+
+
+def snapshot(schedule):
+    """Current EVENT_FIELDS values of a schedule"""
+    return {field: _json(getattr(schedule, field)) for field in EVENT_FIELDS}
+
+
+def changed_fields(schedule):
+    """EVENT_FIELDS whose value differs from what was loaded from the database"""
+    loaded = getattr(schedule, '_loaded_values', None)
+    if loaded is None:
+        return snapshot(schedule)
+    return {
+        field: _json(getattr(schedule, field))
+        for field in EVENT_FIELDS
+        if field in loaded and loaded[field] is not models.DEFERRED and loaded[field] != getattr(schedule, field)
+    }
+
+
+def _moved(schedule, changes):
+    """A ``moved`` event filed under the previous employee and client, when an edit changes either"""
+    if 'employee_id' not in changes and 'client_id' not in changes:
+        return []
+    loaded = getattr(schedule, '_loaded_values', None)
+    if loaded is None:
+        return []
+    event = _event(schedule, 'moved', changes)
+    for field in ('employee_id', 'client_id'):
+        if field in changes:
+            setattr(event, field, loaded[field])
+    return [event]
+
+
+def record_saved(schedule, created):
+    """Log a create or an edit; edits that change no EVENT_FIELDS are skipped"""
+    if created:
+        _append(_event(schedule, 'created', snapshot(schedule)))
+    else:
+        changes = changed_fields(schedule)
+        if changes:
+            _append(*_moved(schedule, changes), _event(schedule, 'updated', changes))
+    schedule._loaded_values = {field: getattr(schedule, field) for field in EVENT_FIELDS}
+
+
+def record_created(schedules):
+    """Log schedules inserted with ``bulk_create``, which sends no signals"""
+    _append(*[_event(schedule, 'created', snapshot(schedule)) for schedule in schedules])
+
+
+def record_transition(schedule, previous_status, actor=None):
+    changes = {'status': schedule.status}
+    if schedule.status in ('rejected', 'modified') and schedule.rejection_reason:
+        changes['rejection_reason'] = schedule.rejection_reason
+    _append(_event(schedule, 'transition', changes, actor, previous_status))
+    if hasattr(schedule, '_loaded_values'):
+        schedule._loaded_values['status'] = schedule.status
+
+
+def record_deleted(schedule):
+    _append(_event(schedule, 'deleted'))
+
+
+def get_cursor(name, from_latest=False):
+    """
+    The named consumer's cursor, created on first use
+
+    A new consumer starts at the beginning of the log, or at its current end
+    with ``from_latest`` when it only cares about changes from now on.
+    """
+    cursor = EventCursor.objects.filter(name=name).first()
+    if cursor is None:
+        position = 0
+        if from_latest:
+            position = ScheduleEvent.objects.aggregate(last=models.Max('id'))['last'] or 0
+        cursor, _ = EventCursor.objects.get_or_create(name=name, defaults={'position': position})
+    return cursor
+
+
+def events_after(position, limit=500):
+    """Events with a sequence number above ``position``, oldest first"""
+    return list(ScheduleEvent.objects.filter(id__gt=position).order_by('id')[:limit])
+
+
+def pending(name, limit=500):
+    """Next events for the named consumer, without advancing its cursor"""
+    return events_after(get_cursor(name).position, limit)
+
+
+def acknowledge(name, position):
+    """Move the named consumer's cursor forward to ``position``"""
+    get_cursor(name)
+    EventCursor.objects.filter(name=name, position__lt=position).update(position=position, updated_at=timezone.now())
+
+
+def consume(name, handler, batch_size=500, max_batches=None):
+    """
+    Feed new events to ``handler`` in batches until the log is drained
+
+    Each batch runs in one transaction with the consumer's cursor row locked,
+    so two workers with the same name never process the same events. Returns
+    the number of events handled.
+    """
+    get_cursor(name)
+    handled = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            cursor = EventCursor.objects.select_for_update().get(name=name)
+            events = events_after(cursor.position, batch_size)
+            if not events:
+                break
+            handler(events)
+            cursor.position = events[-1].pk
+            cursor.save(update_fields=['position', 'updated_at'])
+        handled += len(events)
+        batches += 1
+        if len(events) < batch_size:
+            break
+    return handled
+
+
+def reconcile(since, grace_seconds=RECONCILE_GRACE_SECONDS):
+    """
+    Write the events of changes made since ``since`` whose events were lost
+
+    A schedule with no events gets a ``created`` event; one whose version is
+    ahead of its newest event gets an ``updated`` event with the fields that
+    differ from what its events add up to (saves that changed nothing logged
+    bump the version too, so matching fields write nothing). A schedule with
+    an event since ``since`` that is neither in ``schedules`` nor archived,
+    and whose last event is not ``deleted``, gets a ``deleted`` event.
+    Returns the number of events written.
+    """
+    until = timezone.now() - timedelta(seconds=grace_seconds)
+    newest = ScheduleEvent.objects.filter(schedule_id=OuterRef('pk')).order_by('-id').values('version')[:1]
+    behind = (
+        Schedule.objects.filter(updated_at__gte=since, updated_at__lt=until)
+        .annotate(logged_version=Subquery(newest))
+        .filter(Q(logged_version__isnull=True) | Q(logged_version__lt=F('version')))
+        .order_by('id')
+    )
+
+    events = []
+    for schedule in behind.iterator(chunk_size=500):
+        current = snapshot(schedule)
+        if schedule.logged_version is None:
+            events.append(_event(schedule, 'created', current))
+            continue
+        logged = {}
+        for changes in ScheduleEvent.objects.filter(schedule_id=schedule.pk).order_by('id').values_list('changes', flat=True):
+            logged.update(changes)
+        changes = {field: value for field, value in current.items() if logged.get(field, value) != value}
+        if changes:
+            events.append(_event(schedule, 'updated', changes))
+
+    recent = set(
+        ScheduleEvent.objects.filter(created_at__gte=since, created_at__lt=until)
+        .values_list('schedule_id', flat=True).distinct()
+    )
+    if recent:
+        recent -= set(Schedule.objects.filter(pk__in=recent).values_list('pk', flat=True))
+        recent -= set(ArchivedSchedule.objects.filter(pk__in=recent).values_list('pk', flat=True))
+    for schedule_id in sorted(recent):
+        last = ScheduleEvent.objects.filter(schedule_id=schedule_id).order_by('-id').first()
+        if last.kind != 'deleted':
+            events.append(ScheduleEvent(
+                schedule_id=schedule_id,
+                employee_id=last.employee_id,
+                client_id=last.client_id,
+                kind='deleted',
+                status=last.status,
+                version=last.version,
+            ))
+
+    if events:
+        _insert(events)
+    return len(events)
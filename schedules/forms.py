@@ -1,13 +1,18 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from .models import Schedule
+from .models import Schedule, ScheduleRecurrence
+from . import rules
+from .recurrence import occurrence_overlap_error, overlap_error
 from clients.models import Client
 
 
 class ScheduleForm(forms.ModelForm):
     """Form for creating and updating schedules"""
     
+    # Version the user started editing from, so stale edits are refused on save
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+    
     class Meta:
         model = Schedule
         fields = ['client', 'start_date', 'start_time', 'end_date', 'end_time', 'status', 'notes']
@@ -22,7 +27,7 @@ class ScheduleForm(forms.ModelForm):
         }
     
     def __init__(self, *args, **kwargs):
-        user = kwargs.pop('user', None)
+        user = self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         
         # Filter clients based on user role
@@ -32,6 +37,9 @@ class ScheduleForm(forms.ModelForm):
             self.fields['client'].queryset = Client.objects.filter(is_active=True)
         else:
             self.fields['client'].queryset = Client.objects.none()
+        
+        if self.instance.pk:
+            self.fields['version'].initial = self.instance.version
     
     def clean(self):
         cleaned_data = super().clean()
@@ -68,6 +76,16 @@ class ScheduleForm(forms.ModelForm):
             if duration.total_seconds() > 43200:  # 12 hours
                 raise ValidationError("Schedule duration cannot exceed 12 hours.")
         
+        # New schedules belong to the employee creating them
+        employee_id = self.instance.employee_id or (self.user.pk if self.user and self.user.is_employee else None)
+        if employee_id and start_date and end_date and start_time and end_time:
+            error = occurrence_overlap_error(employee_id, start_date, start_time, end_date, end_time)
+            if error:
+                raise ValidationError(error)
+        
+        if self.instance.pk and cleaned_data.get('version') is not None:
+            self.instance.version = cleaned_data['version']
+        
         return cleaned_data
 
 
@@ -98,3 +116,120 @@ class ScheduleApprovalForm(forms.Form):
             raise ValidationError("Reason is required for rejection or modification requests.")
         
         return reason
+
+
+class AvailabilitySearchForm(forms.Form):
+    """Form for finding employees free for a client time window"""
+    
+    MAX_RANGE_DAYS = 31
+    
+    client = forms.ModelChoiceField(
+        queryset=Client.objects.filter(is_active=True),
+        widget=forms.Select(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm'})
+    )
+    
+    start_date = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'type': 'date'})
+    )
+    
+    end_date = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'type': 'date'})
+    )
+    
+    start_time = forms.TimeField(
+        widget=forms.TimeInput(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'type': 'time'})
+    )
+    
+    end_time = forms.TimeField(
+        widget=forms.TimeInput(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'type': 'time'})
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+        
+        if start_date and end_date:
+            if start_date > end_date:
+                raise ValidationError("Start date must be before or equal to end date.")
+            if (end_date - start_date).days >= self.MAX_RANGE_DAYS:
+                raise ValidationError(f"Search at most {self.MAX_RANGE_DAYS} days at a time.")
+        
+        if start_date and start_time and end_time:
+            start, end = rules.window_bounds(start_date, start_time, end_time)
+            error = rules.validate_duration(end - start)
+            if error:
+                raise ValidationError(error)
+        
+        return cleaned_data
+
+
+class ScheduleRecurrenceForm(forms.ModelForm):
+    """Form for creating recurring weekly schedule patterns"""
+    
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=ScheduleRecurrence.WEEKDAY_CHOICES,
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'h-4 w-4 text-blue-600 focus:ring-blue-500 border-gray-300 rounded'})
+    )
+    
+    class Meta:
+        model = ScheduleRecurrence
+        fields = ['client', 'weekdays', 'start_time', 'end_time', 'starts_on', 'ends_on', 'notes']
+        widgets = {
+            'client': forms.Select(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm'}),
+            'start_time': forms.TimeInput(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'type': 'time'}),
+            'end_time': forms.TimeInput(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'type': 'time'}),
+            'starts_on': forms.DateInput(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'type': 'date'}),
+            'ends_on': forms.DateInput(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'type': 'date'}),
+            'notes': forms.Textarea(attrs={'class': 'block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm', 'rows': 3}),
+        }
+    
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        self.fields['client'].queryset = Client.objects.filter(is_active=True)
+        if self.instance.pk:
+            self.initial['weekdays'] = self.instance.weekday_list
+    
+    def clean_weekdays(self):
+        return ','.join(str(day) for day in sorted(set(self.cleaned_data['weekdays'])))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        starts_on = cleaned_data.get('starts_on')
+        ends_on = cleaned_data.get('ends_on')
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+        
+        if starts_on and starts_on < timezone.now().date():
+            raise ValidationError("Recurring schedules can only start on future dates.")
+        
+        if starts_on and ends_on and ends_on < starts_on:
+            raise ValidationError("End date must be on or after the start date.")
+        
+        if starts_on and start_time and end_time:
+            start, end = rules.window_bounds(starts_on, start_time, end_time)
+            error = rules.validate_duration(end - start)
+            if error:
+                raise ValidationError(error)
+        
+        employee_id = self.instance.employee_id or (self.user.pk if self.user else None)
+        weekdays = cleaned_data.get('weekdays')
+        if employee_id and weekdays and starts_on and start_time and end_time:
+            pattern = ScheduleRecurrence(
+                pk=self.instance.pk,
+                employee_id=employee_id,
+                weekdays=weekdays,
+                start_time=start_time,
+                end_time=end_time,
+                starts_on=starts_on,
+                ends_on=ends_on,
+            )
+            error = overlap_error(pattern)
+            if error:
+                raise ValidationError(error)
+        
+        return cleaned_data
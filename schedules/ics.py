@@ -0,0 +1,129 @@
+"""
+iCalendar (RFC 5545) rendering for the read-only schedule feeds
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+
+# Calendar apps only care about whether an event is confirmed or still pending
+ICS_STATUS = {
+    'draft': 'TENTATIVE',
+    'submitted': 'TENTATIVE',
+    'modified': 'TENTATIVE',
+    'approved': 'CONFIRMED',
+    'rejected': 'CANCELLED',
+}
+
+# Columns fetched per event; kept flat so feeds never build model instances
+FEED_FIELDS = (
+    'id',
+    'start_date',
+    'start_time',
+    'end_date',
+    'end_time',
+    'status',
+    'notes',
+    'updated_at',
+    'client__name',
+    'employee__first_name',
+    'employee__last_name',
+    'employee__username',
+)
+
+# Number of events rendered into a single streamed chunk
+EVENTS_PER_CHUNK = 200
+
+
+def escape_text(value):
+    """Escape a TEXT property value"""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Fold a content line to 75 octets as required by RFC 5545"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split inside a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # Continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(value):
+    """Format an aware datetime as a UTC DATE-TIME value"""
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_local(day, time):
+    """Format a schedule date and time, which are stored in the site time zone"""
+    return format_utc(timezone.make_aware(datetime.combine(day, time)))
+
+
+def render_event(row, domain, stamp):
+    """Render one FEED_FIELDS row as a VEVENT block"""
+    (pk, start_date, start_time, end_date, end_time, status, notes, updated_at,
+     client_name, first_name, last_name, username) = row
+
+    employee_name = f"{first_name} {last_name}" if first_name and last_name else username
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:schedule-{pk}@{domain}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{format_local(start_date, start_time)}',
+        f'DTEND:{format_local(end_date, end_time)}',
+        f'SUMMARY:{escape_text(f"{client_name} - {employee_name}")}',
+        f'STATUS:{ICS_STATUS.get(status, "TENTATIVE")}',
+        f'LAST-MODIFIED:{format_utc(updated_at)}',
+        # SEQUENCE lets calendar apps replace earlier copies of the event
+        f'SEQUENCE:{int(updated_at.timestamp())}',
+    ]
+    if notes:
+        lines.append(f'DESCRIPTION:{escape_text(notes)}')
+    lines.append('END:VEVENT')
+    return ''.join(fold_line(line) for line in lines)
+
+
+def iter_calendar(rows, name, domain):
+    """
+    Yield an iCalendar document in chunks of EVENTS_PER_CHUNK events
+
+    ``rows`` is any iterable of FEED_FIELDS tuples, typically a
+    ``values_list(...).iterator()`` so memory stays flat for large feeds.
+    """
+    stamp = format_utc(timezone.now())
+    yield ''.join(fold_line(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:-//{domain}//Scheduler//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ])
+
+    chunk = []
+    for row in rows:
+        chunk.append(render_event(row, domain, stamp))
+        if len(chunk) >= EVENTS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+    yield fold_line('END:VCALENDAR')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from schedules.archive import ARCHIVE_AFTER_DAYS, archive_cutoff, archive_schedules
+
+
+class Command(BaseCommand):
+    help = 'Move closed schedules older than the archive horizon into the archive table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=ARCHIVE_AFTER_DAYS,
+            help='Archive schedules that ended more than this many days ago',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Schedules moved per transaction',
+        )
+    
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--older-than-days must be >= 0 and --batch-size >= 1')
+        
+        cutoff = archive_cutoff(options['older_than_days'])
+        total = 0
+        for moved in archive_schedules(cutoff, options['batch_size']):
+            total += moved
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Archived {moved} schedules ({total} so far)')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} schedules that ended before {cutoff}'))
@@ -0,0 +1,164 @@
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, time as clock, timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from clients.models import Client
+from monitoring.slowqueries import explain
+from schedules.models import Schedule
+
+# Indexes added for the hot query shapes, and the one they replaced
+NEW_INDEXES = ('schedules_employe_1301f4_idx', 'schedules_status_44a693_idx', 'schedules_created_141105_idx')
+OLD_INDEXES = (('schedules_status_0e1604_idx', ['status']),)
+
+STATUS_WEIGHTS = {
+    'draft': 10,
+    'submitted': 5,
+    'approved': 70,
+    'rejected': 5,
+    'modified': 10,
+}
+
+COLUMNS = (
+    'employee_id', 'client_id', 'start_date', 'start_time', 'end_date', 'end_time', 'status',
+    'submitted_at', 'duration_minutes', 'version', 'created_at', 'updated_at',
+)
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare query plans and latencies of the hot schedule queries with and without "
+        "the composite indexes, on a throwaway database filled with synthetic schedules"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--employees', type=int, default=1000)
+        parser.add_argument('--clients', type=int, default=300)
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query; the median is reported')
+        parser.add_argument('--plans', action='store_true', help='Print the plan of every query before and after')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        # The test database machinery gives a migrated, empty database that is
+        # dropped afterwards; SQLite's is put in a file rather than in memory
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        workdir = None
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            workdir = tempfile.TemporaryDirectory()
+            test_settings['NAME'] = str(Path(workdir.name) / 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if workdir:
+                workdir.cleanup()
+
+    def benchmark(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        employee_ids = self.fill(rng, options)
+        self.stdout.write(f"Loaded {options['rows']:,} schedules in {time.perf_counter() - started:.1f}s\n")
+
+        today = timezone.now().date()
+        employees = rng.sample(employee_ids, min(len(employee_ids), options['repeat']))
+        # (name, queryset for run i, whether the page counts rather than lists it)
+        queries = [
+            ('employee, approved, past month', lambda i: Schedule.objects.filter(
+                employee_id=employees[i % len(employees)], status='approved',
+                start_date__gte=today - timedelta(days=30), start_date__lte=today), False),
+            ('employee, pending, past year', lambda i: Schedule.objects.filter(
+                employee_id=employees[i % len(employees)], status='submitted',
+                start_date__gte=today - timedelta(days=365), start_date__lte=today), False),
+            ('pending approvals, newest 5', lambda i: Schedule.objects.filter(status='submitted').order_by('-submitted_at')[:5], False),
+            ('pending approvals count', lambda i: Schedule.objects.filter(status='submitted').order_by(), True),
+            ('list page 1', lambda i: Schedule.objects.order_by('-created_at')[:20], False),
+            ('list page 50', lambda i: Schedule.objects.order_by('-created_at')[980:1000], False),
+        ]
+
+        timings = {}
+        for label, new in (('before', False), ('after', True)):
+            self.use_indexes(new)
+            if options['plans']:
+                self.stdout.write(f"Plans {label}:")
+            timings[label] = {name: self.measure(name, build, count, options) for name, build, count in queries}
+        before, after = timings['before'], timings['after']
+
+        self.stdout.write(f"\n{'query':<32} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name, _, _ in queries:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            self.stdout.write(f"{name:<32} {before[name]:>10.2f} {after[name]:>10.2f} {speedup:>7.1f}x")
+
+    def fill(self, rng, options):
+        """Create employees and clients and insert the schedules; returns the employee ids"""
+        User.objects.bulk_create(
+            User(username=f'employee{i}', first_name='Employee', last_name=str(i), role='employee')
+            for i in range(options['employees'])
+        )
+        Client.objects.bulk_create(Client(name=f'Client {i}') for i in range(options['clients']))
+        employee_ids = list(User.objects.values_list('id', flat=True))
+        client_ids = list(Client.objects.values_list('id', flat=True))
+
+        ops = connection.ops
+        now = timezone.now()
+        statuses = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=options['rows'])
+        sql = f"INSERT INTO {Schedule._meta.db_table} ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))})"
+        with transaction.atomic(), connection.cursor() as cursor:
+            for offset in range(0, options['rows'], BATCH_SIZE):
+                rows = []
+                for status in statuses[offset:offset + BATCH_SIZE]:
+                    # Three years of schedules around today, created up to a month ahead
+                    start_date = (now + timedelta(days=rng.randint(-730, 365))).date()
+                    start_hour = rng.randint(6, 15)
+                    hours = rng.choice([2, 4, 6, 8])
+                    created_at = datetime.combine(start_date, clock(start_hour), now.tzinfo) - timedelta(minutes=rng.randint(60, 43200))
+                    submitted_at = created_at + timedelta(minutes=rng.randint(1, 2880)) if status != 'draft' else None
+                    rows.append((
+                        rng.choice(employee_ids), rng.choice(client_ids),
+                        ops.adapt_datefield_value(start_date), ops.adapt_timefield_value(clock(start_hour)),
+                        ops.adapt_datefield_value(start_date), ops.adapt_timefield_value(clock(start_hour + hours)),
+                        status, ops.adapt_datetimefield_value(submitted_at), hours * 60, 0,
+                        ops.adapt_datetimefield_value(created_at), ops.adapt_datetimefield_value(submitted_at or created_at),
+                    ))
+                cursor.executemany(sql, rows)
+        return employee_ids
+
+    def use_indexes(self, new):
+        """Switch between the new index set and the one it replaced, then refresh planner statistics"""
+        indexes = {index.name: index for index in Schedule._meta.indexes}
+        old = [models.Index(fields=fields, name=name) for name, fields in OLD_INDEXES]
+        with connection.schema_editor() as editor:
+            for index in old:
+                (editor.remove_index if new else editor.add_index)(Schedule, index)
+            for name in NEW_INDEXES:
+                (editor.add_index if new else editor.remove_index)(Schedule, indexes[name])
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Schedule._meta.db_table}')
+
+    def measure(self, name, build, count, options):
+        """Median milliseconds of evaluating the query, printing its plan with --plans"""
+        if options['plans']:
+            sql, params = build(0).query.sql_with_params()
+            self.stdout.write(f"  {name}:")
+            for line in explain(connection, sql, params):
+                self.stdout.write(f"    | {line}")
+        timings = []
+        for i in range(options['repeat']):
+            queryset = build(i)
+            started = time.perf_counter()
+            if count:
+                queryset.count()
+            else:
+                list(queryset)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
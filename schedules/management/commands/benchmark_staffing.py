@@ -0,0 +1,55 @@
+import random
+import statistics
+import time
+from datetime import time as clock, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from schedules import rules
+from schedules.staffing import Demand, StaffingEngine
+
+
+class Command(BaseCommand):
+    help = "Benchmark the staffing engine on a synthetic week of demand (no database writes)"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=500)
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+    
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        today = timezone.now().date()
+        monday = rules.week_start(today) + timedelta(days=7)
+        
+        # Each client needs one to three windows a day, sometimes with two people
+        demands = []
+        for client_id in range(1, options['clients'] + 1):
+            for offset in range(7):
+                day = monday + timedelta(days=offset)
+                for _ in range(rng.randint(1, 3)):
+                    start_hour = rng.randint(6, 16)
+                    hours = rng.choice([2, 3, 4, 6, 8])
+                    end_hour = min(start_hour + hours, 23)
+                    demands.append(Demand(client_id, day, clock(start_hour), clock(end_hour), rng.choice([1, 1, 1, 2])))
+        slots = sum(demand.headcount for demand in demands)
+        
+        engine = StaffingEngine(range(1, options['employees'] + 1))
+        started = time.perf_counter()
+        assignments, unfilled = engine.propose(demands)
+        elapsed = time.perf_counter() - started
+        
+        weekly_hours = [
+            calendar.weekly_minutes.get(monday, 0) / 60
+            for calendar in engine.calendars.values()
+        ]
+        self.stdout.write(f"Demand: {len(demands)} windows, {slots} slots for {options['clients']} clients")
+        self.stdout.write(f"Employees: {options['employees']}")
+        self.stdout.write(f"Solved in {elapsed:.3f}s ({slots / elapsed:,.0f} slots/s)")
+        self.stdout.write(f"Filled {len(assignments)} slots, {len(unfilled)} unfilled ({len(assignments) / slots:.1%} coverage)")
+        self.stdout.write(
+            f"Weekly hours per employee: min {min(weekly_hours):.1f}, "
+            f"mean {statistics.mean(weekly_hours):.1f}, max {max(weekly_hours):.1f}, "
+            f"stdev {statistics.pstdev(weekly_hours):.2f}"
+        )
@@ -0,0 +1,94 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+from accounts.models import User
+from clients.models import Client
+from schedules.staffing import Demand, create_drafts, propose_for_demand
+
+
+class Command(BaseCommand):
+    help = "Propose draft schedules that cover client demand read from a JSON file"
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'demand_file',
+            help='JSON list of {"client": id, "date": "YYYY-MM-DD", "start_time": "HH:MM", '
+                 '"end_time": "HH:MM"} or {"client": id, "date": ..., "hours": n}, each with optional "headcount"',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Show the proposal without creating drafts')
+    
+    def handle(self, *args, **options):
+        demands = self._load_demands(options['demand_file'])
+        employee_ids = list(User.objects.filter(role='employee', is_active=True).values_list('id', flat=True))
+        
+        started = time.perf_counter()
+        assignments, unfilled = propose_for_demand(demands, employee_ids)
+        elapsed = time.perf_counter() - started
+        
+        self.stdout.write(
+            f"Filled {len(assignments)} slot(s), {len(unfilled)} unfilled, "
+            f"across {len(employee_ids)} employees in {elapsed:.2f}s"
+        )
+        for demand in unfilled:
+            self.stdout.write(self.style.WARNING(
+                f"  Unfilled: client {demand.client_id} on {demand.day} {demand.start_time:%H:%M}-{demand.end_time:%H:%M}"
+            ))
+        
+        if options['dry_run']:
+            return
+        created = create_drafts(assignments)
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} draft schedule(s) for supervisor review"))
+    
+    def _load_demands(self, path):
+        try:
+            with open(path) as handle:
+                entries = json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read demand file: {exc}")
+        
+        if not isinstance(entries, list):
+            raise CommandError("Demand file must contain a JSON list of entries")
+        
+        active_clients = set(Client.objects.filter(is_active=True).values_list('id', flat=True))
+        today = timezone.now().date()
+        demands = []
+        for number, entry in enumerate(entries, start=1):
+            if not isinstance(entry, dict):
+                raise CommandError(f"Entry {number}: expected an object, got {entry!r}")
+            client_id = entry.get('client')
+            day = self._parse(parse_date, entry.get('date'))
+            headcount = entry.get('headcount', 1)
+            if client_id not in active_clients or isinstance(client_id, bool):
+                raise CommandError(f"Entry {number}: unknown or inactive client {client_id!r}")
+            if day is None:
+                raise CommandError(f"Entry {number}: invalid date {entry.get('date')!r}")
+            if day < today:
+                raise CommandError(f"Entry {number}: schedules can only be created for future dates")
+            if not isinstance(headcount, int) or isinstance(headcount, bool) or headcount < 1:
+                raise CommandError(f"Entry {number}: headcount must be a whole number of at least 1, got {headcount!r}")
+            
+            if 'hours' in entry:
+                hours = entry['hours']
+                if not isinstance(hours, (int, float)) or isinstance(hours, bool) or not 0 < hours <= 24:
+                    raise CommandError(f"Entry {number}: hours must be a number above 0 and at most 24, got {hours!r}")
+                demands.extend(Demand.from_hours(client_id, day, hours, headcount))
+                continue
+            start_time = self._parse(parse_time, entry.get('start_time'))
+            end_time = self._parse(parse_time, entry.get('end_time'))
+            if start_time is None or end_time is None:
+                raise CommandError(f"Entry {number}: provide start_time and end_time (HH:MM), or hours")
+            demands.append(Demand(client_id, day, start_time, end_time, headcount))
+        return demands
+    
+    def _parse(self, parser, value):
+        """Parse a date or time string, None when the value is missing or invalid"""
+        if not isinstance(value, str):
+            return None
+        try:
+            return parser(value)
+        except ValueError:
+            return None
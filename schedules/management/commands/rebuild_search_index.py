@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedules import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the schedules table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Documents written per batch',
+        )
+    
+    def handle(self, *args, **options):
+        if search.get_backend() is None:
+            raise CommandError('Full-text search needs SQLite (FTS5) or PostgreSQL')
+        
+        started = time.perf_counter()
+        count = search.rebuild(options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} schedules in {elapsed:.1f}s'))
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from schedules.eventlog import RECONCILE_GRACE_SECONDS, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Write schedule events that were lost between a commit and its on-commit callback'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since-minutes',
+            type=int,
+            default=120,
+            help='Check schedules changed in this many minutes; cover at least the time between runs',
+        )
+        parser.add_argument(
+            '--grace-seconds',
+            type=int,
+            default=RECONCILE_GRACE_SECONDS,
+            help='Leave changes younger than this alone; their events may still be on their way',
+        )
+    
+    def handle(self, *args, **options):
+        if options['since_minutes'] < 1 or options['grace_seconds'] < 0:
+            raise CommandError('--since-minutes must be >= 1 and --grace-seconds >= 0')
+        
+        since = timezone.now() - timedelta(minutes=options['since_minutes'])
+        written = reconcile(since, options['grace_seconds'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} missing schedule events'))
@@ -0,0 +1,92 @@
+import asyncio
+import resource
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from schedules import broadcast
+
+
+class Command(BaseCommand):
+    help = "Soak-test the SSE broker with many idle streams and measure fan-out latency"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000, help='Number of idle SSE streams')
+        parser.add_argument('--employees', type=int, default=500, help='Distinct employee channels to spread streams over')
+        parser.add_argument('--events', type=int, default=200, help='Status changes to publish')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to keep the streams open')
+        parser.add_argument('--heartbeat', type=float, default=5.0, help='Keep-alive interval in seconds')
+    
+    def handle(self, *args, **options):
+        asyncio.run(self._soak(options))
+    
+    async def _soak(self, options):
+        connections = options['connections']
+        employees = options['employees']
+        duration = options['duration']
+        
+        rss_before = self._rss_kb()
+        received = []
+        frames = [0]
+        
+        async def consume(channels):
+            async for frame in broadcast.iter_events(
+                    channels, follow_log=False, heartbeat=options['heartbeat'], max_duration=duration):
+                frames[0] += 1
+                if frame.startswith('id:'):
+                    received.append(time.perf_counter())
+        
+        # Most streams are employees; every tenth one is a supervisor
+        tasks = []
+        for i in range(connections):
+            channels = [broadcast.SUPERVISOR_CHANNEL] if i % 10 == 0 else [f'user:{i % employees}']
+            tasks.append(asyncio.create_task(consume(channels)))
+        await asyncio.sleep(0.5)
+        
+        rss_idle = self._rss_kb()
+        self.stdout.write(f"Open streams: {broadcast.broker.subscriber_count}")
+        self.stdout.write(f"RSS growth for idle streams: {rss_idle - rss_before} KiB "
+                          f"(~{(rss_idle - rss_before) * 1024 / max(connections, 1):.0f} bytes/stream)")
+        
+        # Publish from a plain thread, as the event log tail does
+        publish_times = []
+        deliveries = [0]
+        
+        def publish():
+            for n in range(options['events']):
+                event = {'id': n, 'status': 'approved', 'previous_status': 'submitted'}
+                channels = [f'user:{n % employees}', f'client:{n}', broadcast.SUPERVISOR_CHANNEL]
+                start = time.perf_counter()
+                deliveries[0] += broadcast.broker.publish(channels, event, n + 1)
+                publish_times.append(time.perf_counter() - start)
+                time.sleep(0.005)
+        
+        publish_started = time.perf_counter()
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        await asyncio.to_thread(publisher.join)
+        await asyncio.sleep(0.5)
+        last_delivery = max(received) if received else publish_started
+        
+        self.stdout.write(f"Events published: {options['events']}, deliveries: {deliveries[0]}, received: {len(received)}")
+        if publish_times:
+            self.stdout.write(
+                f"publish() latency: median {statistics.median(publish_times) * 1e6:.0f} us, "
+                f"max {max(publish_times) * 1e6:.0f} us"
+            )
+        self.stdout.write(f"Fan-out drained {last_delivery - publish_started:.2f}s after publishing started")
+        
+        await asyncio.gather(*tasks)
+        self.stdout.write(f"Frames written (events and keep-alives): {frames[0]}")
+        self.stdout.write(f"Streams left subscribed: {broadcast.broker.subscriber_count}")
+    
+    def _rss_kb(self):
+        # Linux reports ru_maxrss in KiB; use current RSS where available
+        try:
+            with open('/proc/self/statm') as statm:
+                pages = int(statm.read().split()[1])
+            return pages * resource.getpagesize() // 1024
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
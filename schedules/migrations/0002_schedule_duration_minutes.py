@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:48
+
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def backfill_duration_minutes(apps, schema_editor):
+    Schedule = apps.get_model('schedules', 'Schedule')
+    batch = []
+    for schedule in Schedule.objects.only('start_date', 'start_time', 'end_date', 'end_time').iterator(chunk_size=2000):
+        start = datetime.combine(schedule.start_date, schedule.start_time)
+        end = datetime.combine(schedule.end_date, schedule.end_time)
+        schedule.duration_minutes = max(int((end - start).total_seconds() // 60), 0)
+        batch.append(schedule)
+        if len(batch) >= 2000:
+            Schedule.objects.bulk_update(batch, ['duration_minutes'])
+            batch = []
+    if batch:
+        Schedule.objects.bulk_update(batch, ['duration_minutes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Scheduled duration in minutes, kept in sync on save for SQL aggregation'),
+        ),
+        migrations.RunPython(backfill_duration_minutes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0001_initial'),
+        ('schedules', '0002_schedule_duration_minutes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.CharField(help_text='Comma-separated weekdays the pattern repeats on (0 = Monday)', max_length=13)),
+                ('start_time', models.TimeField(help_text='Start time of each occurrence')),
+                ('end_time', models.TimeField(help_text='End time of each occurrence; earlier than the start runs past midnight')),
+                ('starts_on', models.DateField(help_text='First date the pattern applies')),
+                ('ends_on', models.DateField(blank=True, help_text='Last date the pattern applies; leave empty to repeat indefinitely', null=True)),
+                ('notes', models.TextField(blank=True, help_text='Notes copied to each occurrence', null=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Whether the pattern still produces occurrences')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.ForeignKey(help_text='Client for every occurrence', on_delete=django.db.models.deletion.CASCADE, related_name='schedule_recurrences', to='clients.client')),
+                ('employee', models.ForeignKey(help_text='Employee the pattern belongs to', limit_choices_to={'role': 'employee'}, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_recurrences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Schedule Recurrence',
+                'verbose_name_plural': 'Schedule Recurrences',
+                'db_table': 'schedule_recurrences',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, help_text='Recurring pattern this schedule was created from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='schedules.schedulerecurrence'),
+        ),
+        migrations.CreateModel(
+            name='ScheduleRecurrenceException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Skipped occurrence date')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('recurrence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='schedules.schedulerecurrence')),
+            ],
+            options={
+                'db_table': 'schedule_recurrence_exceptions',
+                'unique_together': {('recurrence', 'date')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='schedulerecurrence',
+            index=models.Index(fields=['employee', 'starts_on'], name='schedule_re_employe_164352_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedulerecurrence',
+            index=models.Index(fields=['client', 'starts_on'], name='schedule_re_client__3bff87_idx'),
+        ),
+    ]
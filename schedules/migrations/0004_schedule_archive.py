@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0001_initial'),
+        ('schedules', '0003_schedule_recurrences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('start_date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_date', models.DateField()),
+                ('end_time', models.TimeField()),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('submitted', 'Submitted'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('modified', 'Modified')], max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('rejection_reason', models.TextField(blank=True, null=True)),
+                ('duration_minutes', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_archived', models.BooleanField()),
+            ],
+            options={
+                'db_table': 'schedule_history',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSchedule',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Primary key the schedule had in the hot table', primary_key=True, serialize=False)),
+                ('start_date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_date', models.DateField()),
+                ('end_time', models.TimeField()),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('submitted', 'Submitted'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('modified', 'Modified')], help_text='Final status of the schedule', max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('rejection_reason', models.TextField(blank=True, null=True)),
+                ('duration_minutes', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('approved_by', models.ForeignKey(blank=True, help_text='Supervisor who approved the schedule', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='approved_archived_schedules', to=settings.AUTH_USER_MODEL)),
+                ('client', models.ForeignKey(help_text='Client for the schedule', on_delete=django.db.models.deletion.CASCADE, related_name='archived_schedules', to='clients.client')),
+                ('employee', models.ForeignKey(help_text='Employee who created the schedule', on_delete=django.db.models.deletion.CASCADE, related_name='archived_schedules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived Schedule',
+                'verbose_name_plural': 'Archived Schedules',
+                'db_table': 'archived_schedules',
+                'ordering': ['-start_date'],
+                'indexes': [models.Index(fields=['employee', 'start_date'], name='archived_sc_employe_67dd2c_idx'), models.Index(fields=['client', 'start_date'], name='archived_sc_client__86fa6b_idx'), models.Index(fields=['start_date'], name='archived_sc_start_d_de8535_idx')],
+            },
+        ),
+    ]
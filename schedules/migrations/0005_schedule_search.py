@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:20
+
+from django.db import migrations
+
+EMPLOYEE_NAME_SQL = "COALESCE(NULLIF(TRIM(u.first_name || ' ' || u.last_name), ''), u.username)"
+
+SOURCE_SQL = (
+    "FROM schedules s "
+    "JOIN clients c ON c.id = s.client_id "
+    "JOIN users u ON u.id = s.employee_id"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE schedule_search USING fts5("
+            "employee_id UNINDEXED, client_id UNINDEXED, client, employee, notes, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            "INSERT INTO schedule_search (rowid, employee_id, client_id, client, employee, notes) "
+            f"SELECT s.id, s.employee_id, s.client_id, c.name, {EMPLOYEE_NAME_SQL}, COALESCE(s.notes, '') "
+            f"{SOURCE_SQL}"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE schedule_search ("
+            "schedule_id bigint PRIMARY KEY, "
+            "employee_id bigint NOT NULL, "
+            "client_id bigint NOT NULL, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute("CREATE INDEX schedule_search_document_idx ON schedule_search USING GIN (document)")
+        schema_editor.execute("CREATE INDEX schedule_search_employee_idx ON schedule_search (employee_id)")
+        schema_editor.execute(
+            "INSERT INTO schedule_search (schedule_id, employee_id, client_id, document) "
+            "SELECT s.id, s.employee_id, s.client_id, "
+            "setweight(to_tsvector('simple', c.name), 'A') || "
+            f"setweight(to_tsvector('simple', {EMPLOYEE_NAME_SQL}), 'A') || "
+            "setweight(to_tsvector('simple', COALESCE(s.notes, '')), 'C') "
+            f"{SOURCE_SQL}"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS schedule_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0004_schedule_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
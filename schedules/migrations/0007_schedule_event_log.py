@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0006_schedule_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Consumer name', max_length=100, unique=True)),
+                ('position', models.BigIntegerField(default=0, help_text='Sequence number of the last event the consumer finished')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'schedule_event_cursors',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScheduleEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schedule_id', models.BigIntegerField(help_text='Schedule the event is about')),
+                ('employee_id', models.BigIntegerField(help_text='Employee of the schedule when the event happened (the previous one for a move)')),
+                ('client_id', models.BigIntegerField(help_text='Client of the schedule when the event happened (the previous one for a move)')),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('transition', 'Status Transition'), ('moved', 'Moved'), ('deleted', 'Deleted')], max_length=20)),
+                ('status', models.CharField(help_text='Schedule status after the event', max_length=20)),
+                ('previous_status', models.CharField(blank=True, default='', help_text='Status before a transition', max_length=20)),
+                ('version', models.PositiveIntegerField(help_text='Schedule version after the event')),
+                ('actor_id', models.BigIntegerField(blank=True, help_text='User who made the change, when known', null=True)),
+                ('changes', models.JSONField(blank=True, default=dict, help_text='Fields set by the event, with their new values')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'schedule_events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['schedule_id', 'id'], name='schedule_ev_schedul_e79373_idx'), models.Index(fields=['employee_id', 'id'], name='schedule_ev_employe_766951_idx'), models.Index(fields=['client_id', 'id'], name='schedule_ev_client__23abe9_idx')],
+            },
+        ),
+    ]
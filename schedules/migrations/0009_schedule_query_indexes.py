@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0008_schedule_day_status_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='schedule',
+            name='schedules_status_0e1604_idx',
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['employee', 'status', 'start_date'], name='schedules_employe_1301f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['status', 'submitted_at'], name='schedules_status_44a693_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['created_at', 'id'], name='schedules_created_141105_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:13
+
+from django.db import migrations, models
+
+
+def backfill_recurrence_date(apps, schema_editor):
+    # Best effort: the original date of an occurrence that was already moved
+    # is lost. Of several schedules on one date, the oldest keeps it.
+    Schedule = apps.get_model('schedules', 'Schedule')
+    seen = set()
+    batch = []
+    rows = Schedule.objects.filter(recurrence__isnull=False).only('recurrence_id', 'start_date').order_by('id')
+    for schedule in rows.iterator(chunk_size=2000):
+        key = (schedule.recurrence_id, schedule.start_date)
+        if key in seen:
+            continue
+        seen.add(key)
+        schedule.recurrence_date = schedule.start_date
+        batch.append(schedule)
+        if len(batch) >= 2000:
+            Schedule.objects.bulk_update(batch, ['recurrence_date'])
+            batch = []
+    if batch:
+        Schedule.objects.bulk_update(batch, ['recurrence_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0009_schedule_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='recurrence_date',
+            field=models.DateField(blank=True, editable=False, help_text='Date of the occurrence this schedule was created from; unchanged when the schedule is moved', null=True),
+        ),
+        migrations.RunPython(backfill_recurrence_date, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('recurrence', 'recurrence_date'), name='unique_recurrence_occurrence'),
+        ),
+    ]
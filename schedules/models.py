@@ -1,8 +1,189 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from accounts.models import User
 from clients.models import Client
+from .signals import schedule_status_changed
+
+
+class ConcurrentUpdateError(Exception):
+    """The schedule changed (status or version) since this copy was loaded"""
+
+
+class ScheduleQuerySet(models.QuerySet):
+    """QuerySet helpers shared by schedule views, feeds and reports"""
+    
+    def for_user(self, user):
+        """Restrict schedules to those visible to the given user's role"""
+        if user.is_employee:
+            return self.filter(employee=user)
+        elif user.is_client:
+            # Clients are matched to their client record by name
+            return self.filter(client__name=user.get_full_name())
+        # Supervisors see all schedules
+        return self
+
+
+class ScheduleRecurrence(models.Model):
+    """
+    Weekly recurring schedule pattern, expanded lazily into occurrences
+    Only occurrences that are edited or submitted become Schedule rows
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+    
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='schedule_recurrences',
+        limit_choices_to={'role': 'employee'},
+        help_text="Employee the pattern belongs to"
+    )
+    
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='schedule_recurrences',
+        help_text="Client for every occurrence"
+    )
+    
+    weekdays = models.CharField(
+        max_length=13,
+        help_text="Comma-separated weekdays the pattern repeats on (0 = Monday)"
+    )
+    
+    start_time = models.TimeField(
+        help_text="Start time of each occurrence"
+    )
+    
+    end_time = models.TimeField(
+        help_text="End time of each occurrence; earlier than the start runs past midnight"
+    )
+    
+    starts_on = models.DateField(
+        help_text="First date the pattern applies"
+    )
+    
+    ends_on = models.DateField(
+        blank=True,
+        null=True,
+        help_text="Last date the pattern applies; leave empty to repeat indefinitely"
+    )
+    
+    notes = models.TextField(
+        blank=True,
+        null=True,
+        help_text="Notes copied to each occurrence"
+    )
+    
+    is_active = models.BooleanField(
+        default=True,
+        help_text="Whether the pattern still produces occurrences"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'schedule_recurrences'
+        verbose_name = 'Schedule Recurrence'
+        verbose_name_plural = 'Schedule Recurrences'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['employee', 'starts_on']),
+            models.Index(fields=['client', 'starts_on']),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee.get_full_name()} - {self.client.name} ({self.weekday_names})"
+    
+    @property
+    def weekday_list(self):
+        return [int(day) for day in self.weekdays.split(',') if day != '']
+    
+    @property
+    def weekday_names(self):
+        names = dict(self.WEEKDAY_CHOICES)
+        return ', '.join(names[day][:3] for day in self.weekday_list)
+    
+    def occurs_on(self, day):
+        """Whether the pattern produces an occurrence on ``day`` (ignoring exceptions)"""
+        return (
+            self.is_active
+            and day >= self.starts_on
+            and (self.ends_on is None or day <= self.ends_on)
+            and day.weekday() in self.weekday_list
+        )
+    
+    def end_date_for(self, day):
+        """End date of the occurrence starting on ``day``"""
+        from datetime import timedelta
+        return day + timedelta(days=1) if self.end_time <= self.start_time else day
+    
+    def materialize(self, day):
+        """
+        Create (or return) the real draft schedule for the occurrence on ``day``
+
+        The schedule remembers ``day`` as its ``recurrence_date``, so it keeps
+        standing in for the occurrence after its own dates are edited.
+        """
+        existing = self.occurrences.filter(recurrence_date=day).first()
+        if existing:
+            return existing
+        schedule = Schedule(
+            employee=self.employee,
+            client=self.client,
+            recurrence=self,
+            recurrence_date=day,
+            start_date=day,
+            start_time=self.start_time,
+            end_date=self.end_date_for(day),
+            end_time=self.end_time,
+            notes=self.notes,
+            status='draft',
+        )
+        try:
+            with transaction.atomic():
+                schedule.save()
+        except IntegrityError:
+            # Materialized concurrently
+            return self.occurrences.get(recurrence_date=day)
+        return schedule
+    
+    def skip(self, day):
+        """Stop the pattern producing an occurrence on ``day``"""
+        ScheduleRecurrenceException.objects.get_or_create(recurrence=self, date=day)
+
+
+class ScheduleRecurrenceException(models.Model):
+    """
+    Date on which a recurrence produces no occurrence
+    """
+    recurrence = models.ForeignKey(
+        ScheduleRecurrence,
+        on_delete=models.CASCADE,
+        related_name='exceptions'
+    )
+    
+    date = models.DateField(
+        help_text="Skipped occurrence date"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'schedule_recurrence_exceptions'
+        unique_together = ['recurrence', 'date']
+    
+    def __str__(self):
+        return f"{self.recurrence} skipped on {self.date}"
 
 
 class Schedule(models.Model):
@@ -90,9 +271,39 @@ class Schedule(models.Model):
         help_text="Reason for rejection if applicable"
     )
     
+    recurrence = models.ForeignKey(
+        ScheduleRecurrence,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='occurrences',
+        help_text="Recurring pattern this schedule was created from"
+    )
+    
+    recurrence_date = models.DateField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Date of the occurrence this schedule was created from; unchanged when the schedule is moved"
+    )
+    
+    duration_minutes = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Scheduled duration in minutes, kept in sync on save for SQL aggregation"
+    )
+    
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Incremented on every change; writes only apply to the version they read"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ScheduleQuerySet.as_manager()
+    
     class Meta:
         db_table = 'schedules'
         verbose_name = 'Schedule'
@@ -101,13 +312,28 @@ class Schedule(models.Model):
         indexes = [
             models.Index(fields=['employee', 'start_date']),
             models.Index(fields=['client', 'start_date']),
-            models.Index(fields=['status']),
             models.Index(fields=['start_date', 'end_date']),
+            # Covers the per-day status counts of the quarter and year calendars
+            models.Index(fields=['start_date', 'status']),
+            # An employee's schedules of one status in a date range
+            models.Index(fields=['employee', 'status', 'start_date']),
+            # Pending approvals, newest submission first; also serves plain status filters
+            models.Index(fields=['status', 'submitted_at']),
+            # List pages, newest first
+            models.Index(fields=['created_at', 'id']),
+        ]
+        constraints = [
+            # An occurrence is materialized at most once
+            models.UniqueConstraint(fields=['recurrence', 'recurrence_date'], name='unique_recurrence_occurrence'),
         ]
     
     def __str__(self):
         return f"{self.employee.get_full_name()} - {self.client.name} ({self.start_date})"
     
+    def get_absolute_url(self):
+        from django.urls import reverse
+        return reverse('schedules:detail', kwargs={'pk': self.pk})
+    
     def clean(self):
         """Validate schedule data based on business rules"""
         super().clean()
@@ -140,9 +366,42 @@ class Schedule(models.Model):
             if duration.total_seconds() > 43200:  # 12 hours
                 raise ValidationError("Schedule duration cannot exceed 12 hours.")
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so the event log can record only what a save changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
+        self.duration_minutes = self.compute_duration_minutes()
+        if self._state.adding:
+            # Atomic so the row and its post_save search document commit together
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+            return
+        
+        # Claim the next version first so an edit based on a stale copy
+        # cannot silently overwrite a concurrent transition or edit
+        with transaction.atomic():
+            claimed = Schedule.objects.filter(pk=self.pk, version=self.version).update(version=models.F('version') + 1)
+            if not claimed:
+                raise ConcurrentUpdateError("This schedule was changed by someone else. Reload it and try again.")
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) - {'version'}
+            super().save(*args, **kwargs)
+    
+    def compute_duration_minutes(self):
+        """Duration between start and end in whole minutes"""
+        if self.start_date and self.end_date and self.start_time and self.end_time:
+            from datetime import datetime
+            start_datetime = datetime.combine(self.start_date, self.start_time)
+            end_datetime = datetime.combine(self.end_date, self.end_time)
+            return max(int((end_datetime - start_datetime).total_seconds() // 60), 0)
+        return 0
     
     @property
     def duration_hours(self):
@@ -172,36 +431,54 @@ class Schedule(models.Model):
     
     def submit_for_approval(self):
         """Submit schedule for supervisor approval"""
-        if self.status == 'draft':
-            self.status = 'submitted'
-            self.submitted_at = timezone.now()
-            self.save(update_fields=['status', 'submitted_at'])
+        self._transition('draft', 'submitted', self.employee, submitted_at=timezone.now())
     
     def approve(self, supervisor):
         """Approve schedule by supervisor"""
-        if self.status == 'submitted' and supervisor.is_supervisor:
-            self.status = 'approved'
-            self.approved_by = supervisor
-            self.approved_at = timezone.now()
-            self.save(update_fields=['status', 'approved_by', 'approved_at'])
+        if supervisor.is_supervisor:
+            self._transition('submitted', 'approved', supervisor, approved_by=supervisor, approved_at=timezone.now())
     
     def reject(self, supervisor, reason=None):
         """Reject schedule by supervisor"""
-        if self.status == 'submitted' and supervisor.is_supervisor:
-            self.status = 'rejected'
-            self.approved_by = supervisor
-            self.approved_at = timezone.now()
-            self.rejection_reason = reason
-            self.save(update_fields=['status', 'approved_by', 'approved_at', 'rejection_reason'])
+        if supervisor.is_supervisor:
+            self._transition('submitted', 'rejected', supervisor, approved_by=supervisor,
+                             approved_at=timezone.now(), rejection_reason=reason)
     
     def request_modification(self, supervisor, reason=None):
         """Request modification by supervisor"""
-        if self.status == 'submitted' and supervisor.is_supervisor:
-            self.status = 'modified'
-            self.approved_by = supervisor
-            self.approved_at = timezone.now()
-            self.rejection_reason = reason
-            self.save(update_fields=['status', 'approved_by', 'approved_at', 'rejection_reason'])
+        if supervisor.is_supervisor:
+            self._transition('submitted', 'modified', supervisor, approved_by=supervisor,
+                             approved_at=timezone.now(), rejection_reason=reason)
+    
+    def _transition(self, from_status, to_status, actor, **changes):
+        """
+        Move from ``from_status`` to ``to_status`` with one conditional UPDATE
+        
+        The row only changes if it still has the status and version this copy
+        was loaded with, so of two concurrent transitions exactly one wins and
+        the other raises ConcurrentUpdateError. No row lock or re-read is needed.
+        """
+        if self.status != from_status:
+            raise ConcurrentUpdateError(f"This schedule is {self.get_status_display().lower()}, not {from_status}.")
+        
+        now = timezone.now()
+        with transaction.atomic():
+            updated = Schedule.objects.filter(pk=self.pk, status=from_status, version=self.version).update(
+                status=to_status,
+                version=models.F('version') + 1,
+                updated_at=now,
+                **changes
+            )
+            if not updated:
+                raise ConcurrentUpdateError("This schedule was changed by someone else. Reload it and try again.")
+            
+            previous_status = self.status
+            for field, value in changes.items():
+                setattr(self, field, value)
+            self.status = to_status
+            self.version += 1
+            self.updated_at = now
+            schedule_status_changed.send(sender=Schedule, schedule=self, previous_status=previous_status, actor=actor)
 
 
 class ScheduleConflict(models.Model):
@@ -236,4 +513,215 @@ class ScheduleConflict(models.Model):
         unique_together = ['schedule', 'conflicting_schedule']
     
     def __str__(self):
-        return f"Conflict: {self.schedule} vs {self.conflicting_schedule}"
\ No newline at end of file
+        return f"Conflict: {self.schedule} vs {self.conflicting_schedule}"
+
+
+class ScheduleEvent(models.Model):
+    """
+    Append-only log entry for a schedule change
+    The primary key is the log sequence number; see schedules/eventlog.py
+    """
+    KIND_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('transition', 'Status Transition'),
+        ('moved', 'Moved'),
+        ('deleted', 'Deleted'),
+    ]
+    
+    # Plain ids rather than foreign keys: events outlive the rows they describe
+    schedule_id = models.BigIntegerField(
+        help_text="Schedule the event is about"
+    )
+    
+    employee_id = models.BigIntegerField(
+        help_text="Employee of the schedule when the event happened (the previous one for a move)"
+    )
+    
+    client_id = models.BigIntegerField(
+        help_text="Client of the schedule when the event happened (the previous one for a move)"
+    )
+    
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES
+    )
+    
+    status = models.CharField(
+        max_length=20,
+        help_text="Schedule status after the event"
+    )
+    
+    previous_status = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        help_text="Status before a transition"
+    )
+    
+    version = models.PositiveIntegerField(
+        help_text="Schedule version after the event"
+    )
+    
+    actor_id = models.BigIntegerField(
+        blank=True,
+        null=True,
+        help_text="User who made the change, when known"
+    )
+    
+    changes = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Fields set by the event, with their new values"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'schedule_events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['schedule_id', 'id']),
+            # Delta sync of one employee's or client's schedules
+            models.Index(fields=['employee_id', 'id']),
+            models.Index(fields=['client_id', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.pk} schedule {self.schedule_id} {self.kind}"
+
+
+class EventCursor(models.Model):
+    """
+    Position of one named consumer in the schedule event log
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Consumer name"
+    )
+    
+    position = models.BigIntegerField(
+        default=0,
+        help_text="Sequence number of the last event the consumer finished"
+    )
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'schedule_event_cursors'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} at #{self.position}"
+
+
+class ArchivedSchedule(models.Model):
+    """
+    Closed schedule moved out of the hot ``schedules`` table
+    Rows keep their original primary key; see schedules/archive.py
+    """
+    id = models.BigIntegerField(
+        primary_key=True,
+        help_text="Primary key the schedule had in the hot table"
+    )
+    
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_schedules',
+        help_text="Employee who created the schedule"
+    )
+    
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='archived_schedules',
+        help_text="Client for the schedule"
+    )
+    
+    start_date = models.DateField()
+    start_time = models.TimeField()
+    end_date = models.DateField()
+    end_time = models.TimeField()
+    
+    status = models.CharField(
+        max_length=20,
+        choices=Schedule.STATUS_CHOICES,
+        help_text="Final status of the schedule"
+    )
+    
+    notes = models.TextField(blank=True, null=True)
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    
+    approved_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='approved_archived_schedules',
+        help_text="Supervisor who approved the schedule"
+    )
+    
+    approved_at = models.DateTimeField(blank=True, null=True)
+    rejection_reason = models.TextField(blank=True, null=True)
+    duration_minutes = models.PositiveIntegerField(default=0)
+    
+    # Copied from the hot row, so not auto_now
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'archived_schedules'
+        verbose_name = 'Archived Schedule'
+        verbose_name_plural = 'Archived Schedules'
+        ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['employee', 'start_date']),
+            models.Index(fields=['client', 'start_date']),
+            models.Index(fields=['start_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee.get_full_name()} - {self.client.name} ({self.start_date}, archived)"
+    
+    @property
+    def duration_hours(self):
+        return round(self.duration_minutes / 60, 2)
+
+
+class ScheduleHistory(models.Model):
+    """
+    Read-only union of live and archived schedules (the ``schedule_history`` view)
+    Reports and exports query this when a date range reaches into the archive
+    """
+    id = models.BigIntegerField(primary_key=True)
+    employee = models.ForeignKey(User, on_delete=models.DO_NOTHING, related_name='+')
+    client = models.ForeignKey(Client, on_delete=models.DO_NOTHING, related_name='+')
+    start_date = models.DateField()
+    start_time = models.TimeField()
+    end_date = models.DateField()
+    end_time = models.TimeField()
+    status = models.CharField(max_length=20, choices=Schedule.STATUS_CHOICES)
+    notes = models.TextField(blank=True, null=True)
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    approved_by = models.ForeignKey(User, on_delete=models.DO_NOTHING, blank=True, null=True, related_name='+')
+    approved_at = models.DateTimeField(blank=True, null=True)
+    rejection_reason = models.TextField(blank=True, null=True)
+    duration_minutes = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_archived = models.BooleanField()
+    
+    class Meta:
+        managed = False
+        db_table = 'schedule_history'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.employee.get_full_name()} - {self.client.name} ({self.start_date})"
+    
+    @property
+    def duration_hours(self):
+        return round(self.duration_minutes / 60, 2)
@@ -0,0 +1,110 @@
+"""
+Per-day schedule counts for the quarter and year calendars
+
+Long horizons only need a badge per day, so these calendars fetch
+``GROUP BY start_date, status`` counts (at most a few hundred rows for a
+year, however many schedules there are) instead of schedule rows. A day's
+schedules are loaded through HTMX when it is clicked.
+"""
+from calendar import Calendar, monthrange
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Schedule
+from .recurrence import occurrences_for_user
+
+# Months shown by each calendar mode
+MODE_MONTHS = {
+    'quarter': 3,
+    'year': 12,
+}
+
+# Cell shading by share of the busiest day in the period
+LEVEL_CLASSES = (
+    'bg-white text-gray-700',
+    'bg-blue-100 text-blue-900',
+    'bg-blue-200 text-blue-900',
+    'bg-blue-400 text-white',
+    'bg-blue-600 text-white',
+)
+
+# Sunday first, like the month calendar
+_calendar = Calendar(firstweekday=6)
+
+
+def period_months(mode, year, quarter=1):
+    """(year, month) pairs shown by ``mode`` for the given year and quarter"""
+    first_month = (quarter - 1) * 3 + 1 if mode == 'quarter' else 1
+    return [(year, month) for month in range(first_month, first_month + MODE_MONTHS[mode])]
+
+
+def period_bounds(months):
+    """First and last date covered by a list of (year, month) pairs"""
+    (first_year, first_month), (last_year, last_month) = months[0], months[-1]
+    return date(first_year, first_month, 1), date(last_year, last_month, monthrange(last_year, last_month)[1])
+
+
+def day_counts(user, start, end):
+    """
+    {date: {status: count}} for the schedules ``user`` may see
+
+    Recurring occurrences that have not been materialized yet are counted
+    under ``'recurring'``.
+    """
+    counts = defaultdict(dict)
+    rows = (
+        Schedule.objects.for_user(user)
+        .filter(start_date__gte=start, start_date__lte=end)
+        .order_by()
+        .values_list('start_date', 'status')
+        .annotate(count=Count('id'))
+    )
+    for day, status, count in rows:
+        counts[day][status] = count
+    for occurrence in occurrences_for_user(user, start, end):
+        statuses = counts[occurrence.start_date]
+        statuses['recurring'] = statuses.get('recurring', 0) + 1
+    return counts
+
+
+def month_grids(months, counts):
+    """
+    Week rows for each month, ready for the template
+
+    Each day is a dict with its date, total, a "3 approved, 1 submitted"
+    summary and a shading class; days of neighbouring months are None.
+    """
+    busiest = max((sum(day.values()) for day in counts.values()), default=0)
+    today = timezone.now().date()
+
+    grids = []
+    for year, month in months:
+        weeks = []
+        month_total = 0
+        for week in _calendar.monthdatescalendar(year, month):
+            cells = []
+            for day in week:
+                if day.month != month:
+                    cells.append(None)
+                    continue
+                statuses = counts.get(day, {})
+                total = sum(statuses.values())
+                month_total += total
+                level = 0 if not total else 1 + min(3, (total * 4 - 1) // busiest)
+                cells.append({
+                    'date': day,
+                    'total': total,
+                    'summary': ', '.join(f"{count} {status}" for status, count in sorted(statuses.items())),
+                    'css': LEVEL_CLASSES[level],
+                    'is_today': day == today,
+                })
+            weeks.append(cells)
+        grids.append({
+            'name': date(year, month, 1).strftime('%B %Y'),
+            'weeks': weeks,
+            'total': month_total,
+        })
+    return grids
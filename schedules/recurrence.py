@@ -0,0 +1,203 @@
+"""
+Lazy expansion of recurring schedules into occurrences for a date window
+
+Occurrences are plain objects shaped like ``Schedule`` so calendars, tables
+and reports can mix them with real rows. Nothing is written until an
+occurrence is edited or submitted (``ScheduleRecurrence.materialize``).
+
+Only occurrences from today on are produced: schedules cannot be created in
+the past, so an earlier occurrence could never be edited or submitted.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Prefetch, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from . import rules
+from .models import Schedule, ScheduleRecurrence, ScheduleRecurrenceException
+
+# Days of two overlapping patterns compared by ``overlap_error``: two weeks
+# cover every weekday, and their neighbours for shifts past midnight
+PATTERN_SCAN_DAYS = 14
+
+
+class Occurrence:
+    """A not-yet-materialized instance of a recurrence on one date"""
+
+    is_occurrence = True
+    pk = id = None
+    status = 'draft'
+
+    def __init__(self, recurrence, day):
+        self.recurrence = recurrence
+        self.employee = recurrence.employee
+        self.client = recurrence.client
+        self.start_date = day
+        self.start_time = recurrence.start_time
+        self.end_date = recurrence.end_date_for(day)
+        self.end_time = recurrence.end_time
+        self.notes = recurrence.notes
+
+    def __repr__(self):
+        return f"<Occurrence recurrence={self.recurrence.pk} date={self.start_date}>"
+
+    def get_status_display(self):
+        return 'Recurring'
+
+    def get_absolute_url(self):
+        return reverse('schedules:occurrence', kwargs={
+            'pk': self.recurrence.pk,
+            'date': self.start_date.isoformat(),
+        })
+
+    @property
+    def duration_minutes(self):
+        start = self.start_time.hour * 60 + self.start_time.minute
+        end = self.end_time.hour * 60 + self.end_time.minute
+        return end - start if end > start else end + 1440 - start
+
+    @property
+    def duration_hours(self):
+        return round(self.duration_minutes / 60, 2)
+
+
+def recurrences_for_user(user):
+    """Recurrences whose occurrences the given user may see"""
+    recurrences = ScheduleRecurrence.objects.select_related('employee', 'client')
+    if user.is_employee:
+        return recurrences.filter(employee=user)
+    elif user.is_client:
+        return recurrences.filter(client__name=user.get_full_name())
+    return recurrences
+
+
+def expand(recurrences, start, end, today=None):
+    """
+    Occurrences of ``recurrences`` from ``start`` to ``end`` inclusive
+
+    Dates before ``today``, with an exception or with an already materialized
+    schedule are skipped. Cost is bounded by the window, never by how far a
+    pattern repeats.
+    """
+    start = max(start, today or timezone.now().date())
+    if start > end:
+        return []
+    recurrences = list(
+        recurrences.filter(is_active=True, starts_on__lte=end)
+        .filter(Q(ends_on__isnull=True) | Q(ends_on__gte=start))
+        .prefetch_related(Prefetch(
+            'exceptions',
+            queryset=ScheduleRecurrenceException.objects.filter(date__gte=start, date__lte=end),
+        ))
+    )
+    if not recurrences:
+        return []
+
+    materialized = defaultdict(set)
+    # Matched on the occurrence date, which edits to the schedule leave alone
+    rows = Schedule.objects.filter(
+        recurrence__in=recurrences,
+        recurrence_date__gte=start,
+        recurrence_date__lte=end,
+    ).order_by().values_list('recurrence_id', 'recurrence_date')
+    for recurrence_id, day in rows:
+        materialized[recurrence_id].add(day)
+
+    occurrences = []
+    for recurrence in recurrences:
+        skipped = materialized[recurrence.pk] | {exception.date for exception in recurrence.exceptions.all()}
+        weekdays = set(recurrence.weekday_list)
+        day = max(start, recurrence.starts_on)
+        last = min(end, recurrence.ends_on) if recurrence.ends_on else end
+        while day <= last:
+            if day.weekday() in weekdays and day not in skipped:
+                occurrences.append(Occurrence(recurrence, day))
+            day += timedelta(days=1)
+
+    occurrences.sort(key=lambda occurrence: (occurrence.start_date, occurrence.start_time))
+    return occurrences
+
+
+def occurrences_for_user(user, start, end):
+    """Occurrences visible to ``user`` in the window"""
+    return expand(recurrences_for_user(user), start, end)
+
+
+def _pattern_days(recurrence, first, last):
+    """Dates from ``first`` to ``last`` inclusive on which ``recurrence`` occurs"""
+    day = max(first, recurrence.starts_on)
+    if recurrence.ends_on:
+        last = min(last, recurrence.ends_on)
+    while day <= last:
+        if recurrence.occurs_on(day):
+            yield day
+        day += timedelta(days=1)
+
+
+def overlap_error(pattern, today=None):
+    """
+    Return an error message if an upcoming occurrence of ``pattern`` (a
+    possibly unsaved recurrence) would overlap, or sit closer than the minimum
+    gap to, another schedule or recurring schedule of the same employee
+    """
+    first = max(pattern.starts_on, today or timezone.now().date())
+    if pattern.ends_on and pattern.ends_on < first:
+        return None
+    one_day = timedelta(days=1)
+    
+    schedules = Schedule.objects.filter(
+        employee_id=pattern.employee_id,
+        status__in=rules.BLOCKING_STATUSES,
+        end_date__gte=first - one_day,
+    )
+    if pattern.ends_on:
+        schedules = schedules.filter(start_date__lte=pattern.ends_on + one_day)
+    if pattern.pk:
+        schedules = schedules.exclude(recurrence=pattern)
+    for schedule in schedules.order_by('start_date', 'start_time'):
+        other = (
+            rules.to_minutes(schedule.start_date, schedule.start_time),
+            rules.to_minutes(schedule.end_date, schedule.end_time),
+        )
+        for day in _pattern_days(pattern, max(first, schedule.start_date - one_day), schedule.end_date):
+            if rules.overlaps(*rules.window_bounds(day, pattern.start_time, pattern.end_time), *other):
+                return (f"The occurrence on {day:%b %d, %Y} overlaps your schedule on "
+                        f"{schedule.start_date:%b %d, %Y} ({schedule.start_time:%H:%M}-{schedule.end_time:%H:%M}).")
+    
+    recurrences = (
+        ScheduleRecurrence.objects.filter(employee_id=pattern.employee_id, is_active=True)
+        .filter(Q(ends_on__isnull=True) | Q(ends_on__gte=first - one_day))
+        .exclude(pk=pattern.pk)
+    )
+    if pattern.ends_on:
+        recurrences = recurrences.filter(starts_on__lte=pattern.ends_on + one_day)
+    for recurrence in recurrences.select_related('employee', 'client'):
+        scan_from = max(first, recurrence.starts_on - one_day)
+        for day in _pattern_days(pattern, scan_from, scan_from + timedelta(days=PATTERN_SCAN_DAYS)):
+            bounds = rules.window_bounds(day, pattern.start_time, pattern.end_time)
+            for other_day in (day - one_day, day, day + one_day):
+                if recurrence.occurs_on(other_day) and rules.overlaps(
+                        *bounds, *rules.window_bounds(other_day, recurrence.start_time, recurrence.end_time)):
+                    return f"The occurrence on {day:%b %d, %Y} overlaps your recurring schedule {recurrence}."
+    return None
+
+
+def occurrence_overlap_error(employee_id, start_date, start_time, end_date, end_time, today=None):
+    """
+    Return an error message if a one-off schedule would overlap, or sit closer
+    than the minimum gap to, an upcoming occurrence of one of the employee's
+    recurring schedules that is not materialized yet
+    """
+    recurrences = ScheduleRecurrence.objects.filter(employee_id=employee_id).select_related('employee', 'client')
+    bounds = (rules.to_minutes(start_date, start_time), rules.to_minutes(end_date, end_time))
+    for occurrence in expand(recurrences, start_date - timedelta(days=1), end_date + timedelta(days=1), today):
+        other = (
+            rules.to_minutes(occurrence.start_date, occurrence.start_time),
+            rules.to_minutes(occurrence.end_date, occurrence.end_time),
+        )
+        if rules.overlaps(*bounds, *other):
+            return (f"This overlaps your recurring schedule {occurrence.recurrence} on "
+                    f"{occurrence.start_date:%b %d, %Y} ({occurrence.start_time:%H:%M}-{occurrence.end_time:%H:%M}).")
+    return None
@@ -0,0 +1,56 @@
+"""
+Scheduling business rules shared by availability search and staffing
+
+Durations mirror ``Schedule.clean``; the gap and daily/weekly caps can be
+tuned in settings.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+
+MIN_DURATION_MINUTES = 60
+MAX_DURATION_MINUTES = 12 * 60
+
+# Minimum break between two schedules of the same employee
+MIN_GAP_MINUTES = getattr(settings, 'SCHEDULE_MIN_GAP_MINUTES', 30)
+
+# Caps on an employee's booked time
+MAX_DAILY_MINUTES = getattr(settings, 'SCHEDULE_MAX_DAILY_HOURS', 12) * 60
+MAX_WEEKLY_MINUTES = getattr(settings, 'SCHEDULE_MAX_WEEKLY_HOURS', 40) * 60
+
+# Statuses that occupy an employee's time; rejected schedules free it again
+BLOCKING_STATUSES = ('draft', 'submitted', 'approved', 'modified')
+
+
+def to_minutes(day, time):
+    """Absolute minute number for a date and time, comparable across days"""
+    return day.toordinal() * 1440 + time.hour * 60 + time.minute
+
+
+def window_bounds(day, start_time, end_time):
+    """``(start, end)`` minutes of a daily window; an end at or before the start runs past midnight"""
+    start = to_minutes(day, start_time)
+    end = to_minutes(day, end_time)
+    if end <= start:
+        end += 1440
+    return start, end
+
+
+def week_start(day):
+    """Monday of the week containing ``day``"""
+    return day - timedelta(days=day.weekday())
+
+
+def overlaps(start, end, other_start, other_end, gap=MIN_GAP_MINUTES):
+    """Whether two intervals overlap or sit closer together than ``gap`` minutes"""
+    return start < other_end + gap and other_start < end + gap
+
+
+def validate_duration(minutes):
+    """Return an error message if a duration breaks the 1-12 hour rule"""
+    if minutes < MIN_DURATION_MINUTES:
+        return "Schedule duration must be at least 1 hour."
+    if minutes > MAX_DURATION_MINUTES:
+        return "Schedule duration cannot exceed 12 hours."
+    return None
+
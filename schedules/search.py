@@ -0,0 +1,260 @@
+"""
+Full-text search over schedules, their clients and employees
+
+Each schedule has one document in ``schedule_search`` holding its client
+name, employee name and notes, so a query like "acme smith" finds Smith's
+schedules for Acme without joins or ``icontains`` scans. SQLite uses an FTS5
+table ranked with bm25; PostgreSQL uses a weighted tsvector column with a GIN
+index ranked with ts_rank_cd. Other databases fall back to ``icontains``.
+
+Documents are kept in sync by the receivers in signals.py. Code that writes
+schedules with ``bulk_create`` must call ``index_schedules`` itself; run
+``manage.py rebuild_search_index`` after loading data behind Django's back.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'schedule_search'
+
+# Ranked ids fetched per search; the table shows the best matches first
+MAX_RESULTS = 500
+
+# Only the first few words of a query are used
+MAX_TOKENS = 8
+
+# Fields whose change requires the schedule's document to be rewritten
+INDEXED_FIELDS = frozenset(['client', 'employee', 'notes'])
+
+DOCUMENT_FIELDS = (
+    'id',
+    'employee_id',
+    'client_id',
+    'client__name',
+    'employee__first_name',
+    'employee__last_name',
+    'employee__username',
+    'notes',
+)
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(query):
+    """Words of a user query, lower-cased; punctuation and operators are dropped"""
+    return TOKEN_RE.findall(query.lower())[:MAX_TOKENS]
+
+
+def document_row(row):
+    """Turn a DOCUMENT_FIELDS row into (id, employee_id, client_id, client, employee, notes)"""
+    pk, employee_id, client_id, client_name, first_name, last_name, username, notes = row
+    employee_name = f"{first_name} {last_name}".strip() or username
+    return (pk, employee_id, client_id, client_name, employee_name, notes or '')
+
+
+class SQLiteBackend:
+    """FTS5 table keyed by the schedule id (its rowid)"""
+
+    KEY = f'{SEARCH_TABLE}.rowid'
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, employee_id, client_id, client, employee, notes) '
+            f'VALUES (%s, %s, %s, %s, %s, %s)',
+            rows,
+        )
+
+    def delete(self, cursor, ids):
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def search(self, cursor, tokens, employee_id, client_ids, limit, within=None):
+        # Every word must match, each as a prefix; quoting keeps words literal
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        sql = f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        params = [match]
+        if employee_id is not None:
+            sql += ' AND employee_id = %s'
+            params.append(employee_id)
+        if client_ids is not None:
+            sql += f' AND client_id IN ({", ".join(["%s"] * len(client_ids))})'
+            params.extend(client_ids)
+        if within is not None:
+            sql += f' AND EXISTS ({within[0]})'
+            params.extend(within[1])
+        # bm25 weights per column: employee_id, client_id, client, employee, notes
+        sql += f' ORDER BY bm25({SEARCH_TABLE}, 0, 0, 4.0, 4.0, 1.0) LIMIT %s'
+        params.append(limit)
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend:
+    """Table with a weighted tsvector document and a GIN index"""
+
+    KEY = f'{SEARCH_TABLE}.schedule_id'
+
+    DOCUMENT_SQL = (
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'C')"
+    )
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (schedule_id, employee_id, client_id, document) '
+            f'VALUES (%s, %s, %s, {self.DOCUMENT_SQL}) '
+            f'ON CONFLICT (schedule_id) DO UPDATE SET employee_id = EXCLUDED.employee_id, '
+            f'client_id = EXCLUDED.client_id, document = EXCLUDED.document',
+            rows,
+        )
+
+    def delete(self, cursor, ids):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE schedule_id = ANY(%s)', [list(ids)])
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+
+    def search(self, cursor, tokens, employee_id, client_ids, limit, within=None):
+        sql = (
+            f"SELECT schedule_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query "
+            f"WHERE document @@ query"
+        )
+        params = [' & '.join(f'{token}:*' for token in tokens)]
+        if employee_id is not None:
+            sql += ' AND employee_id = %s'
+            params.append(employee_id)
+        if client_ids is not None:
+            sql += ' AND client_id = ANY(%s)'
+            params.append(list(client_ids))
+        if within is not None:
+            sql += f' AND EXISTS ({within[0]})'
+            params.extend(within[1])
+        sql += ' ORDER BY ts_rank_cd(document, query) DESC LIMIT %s'
+        params.append(limit)
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend():
+    """Search backend for the default database, or None when unsupported"""
+    backend = BACKENDS.get(connection.vendor)
+    return backend() if backend else None
+
+
+def index_queryset(queryset, batch_size=5000):
+    """Write search documents for every schedule in ``queryset``; returns the count"""
+    backend = get_backend()
+    if backend is None:
+        return 0
+
+    count = 0
+    batch = []
+    rows = queryset.order_by().values_list(*DOCUMENT_FIELDS).iterator(chunk_size=batch_size)
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append(document_row(row))
+            if len(batch) >= batch_size:
+                backend.upsert(cursor, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            backend.upsert(cursor, batch)
+            count += len(batch)
+    return count
+
+
+def index_schedules(ids):
+    """Write search documents for the schedules with the given ids"""
+    from .models import Schedule
+
+    ids = list(ids)
+    if ids:
+        index_queryset(Schedule.objects.filter(pk__in=ids))
+
+
+def remove_schedules(ids):
+    """Drop the search documents of deleted schedules"""
+    backend = get_backend()
+    ids = list(ids)
+    if backend is not None and ids:
+        with connection.cursor() as cursor:
+            backend.delete(cursor, ids)
+
+
+def rebuild(batch_size=5000):
+    """Recreate every search document from the schedules table"""
+    from .models import Schedule
+
+    backend = get_backend()
+    if backend is None:
+        return 0
+    with connection.cursor() as cursor:
+        backend.clear(cursor)
+    return index_queryset(Schedule.objects.all(), batch_size)
+
+
+def ranked_ids(query, user=None, limit=MAX_RESULTS, queryset=None):
+    """
+    Ids of the schedules best matching ``query``, best first
+
+    ``user`` narrows the lookup to the schedules that user may see, and
+    ``queryset`` to the schedules it selects (checked per match in the same
+    SQL statement), so filtered searches still get up to ``limit`` hits.
+    Returns None when the database has no full-text backend.
+    """
+    from clients.models import Client
+
+    backend = get_backend()
+    if backend is None:
+        return None
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    employee_id = client_ids = None
+    if user is not None and user.is_employee:
+        employee_id = user.pk
+    elif user is not None and user.is_client:
+        client_ids = list(Client.objects.filter(name=user.get_full_name()).values_list('id', flat=True))
+        if not client_ids:
+            return []
+
+    within = None
+    if queryset is not None and queryset.query.where:
+        # Correlated with the search table's key, so only matches are looked up
+        matching = queryset.order_by().filter(pk=RawSQL(backend.KEY, [])).values('pk')
+        within = matching.query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        return backend.search(cursor, tokens, employee_id, client_ids, limit, within)
+
+
+def search(queryset, query, user=None, limit=MAX_RESULTS):
+    """Schedules of ``queryset`` matching ``query`` as a list, best match first"""
+    if not tokenize(query):
+        return list(queryset[:limit])
+    ids = ranked_ids(query, user, limit, queryset)
+    if ids is None:
+        for token in tokenize(query):
+            queryset = queryset.filter(
+                Q(client__name__icontains=token)
+                | Q(employee__first_name__icontains=token)
+                | Q(employee__last_name__icontains=token)
+                | Q(notes__icontains=token)
+            )
+        return list(queryset[:limit])
+
+    position = {pk: index for index, pk in enumerate(ids)}
+    return sorted(queryset.filter(pk__in=ids), key=lambda schedule: position[schedule.pk])
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+# Sent by the Schedule workflow methods after a status transition is saved.
+# Arguments: schedule, previous_status, actor
+schedule_status_changed = Signal()
+
+
+@receiver(post_save, sender='schedules.Schedule')
+def index_schedule(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the schedule's search document in sync with its text"""
+    from . import search
+    
+    # Status transitions save with update_fields and leave the document unchanged
+    if update_fields is not None and not search.INDEXED_FIELDS.intersection(update_fields):
+        return
+    search.index_schedules([instance.pk])
+
+
+@receiver(post_delete, sender='schedules.Schedule')
+def unindex_schedule(sender, instance, **kwargs):
+    from . import search
+    
+    search.remove_schedules([instance.pk])
+
+
+@receiver(pre_save, sender='clients.Client')
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def note_search_name_change(sender, instance, update_fields=None, **kwargs):
+    """Remember whether a save renames a client or employee shown in search documents"""
+    instance._search_name_changed = False
+    fields = ('name',) if sender._meta.label == 'clients.Client' else ('first_name', 'last_name', 'username')
+    # New rows have no schedules yet; saves such as last_login updates cannot rename
+    if instance.pk is None or (update_fields is not None and not set(fields).intersection(update_fields)):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    instance._search_name_changed = previous is not None and previous != tuple(getattr(instance, field) for field in fields)
+
+
+@receiver(post_save, sender='clients.Client')
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reindex_renamed(sender, instance, created, **kwargs):
+    """Rewrite the documents of every schedule that embeds a renamed client or employee"""
+    from . import search
+    from .models import Schedule
+    
+    if getattr(instance, '_search_name_changed', False):
+        related = 'client' if sender._meta.label == 'clients.Client' else 'employee'
+        search.index_queryset(Schedule.objects.filter(**{related: instance}))
+
+
+@receiver(post_save, sender='schedules.Schedule')
+def log_schedule_saved(sender, instance, created, **kwargs):
+    from . import eventlog
+    
+    eventlog.record_saved(instance, created)
+
+
+@receiver(post_delete, sender='schedules.Schedule')
+def log_schedule_deleted(sender, instance, **kwargs):
+    from . import eventlog
+    
+    eventlog.record_deleted(instance)
+
+
+@receiver(schedule_status_changed)
+def log_status_change(sender, schedule, previous_status, actor=None, **kwargs):
+    from . import eventlog
+    
+    eventlog.record_transition(schedule, previous_status, actor)
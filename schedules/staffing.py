@@ -0,0 +1,166 @@
+"""
+Greedy staffing engine that turns client demand into draft schedules
+
+Demand slots are filled earliest and longest first. Each slot goes to the
+least-booked employee for that week who passes the overlap, gap and
+daily/weekly cap rules, which balances load without a full solver. Employees
+are kept in one min-heap per week keyed on booked minutes, so a slot usually
+costs a handful of heap operations instead of a scan over every employee.
+"""
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+
+from . import eventlog, rules, search
+from .availability import EmployeeCalendar, load_calendars
+from .models import Schedule
+
+# Start time used for demand expressed only in hours
+DEFAULT_DAY_START = time(9, 0)
+
+PROPOSAL_NOTE = "Proposed by the staffing optimizer"
+
+
+@dataclass(frozen=True)
+class Demand:
+    """Client demand for ``headcount`` employees over a time window on one day"""
+    client_id: int
+    day: object
+    start_time: time
+    end_time: time
+    headcount: int = 1
+    
+    @property
+    def bounds(self):
+        return rules.window_bounds(self.day, self.start_time, self.end_time)
+    
+    @classmethod
+    def from_hours(cls, client_id, day, hours, headcount=1, day_start=DEFAULT_DAY_START):
+        """
+        Demand for a number of hours, placed from ``day_start``
+
+        Anything over the 12-hour maximum is split into consecutive shifts.
+        """
+        demands = []
+        remaining = int(round(hours * 60))
+        start = datetime.combine(day, day_start)
+        while remaining > 0:
+            minutes = min(remaining, rules.MAX_DURATION_MINUTES)
+            # Never leave a tail shorter than the 1-hour minimum
+            if 0 < remaining - minutes < rules.MIN_DURATION_MINUTES:
+                minutes = remaining - rules.MIN_DURATION_MINUTES
+            end = start + timedelta(minutes=minutes)
+            demands.append(cls(client_id, start.date(), start.time(), end.time(), headcount))
+            start, remaining = end, remaining - minutes
+        return demands
+
+
+@dataclass(frozen=True)
+class Assignment:
+    employee_id: int
+    demand: Demand
+
+
+class StaffingEngine:
+    """Assign employees to demand slots while respecting the scheduling rules"""
+    
+    def __init__(self, employee_ids, calendars=None):
+        calendars = calendars or {}
+        self.calendars = {}
+        for employee_id in employee_ids:
+            calendar = calendars.get(employee_id)
+            if calendar is None:
+                calendar = EmployeeCalendar()
+                calendar.finalize()
+            self.calendars[employee_id] = calendar
+        self._heaps = {}
+    
+    def _heap(self, week):
+        heap = self._heaps.get(week)
+        if heap is None:
+            heap = [
+                (calendar.weekly_minutes.get(week, 0), employee_id)
+                for employee_id, calendar in self.calendars.items()
+            ]
+            heapq.heapify(heap)
+            self._heaps[week] = heap
+        return heap
+    
+    def propose(self, demands):
+        """Return ``(assignments, unfilled)`` for the given demands"""
+        slots = []
+        for demand in demands:
+            start, end = demand.bounds
+            if rules.validate_duration(end - start):
+                slots.append((start, end, demand, False))
+                continue
+            slots.extend((start, end, demand, True) for _ in range(demand.headcount))
+        # Earliest first, longest first within the same start
+        slots.sort(key=lambda slot: (slot[0], slot[0] - slot[1]))
+        
+        assignments = []
+        unfilled = []
+        for start, end, demand, valid in slots:
+            if not valid:
+                unfilled.append(demand)
+                continue
+            
+            heap = self._heap(rules.week_start(demand.day))
+            skipped = []
+            chosen = None
+            while heap:
+                booked, employee_id = heapq.heappop(heap)
+                if self.calendars[employee_id].can_take(demand.day, start, end):
+                    chosen = employee_id
+                    break
+                skipped.append((booked, employee_id))
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+            
+            if chosen is None:
+                unfilled.append(demand)
+                continue
+            self.calendars[chosen].reserve(demand.day, start, end)
+            heapq.heappush(heap, (booked + end - start, chosen))
+            assignments.append(Assignment(chosen, demand))
+        
+        return assignments, unfilled
+
+
+def propose_for_demand(demands, employee_ids):
+    """Run the engine against the employees' existing bookings"""
+    days = [demand.day for demand in demands]
+    calendars = {}
+    if days:
+        calendars = load_calendars(
+            rules.week_start(min(days)),
+            rules.week_start(max(days)) + timedelta(days=6),
+        )
+    return StaffingEngine(employee_ids, calendars).propose(demands)
+
+
+def create_drafts(assignments, batch_size=1000):
+    """Bulk insert assignments as draft schedules for supervisor review"""
+    schedules = []
+    for assignment in assignments:
+        demand = assignment.demand
+        start, end = demand.bounds
+        schedules.append(Schedule(
+            employee_id=assignment.employee_id,
+            client_id=demand.client_id,
+            start_date=demand.day,
+            start_time=demand.start_time,
+            end_date=demand.day + timedelta(days=(end // 1440) - (start // 1440)),
+            end_time=demand.end_time,
+            duration_minutes=end - start,
+            status='draft',
+            notes=PROPOSAL_NOTE,
+        ))
+    with transaction.atomic():
+        created = Schedule.objects.bulk_create(schedules, batch_size=batch_size)
+        # bulk_create skips post_save, so index and log the drafts here
+        search.index_schedules(schedule.pk for schedule in created)
+        eventlog.record_created(created)
+    return created
@@ -0,0 +1,151 @@
+"""
+Delta sync for clients that mirror schedules
+
+A sync token is an opaque, signed position in the schedule event log (see
+schedules/eventlog.py). Each call returns only the schedules with events
+after that position, so traffic scales with the change rate instead of the
+table size. Event ids are allocated in commit order, so a change can never
+appear behind a position a client already holds. Events are written after
+the change commits, at most once; a change whose events were lost reaches
+mirrors when ``reconcile_event_log`` next repairs the log.
+
+Without a token the visible schedules are paged out by id first, against
+the log position taken when the first page was read; whatever changes while
+they are paged out is picked up from the log afterwards.
+
+A schedule with events in the user's scope that the user can no longer see
+is reported as deleted: it was deleted or moved to another employee or
+client (the log records a ``moved`` event under the old ones). Archiving
+logs nothing, and a schedule with newer events that has since been archived
+(and is still the user's) is left out of both lists, so mirrors keep
+archived schedules.
+"""
+from django.core import signing
+from django.db.models import Max
+
+from clients.models import Client
+from .models import ArchivedSchedule, Schedule, ScheduleEvent
+
+SYNC_TOKEN_SALT = 'schedules.sync'
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+# Columns returned for each created or modified schedule
+SYNC_FIELDS = (
+    'id',
+    'employee_id',
+    'client_id',
+    'client__name',
+    'start_date',
+    'start_time',
+    'end_date',
+    'end_time',
+    'status',
+    'notes',
+    'submitted_at',
+    'approved_by_id',
+    'approved_at',
+    'rejection_reason',
+    'created_at',
+    'updated_at',
+)
+
+
+class InvalidSyncToken(Exception):
+    """Raised when a sync token is malformed or was not issued by us"""
+
+
+def encode_token(position, after_id=None):
+    """Pack the event log position (and the initial paging cursor) into an opaque, tamper-proof token"""
+    return signing.dumps([position, after_id], salt=SYNC_TOKEN_SALT, compress=True)
+
+
+def decode_token(token):
+    """Return ``(position, after_id)`` from a sync token"""
+    try:
+        position, after_id = signing.loads(token, salt=SYNC_TOKEN_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidSyncToken('Invalid sync token')
+    if not isinstance(position, int) or not (after_id is None or isinstance(after_id, int)):
+        raise InvalidSyncToken('Invalid sync token')
+    return position, after_id
+
+
+def _events_for_user(user):
+    events = ScheduleEvent.objects.all()
+    if user.is_employee:
+        return events.filter(employee_id=user.pk)
+    elif user.is_client:
+        client_ids = Client.objects.filter(name=user.get_full_name()).values('id')
+        return events.filter(client_id__in=client_ids)
+    return events
+
+
+def _archived_for_user(user):
+    archived = ArchivedSchedule.objects.all()
+    if user.is_employee:
+        return archived.filter(employee=user)
+    elif user.is_client:
+        return archived.filter(client__name=user.get_full_name())
+    return archived
+
+
+def _rows(schedules):
+    rows = list(schedules.values(*SYNC_FIELDS))
+    for row in rows:
+        row['client_name'] = row.pop('client__name')
+    return rows
+
+
+def changes_since(user, token=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return schedules changed and deleted since ``token`` for the given user
+
+    ``has_more`` asks the client to call again straight away with the new
+    token: the visible set is still being paged out, or more events are
+    waiting than fit in one page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    schedules = Schedule.objects.for_user(user)
+
+    if token:
+        position, after_id = decode_token(token)
+    else:
+        position = ScheduleEvent.objects.aggregate(last=Max('id'))['last'] or 0
+        after_id = 0
+
+    if after_id is not None:
+        # Initial load: page the visible set by id
+        changed = _rows(schedules.filter(id__gt=after_id).order_by('id')[:limit + 1])
+        has_more = len(changed) > limit
+        changed = changed[:limit]
+        return {
+            'changed': changed,
+            'deleted': [],
+            'sync_token': encode_token(position, changed[-1]['id'] if has_more else None),
+            'has_more': has_more,
+        }
+
+    events = list(
+        _events_for_user(user).filter(id__gt=position).order_by('id').values_list('id', 'schedule_id')[:limit + 1]
+    )
+    has_more = len(events) > limit
+    events = events[:limit]
+    if events:
+        position = events[-1][0]
+
+    schedule_ids = list(dict.fromkeys(schedule_id for _, schedule_id in events))
+    changed = _rows(schedules.filter(id__in=schedule_ids).order_by('id'))
+    visible = {row['id'] for row in changed}
+    deleted = [pk for pk in schedule_ids if pk not in visible]
+    if deleted:
+        archived = set(_archived_for_user(user).filter(pk__in=deleted).values_list('pk', flat=True))
+        deleted = [pk for pk in deleted if pk not in archived]
+
+    return {
+        'changed': changed,
+        'deleted': deleted,
+        'sync_token': encode_token(position),
+        'has_more': has_more,
+    }
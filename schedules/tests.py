@@ -1,3 +1,661 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
 
-# Create your tests here.
+from django.contrib.messages import get_messages
+from django.core import signing
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from clients.models import Client
+from . import eventlog, rules, search
+from .archive import archive_batch, schedules_for_range
+from .availability import EmployeeCalendar, find_available_employees
+from .forms import ScheduleForm
+from .models import (
+    ArchivedSchedule, ConcurrentUpdateError, EventCursor, Schedule, ScheduleEvent, ScheduleHistory,
+    ScheduleRecurrence,
+)
+from .staffing import Demand, StaffingEngine, propose_for_demand
+from .sync import SYNC_TOKEN_SALT, InvalidSyncToken, changes_since, decode_token
+
+
+class ScheduleTestCase(TestCase):
+    """Two employees, a supervisor and a client, with helpers that log events as they would commit"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann = User.objects.create(username='ann', first_name='Ann', last_name='Lee', role='employee')
+        cls.bob = User.objects.create(username='bob', first_name='Bob', last_name='Roe', role='employee')
+        cls.sue = User.objects.create(username='sue', first_name='Sue', last_name='Kim', role='supervisor')
+        cls.acme = Client.objects.create(name='Acme')
+    
+    def day(self, offset):
+        return timezone.now().date() + timedelta(days=offset)
+    
+    def schedule(self, employee=None, offset=1, start=time(9), end=time(17), **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Schedule.objects.create(
+                employee=employee or self.ann,
+                client=fields.pop('client', self.acme),
+                start_date=self.day(offset),
+                start_time=start,
+                end_date=self.day(offset),
+                end_time=end,
+                **fields
+            )
+    
+    def save(self, schedule, **fields):
+        for field, value in fields.items():
+            setattr(schedule, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.save()
+        return schedule
+    
+    def close(self, schedule, offset, status='approved'):
+        """Move a schedule ``offset`` days into the past (saving refuses past dates)"""
+        day = self.day(offset)
+        Schedule.objects.filter(pk=schedule.pk).update(start_date=day, end_date=day, status=status)
+        return schedule
+
+
+class DeltaSyncTests(ScheduleTestCase):
+    def sync(self, user, token=None, limit=500):
+        return changes_since(user, token, limit)
+    
+    def ids(self, page):
+        return [row['id'] for row in page['changed']]
+    
+    def initial(self, user):
+        """Page out the visible set; returns (ids, token)"""
+        ids, token = [], None
+        while True:
+            page = self.sync(user, token)
+            ids += self.ids(page)
+            token = page['sync_token']
+            if not page['has_more']:
+                return ids, token
+    
+    def test_initial_load_is_paged_by_id(self):
+        schedules = [self.schedule(offset=offset) for offset in (1, 2, 3)]
+        self.schedule(employee=self.bob)
+        
+        first = self.sync(self.ann, limit=2)
+        self.assertEqual(self.ids(first), [schedules[0].pk, schedules[1].pk])
+        self.assertTrue(first['has_more'])
+        self.assertEqual(decode_token(first['sync_token'])[1], schedules[1].pk)
+        
+        second = self.sync(self.ann, first['sync_token'], limit=2)
+        self.assertEqual(self.ids(second), [schedules[2].pk])
+        self.assertFalse(second['has_more'])
+        
+        third = self.sync(self.ann, second['sync_token'])
+        self.assertEqual((third['changed'], third['deleted']), ([], []))
+    
+    def test_changes_after_the_token_are_returned(self):
+        edited = self.schedule()
+        self.schedule(offset=2)
+        _, token = self.initial(self.ann)
+        
+        self.save(edited, notes='Bring keys')
+        created = self.schedule(offset=3)
+        self.schedule(employee=self.bob)
+        
+        page = self.sync(self.ann, token)
+        self.assertEqual(self.ids(page), [edited.pk, created.pk])
+        self.assertEqual(page['changed'][0]['notes'], 'Bring keys')
+        self.assertEqual(page['deleted'], [])
+        self.assertEqual(self.sync(self.ann, page['sync_token'])['changed'], [])
+    
+    def test_schedule_moved_to_another_employee_is_deleted_for_the_old_one(self):
+        moved = self.schedule()
+        _, ann_token = self.initial(self.ann)
+        _, bob_token = self.initial(self.bob)
+        
+        self.save(moved, employee=self.bob)
+        
+        ann_page = self.sync(self.ann, ann_token)
+        self.assertEqual((ann_page['changed'], ann_page['deleted']), ([], [moved.pk]))
+        self.assertEqual(self.ids(self.sync(self.bob, bob_token)), [moved.pk])
+    
+    def test_deleted_schedule_is_reported(self):
+        deleted = self.schedule()
+        kept = self.schedule(offset=2)
+        _, token = self.initial(self.ann)
+        
+        pk = deleted.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        
+        page = self.sync(self.ann, token)
+        self.assertEqual((page['changed'], page['deleted']), ([], [pk]))
+        self.assertTrue(Schedule.objects.filter(pk=kept.pk).exists())
+    
+    def test_schedule_archived_after_a_change_is_not_deleted(self):
+        archived = self.schedule()
+        deleted = self.schedule(offset=2)
+        _, token = self.initial(self.ann)
+        
+        self.save(archived, notes='Late note')
+        self.close(archived, -400)
+        archive_batch(self.day(-365))
+        pk = deleted.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        
+        page = self.sync(self.ann, token)
+        self.assertEqual((page['changed'], page['deleted']), ([], [pk]))
+    
+    def test_tampered_token_is_rejected(self):
+        self.schedule()
+        token = self.sync(self.ann)['sync_token']
+        
+        with self.assertRaises(InvalidSyncToken):
+            self.sync(self.ann, token[:-1] + ('A' if token[-1] != 'A' else 'B'))
+        with self.assertRaises(InvalidSyncToken):
+            self.sync(self.ann, signing.dumps(['0', None], salt=SYNC_TOKEN_SALT))
+        with self.assertRaises(InvalidSyncToken):
+            self.sync(self.ann, 'not-a-token')
+
+
+# A Monday
+MONDAY = date(2026, 10, 5)
+
+
+def calendar(*bookings):
+    """EmployeeCalendar holding ``(day, start_time, end_time)`` bookings"""
+    booked = EmployeeCalendar()
+    for day, start_time, end_time in bookings:
+        start, end = rules.window_bounds(day, start_time, end_time)
+        booked.add(day, start_time, day + timedelta(days=end // 1440 - start // 1440), end_time, end - start)
+    booked.finalize()
+    return booked
+
+
+class RulesTests(SimpleTestCase):
+    def test_window_past_midnight_ends_next_day(self):
+        start, end = rules.window_bounds(MONDAY, time(22), time(6))
+        
+        self.assertEqual(end - start, 8 * 60)
+        self.assertEqual(end, rules.to_minutes(MONDAY + timedelta(days=1), time(6)))
+    
+    def test_overlap_includes_the_gap(self):
+        start, end = rules.window_bounds(MONDAY, time(9), time(12))
+        gap = rules.MIN_GAP_MINUTES
+        
+        self.assertTrue(rules.overlaps(start, end, start + 60, end + 60))
+        self.assertTrue(rules.overlaps(start, end, end + gap - 1, end + 120))
+        self.assertFalse(rules.overlaps(start, end, end + gap, end + 120))
+        self.assertFalse(rules.overlaps(start, end, end, end + 120, gap=0))
+    
+    def test_duration_limits(self):
+        self.assertIsNotNone(rules.validate_duration(rules.MIN_DURATION_MINUTES - 1))
+        self.assertIsNone(rules.validate_duration(rules.MIN_DURATION_MINUTES))
+        self.assertIsNone(rules.validate_duration(rules.MAX_DURATION_MINUTES))
+        self.assertIsNotNone(rules.validate_duration(rules.MAX_DURATION_MINUTES + 1))
+    
+    def test_week_starts_on_monday(self):
+        self.assertEqual(rules.week_start(MONDAY + timedelta(days=6)), MONDAY)
+        self.assertEqual(rules.week_start(MONDAY + timedelta(days=7)), MONDAY + timedelta(days=7))
+
+
+class EmployeeCalendarTests(SimpleTestCase):
+    def test_gap_after_a_booking_is_kept(self):
+        booked = calendar((MONDAY, time(9), time(12)))
+        
+        self.assertFalse(booked.is_free(*rules.window_bounds(MONDAY, time(12), time(14))))
+        self.assertTrue(booked.is_free(*rules.window_bounds(MONDAY, time(13), time(15))))
+    
+    def test_overnight_booking_blocks_the_next_morning(self):
+        booked = calendar((MONDAY, time(22), time(6)))
+        tuesday = MONDAY + timedelta(days=1)
+        
+        self.assertFalse(booked.is_free(*rules.window_bounds(tuesday, time(5), time(9))))
+        self.assertTrue(booked.is_free(*rules.window_bounds(tuesday, time(7), time(9))))
+    
+    def test_daily_cap(self):
+        booked = calendar((MONDAY, time(6), time(14)))
+        hours_left = rules.MAX_DAILY_MINUTES // 60 - 8
+        
+        evening = rules.window_bounds(MONDAY, time(15), time(15 + hours_left))
+        self.assertTrue(booked.can_take(MONDAY, *evening))
+        longer = rules.window_bounds(MONDAY, time(15), time(15 + hours_left, 30))
+        self.assertFalse(booked.can_take(MONDAY, *longer))
+    
+    def test_weekly_cap(self):
+        shifts = rules.MAX_WEEKLY_MINUTES // (8 * 60)
+        booked = calendar(*[(MONDAY + timedelta(days=n), time(9), time(17)) for n in range(shifts)])
+        saturday = MONDAY + timedelta(days=5)
+        next_monday = MONDAY + timedelta(days=7)
+        
+        self.assertFalse(booked.can_take(saturday, *rules.window_bounds(saturday, time(9), time(17))))
+        self.assertTrue(booked.can_take(next_monday, *rules.window_bounds(next_monday, time(9), time(17))))
+    
+    def test_reserve_blocks_the_slot(self):
+        booked = calendar()
+        slot = rules.window_bounds(MONDAY, time(9), time(17))
+        
+        booked.reserve(MONDAY, *slot)
+        
+        self.assertFalse(booked.can_take(MONDAY, *slot))
+        self.assertEqual(booked.daily_minutes[MONDAY], 8 * 60)
+
+
+class AvailabilityTests(ScheduleTestCase):
+    def test_booked_employee_is_not_available(self):
+        self.schedule(employee=self.ann, offset=7)
+        day = self.day(7)
+        
+        available = find_available_employees(self.acme, day, day, time(10), time(14))
+        
+        self.assertEqual([result['employee'] for result in available], [self.bob])
+    
+    def test_least_booked_employee_comes_first(self):
+        self.schedule(employee=self.ann, offset=7)
+        day = self.day(7)
+        
+        available = find_available_employees(self.acme, day, day, time(18), time(20))
+        
+        self.assertEqual([result['employee'] for result in available], [self.bob, self.ann])
+        self.assertEqual(available[1]['booked_hours'], 8)
+
+
+class DemandTests(SimpleTestCase):
+    def test_short_demand_is_one_shift(self):
+        (demand,) = Demand.from_hours(1, MONDAY, 8)
+        
+        self.assertEqual((demand.day, demand.start_time, demand.end_time), (MONDAY, time(9), time(17)))
+    
+    def test_long_demand_is_split_into_shifts(self):
+        demands = Demand.from_hours(1, MONDAY, 20, headcount=2)
+        
+        self.assertEqual(
+            [(demand.day, demand.start_time, demand.end_time) for demand in demands],
+            [(MONDAY, time(9), time(21)), (MONDAY, time(21), time(5))],
+        )
+        self.assertEqual([demand.bounds[1] - demand.bounds[0] for demand in demands], [12 * 60, 8 * 60])
+        self.assertTrue(all(demand.headcount == 2 for demand in demands))
+    
+    def test_split_never_leaves_a_short_tail(self):
+        demands = Demand.from_hours(1, MONDAY, 12.5)
+        
+        self.assertEqual([demand.bounds[1] - demand.bounds[0] for demand in demands], [11 * 60 + 30, 60])
+
+
+class StaffingEngineTests(SimpleTestCase):
+    def shifts(self, days, start=time(9), end=time(17), headcount=1):
+        return [Demand(1, MONDAY + timedelta(days=n), start, end, headcount) for n in range(days)]
+    
+    def test_load_is_balanced(self):
+        assignments, unfilled = StaffingEngine([1, 2, 3]).propose(self.shifts(3, headcount=2))
+        
+        self.assertEqual(unfilled, [])
+        counts = {employee_id: 0 for employee_id in (1, 2, 3)}
+        for assignment in assignments:
+            counts[assignment.employee_id] += 1
+        self.assertEqual(sorted(counts.values()), [2, 2, 2])
+    
+    def test_least_booked_employee_is_chosen(self):
+        calendars = {1: calendar((MONDAY + timedelta(days=1), time(9), time(17)))}
+        
+        assignments, _ = StaffingEngine([1, 2], calendars).propose(self.shifts(1, start=time(18), end=time(20)))
+        
+        self.assertEqual([assignment.employee_id for assignment in assignments], [2])
+    
+    def test_one_slot_per_employee_at_a_time(self):
+        (demand,) = self.shifts(1, headcount=3)
+        
+        assignments, unfilled = StaffingEngine([1, 2]).propose([demand])
+        
+        self.assertEqual(sorted(assignment.employee_id for assignment in assignments), [1, 2])
+        self.assertEqual(unfilled, [demand])
+    
+    def test_existing_booking_is_respected(self):
+        calendars = {1: calendar((MONDAY, time(8), time(12)))}
+        
+        assignments, unfilled = StaffingEngine([1], calendars).propose(self.shifts(1))
+        
+        self.assertEqual((assignments, len(unfilled)), ([], 1))
+    
+    def test_invalid_duration_is_unfilled(self):
+        short = Demand(1, MONDAY, time(9), time(9, 30))
+        
+        assignments, unfilled = StaffingEngine([1]).propose([short])
+        
+        self.assertEqual((assignments, unfilled), ([], [short]))
+
+
+class RecurringBookingTests(ScheduleTestCase):
+    def setUp(self):
+        self.monday = self.day(7)
+        self.recurrence = ScheduleRecurrence.objects.create(
+            employee=self.ann,
+            client=self.acme,
+            weekdays=str(self.monday.weekday()),
+            start_time=time(9),
+            end_time=time(17),
+            starts_on=self.day(1),
+        )
+    
+    def form(self, user, day, start, end, instance=None):
+        data = {
+            'client': self.acme.pk,
+            'start_date': day,
+            'start_time': start,
+            'end_date': day,
+            'end_time': end,
+            'status': 'draft',
+            'version': instance.version if instance else '',
+        }
+        return ScheduleForm(data, instance=instance, user=user)
+    
+    def test_recurring_slot_blocks_availability(self):
+        available = find_available_employees(self.acme, self.monday, self.monday, time(10), time(14))
+        
+        self.assertEqual([result['employee'] for result in available], [self.bob])
+    
+    def test_recurring_slot_blocks_the_staffing_engine(self):
+        demand = Demand(self.acme.pk, self.monday, time(10), time(14))
+        
+        self.assertEqual(propose_for_demand([demand], [self.ann.pk]), ([], [demand]))
+        assignments, _ = propose_for_demand([demand], [self.ann.pk, self.bob.pk])
+        self.assertEqual([assignment.employee_id for assignment in assignments], [self.bob.pk])
+    
+    def test_one_off_schedule_cannot_double_book_a_recurring_one(self):
+        form = self.form(self.ann, self.monday, time(12), time(14))
+        
+        self.assertFalse(form.is_valid())
+        self.assertIn('recurring schedule', form.non_field_errors()[0])
+        self.assertTrue(self.form(self.ann, self.monday + timedelta(days=1), time(12), time(14)).is_valid())
+        self.assertTrue(self.form(self.bob, self.monday, time(12), time(14)).is_valid())
+    
+    def test_materialized_occurrence_does_not_block_itself(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = self.recurrence.materialize(self.monday)
+        
+        self.assertTrue(self.form(self.ann, self.monday, time(10), time(16), instance=schedule).is_valid())
+
+
+class ArchiveTests(ScheduleTestCase):
+    def closed(self, offset, status='approved'):
+        return self.close(self.schedule(), offset, status)
+    
+    def test_batch_moves_closed_schedules_before_the_cutoff(self):
+        old = self.closed(-400)
+        rejected = self.closed(-390, status='rejected')
+        pending = self.closed(-400, status='submitted')
+        recent = self.closed(-10)
+        events = ScheduleEvent.objects.count()
+        
+        self.assertEqual(archive_batch(self.day(-365)), 2)
+        
+        self.assertEqual(sorted(ArchivedSchedule.objects.values_list('pk', flat=True)), sorted([old.pk, rejected.pk]))
+        self.assertEqual(sorted(Schedule.objects.values_list('pk', flat=True)), sorted([pending.pk, recent.pk]))
+        self.assertEqual(ArchivedSchedule.objects.get(pk=old.pk).status, 'approved')
+        self.assertEqual(ScheduleEvent.objects.count(), events)
+        self.assertEqual(archive_batch(self.day(-365)), 0)
+    
+    def test_range_switches_to_history_only_when_it_reaches_the_archive(self):
+        old = self.closed(-400)
+        recent = self.schedule()
+        archive_batch(self.day(-365))
+        
+        self.assertIs(schedules_for_range(self.day(-30)).model, Schedule)
+        history = schedules_for_range(self.day(-500))
+        self.assertIs(history.model, ScheduleHistory)
+        self.assertEqual(
+            dict(history.values_list('pk', 'is_archived')),
+            {old.pk: True, recent.pk: False},
+        )
+
+
+class SearchTests(ScheduleTestCase):
+    def setUp(self):
+        self.globex = Client.objects.create(name='Globex')
+        self.ann_acme = self.schedule(notes='Front desk')
+        self.bob_acme = self.schedule(employee=self.bob, offset=2)
+        self.ann_globex = self.schedule(client=self.globex, offset=3, notes='Acme badge needed')
+    
+    def find(self, query, queryset=None, **kwargs):
+        return search.search(Schedule.objects.all() if queryset is None else queryset, query, **kwargs)
+    
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self.find('glob'), [self.ann_globex])
+        self.assertEqual(self.find('acme bob'), [self.bob_acme])
+        self.assertEqual(self.find('acme desk'), [self.ann_acme])
+        self.assertEqual(self.find('initech'), [])
+    
+    def test_names_outrank_notes(self):
+        results = self.find('acme')
+        
+        self.assertEqual(set(results), {self.ann_acme, self.bob_acme, self.ann_globex})
+        self.assertEqual(results[-1], self.ann_globex)
+    
+    def test_user_only_finds_their_own_schedules(self):
+        self.assertEqual(set(self.find('acme', user=self.ann)), {self.ann_acme, self.ann_globex})
+    
+    def test_queryset_filters_apply_before_the_limit(self):
+        Schedule.objects.filter(pk=self.ann_globex.pk).update(status='approved')
+        approved = Schedule.objects.filter(status='approved')
+        
+        self.assertEqual(self.find('acme', approved, limit=1), [self.ann_globex])
+    
+    def test_rename_rewrites_the_documents(self):
+        self.acme.name = 'Initech'
+        self.acme.save()
+        
+        self.assertEqual(set(self.find('initech')), {self.ann_acme, self.bob_acme})
+        self.assertEqual(self.find('acme'), [self.ann_globex])
+    
+    def test_deleted_schedule_is_not_found(self):
+        self.bob_acme.delete()
+        
+        self.assertEqual(self.find('bob'), [])
+    
+    def test_query_without_words_is_limited(self):
+        self.assertEqual(len(self.find(' ?! ', limit=2)), 2)
+
+
+class ConcurrentUpdateTests(ScheduleTestCase):
+    def setUp(self):
+        self.submitted = self.schedule()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submitted.submit_for_approval()
+    
+    def copy(self):
+        return Schedule.objects.get(pk=self.submitted.pk)
+    
+    def test_save_from_a_stale_copy_is_refused(self):
+        first, second = self.copy(), self.copy()
+        self.save(first, notes='First')
+        
+        second.notes = 'Second'
+        with self.assertRaises(ConcurrentUpdateError):
+            second.save()
+        
+        current = self.copy()
+        self.assertEqual(current.notes, 'First')
+        self.assertEqual(current.version, first.version)
+    
+    def test_only_one_of_two_approvals_wins(self):
+        first, second = self.copy(), self.copy()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first.approve(self.sue)
+        with self.assertRaises(ConcurrentUpdateError):
+            second.approve(self.sue)
+        with self.assertRaises(ConcurrentUpdateError):
+            second.reject(self.sue, 'Too late')
+        
+        current = self.copy()
+        self.assertEqual((current.status, current.version), ('approved', self.submitted.version + 1))
+        self.assertEqual(current.rejection_reason, None)
+        transitions = ScheduleEvent.objects.filter(schedule_id=current.pk, kind='transition', status='approved')
+        self.assertEqual(transitions.count(), 1)
+    
+    def test_transition_after_an_edit_is_refused(self):
+        stale = self.copy()
+        self.save(self.copy(), notes='Changed meanwhile')
+        
+        with self.assertRaises(ConcurrentUpdateError):
+            stale.approve(self.sue)
+        self.assertEqual(self.copy().status, 'submitted')
+
+
+class ApprovalViewTests(ScheduleTestCase):
+    def setUp(self):
+        self.submitted = self.schedule()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submitted.submit_for_approval()
+        self.stale_version = self.submitted.version
+        self.save(Schedule.objects.get(pk=self.submitted.pk), notes='Changed meanwhile')
+        self.client.force_login(self.sue)
+    
+    def post(self, action, version, **headers):
+        url = reverse(f'schedules:{action}', kwargs={'pk': self.submitted.pk})
+        return self.client.post(url, {'version': version, 'reason': 'No cover'}, headers=headers)
+    
+    def test_outdated_version_is_refused(self):
+        for action in ('approve', 'reject'):
+            response = self.post(action, self.stale_version)
+            
+            self.assertRedirects(response, reverse('schedules:approvals'), fetch_redirect_response=False)
+            self.assertIn('changed by someone else', str(list(get_messages(response.wsgi_request))[0]))
+            self.assertEqual(Schedule.objects.get(pk=self.submitted.pk).status, 'submitted')
+    
+    def test_outdated_version_is_refused_for_htmx(self):
+        response = self.post('approve', self.stale_version, HX_Request='true')
+        
+        self.assertContains(response, 'changed by someone else')
+        self.assertEqual(Schedule.objects.get(pk=self.submitted.pk).status, 'submitted')
+    
+    def test_current_version_is_approved(self):
+        response = self.post('approve', Schedule.objects.get(pk=self.submitted.pk).version)
+        
+        self.assertRedirects(response, reverse('schedules:approvals'), fetch_redirect_response=False)
+        self.assertEqual(Schedule.objects.get(pk=self.submitted.pk).status, 'approved')
+
+
+class EventLogTests(ScheduleTestCase):
+    def events(self, schedule_id):
+        return list(ScheduleEvent.objects.filter(schedule_id=schedule_id).values_list('kind', 'version', 'changes'))
+    
+    def test_save_transition_and_delete_are_logged(self):
+        schedule = self.schedule(notes='Front desk')
+        self.save(schedule, notes='Back office')
+        self.save(schedule)
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.submit_for_approval()
+        pk = schedule.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.delete()
+        
+        events = self.events(pk)
+        self.assertEqual([kind for kind, _, _ in events], ['created', 'updated', 'transition', 'deleted'])
+        self.assertEqual(events[0][2]['notes'], 'Front desk')
+        self.assertEqual(events[1][1:], (1, {'notes': 'Back office'}))
+        self.assertEqual(events[2][1:], (3, {'status': 'submitted'}))
+        self.assertEqual(ScheduleEvent.objects.get(schedule_id=pk, kind='transition').previous_status, 'draft')
+    
+    def test_rolled_back_change_logs_nothing(self):
+        schedule = self.schedule()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.save(schedule, notes='Never committed')
+                raise ValueError
+        
+        self.assertEqual([kind for kind, _, _ in self.events(schedule.pk)], ['created'])
+    
+    def test_consume_advances_the_cursor(self):
+        for offset in (1, 2, 3):
+            self.schedule(offset=offset)
+        seen = []
+        
+        self.assertEqual(eventlog.consume('test', seen.extend, batch_size=2), 3)
+        
+        last = ScheduleEvent.objects.order_by('id').last()
+        self.assertEqual(seen[-1], last)
+        self.assertEqual(EventCursor.objects.get(name='test').position, last.pk)
+        self.assertEqual(eventlog.consume('test', seen.extend), 0)
+        self.schedule(offset=4)
+        self.assertEqual(eventlog.consume('test', seen.extend), 1)
+        self.assertEqual(len(seen), 4)
+    
+    def test_failed_handler_leaves_the_cursor(self):
+        self.schedule()
+        
+        def fail(events):
+            raise RuntimeError
+        
+        with self.assertRaises(RuntimeError):
+            eventlog.consume('test', fail)
+        self.assertEqual(eventlog.get_cursor('test').position, 0)
+    
+    def test_reconcile_writes_lost_events(self):
+        edited = self.schedule()
+        unchanged = self.schedule(offset=2)
+        deleted = self.schedule(offset=3)
+        with self.captureOnCommitCallbacks(execute=False):
+            created = Schedule.objects.create(
+                employee=self.ann, client=self.acme, start_date=self.day(4), start_time=time(9),
+                end_date=self.day(4), end_time=time(17),
+            )
+            edited.notes = 'Lost edit'
+            edited.save()
+            deleted_pk = deleted.pk
+            deleted.delete()
+        self.save(unchanged)
+        since = timezone.now() - timedelta(hours=1)
+        
+        self.assertEqual(eventlog.reconcile(since, grace_seconds=0), 3)
+        
+        self.assertEqual(self.events(created.pk)[-1][0], 'created')
+        self.assertEqual(self.events(edited.pk)[-1], ('updated', 1, {'notes': 'Lost edit'}))
+        self.assertEqual(self.events(deleted_pk)[-1][0], 'deleted')
+        self.assertEqual([kind for kind, _, _ in self.events(unchanged.pk)], ['created'])
+        self.assertEqual(eventlog.reconcile(since, grace_seconds=0), 0)
+
+
+class AdminActionTests(ScheduleTestCase):
+    def setUp(self):
+        self.submitted = [self.schedule(offset=offset) for offset in (1, 2)]
+        for schedule in self.submitted:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule.submit_for_approval()
+    
+    def run_action(self, user, action):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('admin:schedules_schedule_changelist'), {
+                'action': action,
+                '_selected_action': [schedule.pk for schedule in self.submitted],
+            })
+    
+    def statuses(self):
+        return sorted(Schedule.objects.values_list('status', flat=True))
+    
+    def test_supervisor_approves_through_the_model(self):
+        User.objects.filter(pk=self.sue.pk).update(is_staff=True, is_superuser=True)
+        
+        self.run_action(User.objects.get(pk=self.sue.pk), 'approve_selected')
+        
+        self.assertEqual(self.statuses(), ['approved', 'approved'])
+        self.assertEqual(set(Schedule.objects.values_list('approved_by', flat=True)), {self.sue.pk})
+        self.assertEqual(ScheduleEvent.objects.filter(kind='transition', status='approved', actor_id=self.sue.pk).count(), 2)
+    
+    def test_supervisor_rejects_with_a_reason(self):
+        User.objects.filter(pk=self.sue.pk).update(is_staff=True, is_superuser=True)
+        
+        self.run_action(User.objects.get(pk=self.sue.pk), 'reject_selected')
+        
+        self.assertEqual(self.statuses(), ['rejected', 'rejected'])
+        self.assertEqual(set(Schedule.objects.values_list('rejection_reason', flat=True)), {'Rejected from the admin'})
+    
+    def test_superuser_who_is_not_a_supervisor_cannot_approve(self):
+        admin = User.objects.create(username='root', role='employee', is_staff=True, is_superuser=True)
+        
+        self.run_action(admin, 'approve_selected')
+        
+        self.assertEqual(self.statuses(), ['submitted', 'submitted'])
@@ -16,12 +16,31 @@ urlpatterns = [
     path('<int:pk>/approve/', views.ScheduleApproveView.as_view(), name='approve'),
     path('<int:pk>/reject/', views.ScheduleRejectView.as_view(), name='reject'),
     
+    # Recurring schedules
+    path('recurring/', views.ScheduleRecurrenceListView.as_view(), name='recurrences'),
+    path('recurring/create/', views.ScheduleRecurrenceCreateView.as_view(), name='recurrence_create'),
+    path('recurring/<int:pk>/<str:date>/', views.ScheduleOccurrenceView.as_view(), name='occurrence'),
+    
     # Views
     path('calendar/', views.ScheduleCalendarView.as_view(), name='calendar'),
+    path('calendar/quarter/', views.ScheduleCalendarOverviewView.as_view(mode='quarter'), name='calendar_quarter'),
+    path('calendar/year/', views.ScheduleCalendarOverviewView.as_view(mode='year'), name='calendar_year'),
     path('table/', views.ScheduleTableView.as_view(), name='table'),
     path('approvals/', views.ScheduleApprovalsView.as_view(), name='approvals'),
+    path('availability/', views.ScheduleAvailabilityView.as_view(), name='availability'),
     
     # HTMX endpoints
     path('calendar/month/<int:year>/<int:month>/', views.CalendarMonthView.as_view(), name='calendar_month'),
     path('table/data/', views.ScheduleTableDataView.as_view(), name='table_data'),
+    path('calendar/day/<str:date>/', views.ScheduleCalendarDayView.as_view(), name='calendar_day'),
+    
+    # Calendar feeds
+    path('feed/', views.ScheduleCalendarFeedTokenView.as_view(), name='calendar_feed_token'),
+    path('feed/<str:token>.ics', views.ScheduleCalendarFeedView.as_view(), name='calendar_feed'),
+    
+    # Delta sync
+    path('sync/', views.ScheduleSyncView.as_view(), name='sync'),
+    
+    # Real-time status updates
+    path('events/', views.ScheduleEventStreamView.as_view(), name='events'),
 ]
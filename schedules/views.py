@@ -1,18 +1,58 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
+from django.core.exceptions import ValidationError
+from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse
-from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.db.models import Count, Max, Q
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date, urlencode
+from asgiref.sync import sync_to_async
 from datetime import datetime, timedelta
 from calendar import monthrange
-from .models import Schedule
-from .forms import ScheduleForm
+import hashlib
+from accounts.mixins import AsyncLoginRequiredMixin
+from accounts.models import User
+from .models import ConcurrentUpdateError, Schedule, ScheduleRecurrence
+from .forms import AvailabilitySearchForm, ScheduleForm, ScheduleRecurrenceForm
+from .recurrence import Occurrence, occurrences_for_user, recurrences_for_user
+from . import availability, broadcast, ics, overview, search, sync
 from clients.models import Client
 
 
+def with_expected_version(schedule, request):
+    """
+    Pin ``schedule`` to the version the user was looking at, if the form sent one
+    
+    Without it the transition still cannot lose a race, but only changes made
+    after this request loaded the row are detected.
+    """
+    version = request.POST.get('version', '')
+    if version.isdigit():
+        schedule.version = int(version)
+    return schedule
+
+
+def approval_row_response(request, schedule, error=None):
+    """The schedule's approvals row plus an out-of-band refresh of the pending badge"""
+    return render(request, 'schedules/approval_response.html', {
+        'schedule': schedule,
+        'error': error,
+        'pending_count': Schedule.objects.filter(status='submitted').count(),
+    })
+
+
+def conflict_response(request, error, redirect_to):
+    """409 for HTMX callers, otherwise an error message and a redirect"""
+    if request.headers.get('HX-Request'):
+        return HttpResponse(str(error), status=409)
+    messages.error(request, str(error))
+    return redirect(redirect_to)
+
+
 class ScheduleListView(LoginRequiredMixin, ListView):
     """List view for schedules with role-based filtering"""
     model = Schedule
@@ -90,8 +130,13 @@ class ScheduleUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         return (self.request.user.is_employee and schedule.employee == self.request.user and schedule.status == 'draft') or self.request.user.is_supervisor
     
     def form_valid(self, form):
+        try:
+            response = super().form_valid(form)
+        except ConcurrentUpdateError as exc:
+            form.add_error(None, str(exc))
+            return self.form_invalid(form)
         messages.success(self.request, 'Schedule updated successfully!')
-        return super().form_valid(form)
+        return response
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -113,6 +158,12 @@ class ScheduleDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     def delete(self, request, *args, **kwargs):
         messages.success(request, 'Schedule deleted successfully!')
         return super().delete(request, *args, **kwargs)
+    
+    def form_valid(self, form):
+        # Deleting a materialized occurrence should not bring the pattern back
+        if self.object.recurrence_id:
+            self.object.recurrence.skip(self.object.start_date)
+        return super().form_valid(form)
 
 
 class ScheduleSubmitView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
@@ -125,7 +176,10 @@ class ScheduleSubmitView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     
     def post(self, request, *args, **kwargs):
         schedule = get_object_or_404(Schedule, pk=kwargs['pk'])
-        schedule.submit_for_approval()
+        try:
+            with_expected_version(schedule, request).submit_for_approval()
+        except ConcurrentUpdateError as exc:
+            return conflict_response(request, exc, reverse('schedules:detail', kwargs={'pk': schedule.pk}))
         messages.success(request, 'Schedule submitted for approval!')
         return redirect('schedules:detail', pk=schedule.pk)
 
@@ -138,8 +192,16 @@ class ScheduleApproveView(LoginRequiredMixin, UserPassesTestMixin, TemplateView)
         return self.request.user.is_supervisor
     
     def post(self, request, *args, **kwargs):
-        schedule = get_object_or_404(Schedule, pk=kwargs['pk'])
-        schedule.approve(request.user)
+        schedule = get_object_or_404(Schedule.objects.select_related('employee', 'client'), pk=kwargs['pk'])
+        try:
+            with_expected_version(schedule, request).approve(request.user)
+        except ConcurrentUpdateError as exc:
+            if request.headers.get('HX-Request'):
+                schedule.refresh_from_db()
+                return approval_row_response(request, schedule, exc)
+            return conflict_response(request, exc, reverse('schedules:approvals'))
+        if request.headers.get('HX-Request'):
+            return approval_row_response(request, schedule)
         messages.success(request, 'Schedule approved successfully!')
         return redirect('schedules:approvals')
 
@@ -152,9 +214,17 @@ class ScheduleRejectView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
         return self.request.user.is_supervisor
     
     def post(self, request, *args, **kwargs):
-        schedule = get_object_or_404(Schedule, pk=kwargs['pk'])
+        schedule = get_object_or_404(Schedule.objects.select_related('employee', 'client'), pk=kwargs['pk'])
         reason = request.POST.get('reason', '')
-        schedule.reject(request.user, reason)
+        try:
+            with_expected_version(schedule, request).reject(request.user, reason)
+        except ConcurrentUpdateError as exc:
+            if request.headers.get('HX-Request'):
+                schedule.refresh_from_db()
+                return approval_row_response(request, schedule, exc)
+            return conflict_response(request, exc, reverse('schedules:approvals'))
+        if request.headers.get('HX-Request'):
+            return approval_row_response(request, schedule)
         messages.success(request, 'Schedule rejected.')
         return redirect('schedules:approvals')
 
@@ -188,6 +258,9 @@ class ScheduleCalendarView(LoginRequiredMixin, TemplateView):
         elif self.request.user.is_client:
             schedules = schedules.filter(client__name=self.request.user.get_full_name())
         
+        # Recurring patterns are expanded only for the visible month
+        schedules = list(schedules) + occurrences_for_user(self.request.user, month_start, month_end)
+        
         # Generate calendar days
         calendar_days = self._generate_calendar_days(year, month, schedules)
         context['calendar_days'] = calendar_days
@@ -245,6 +318,64 @@ class ScheduleCalendarView(LoginRequiredMixin, TemplateView):
         return calendar_days
 
 
+class ScheduleCalendarOverviewView(LoginRequiredMixin, TemplateView):
+    """Quarter or year calendar drawn from per-day counts; days load on click"""
+    template_name = 'schedules/calendar_overview.html'
+    mode = 'year'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        
+        today = timezone.now().date()
+        year = int(self.request.GET.get('year', today.year))
+        quarter = min(max(int(self.request.GET.get('quarter', (today.month - 1) // 3 + 1)), 1), 4)
+        
+        months = overview.period_months(self.mode, year, quarter)
+        start, end = overview.period_bounds(months)
+        counts = overview.day_counts(self.request.user, start, end)
+        
+        if self.mode == 'quarter':
+            previous = {'year': year - 1, 'quarter': 4} if quarter == 1 else {'year': year, 'quarter': quarter - 1}
+            following = {'year': year + 1, 'quarter': 1} if quarter == 4 else {'year': year, 'quarter': quarter + 1}
+            context['period_name'] = f"Q{quarter} {year}"
+        else:
+            previous = {'year': year - 1}
+            following = {'year': year + 1}
+            context['period_name'] = str(year)
+        
+        context.update({
+            'mode': self.mode,
+            'months': overview.month_grids(months, counts),
+            'period_total': sum(sum(statuses.values()) for statuses in counts.values()),
+            'previous_query': urlencode(previous),
+            'next_query': urlencode(following),
+        })
+        return context
+
+
+class ScheduleCalendarDayView(LoginRequiredMixin, TemplateView):
+    """HTMX endpoint with one day's schedules for the quarter and year calendars"""
+    template_name = 'schedules/calendar_day.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        
+        day = parse_date(kwargs['date'])
+        if day is None:
+            raise Http404('Invalid date')
+        
+        schedules = list(
+            Schedule.objects.for_user(self.request.user)
+            .filter(start_date=day)
+            .select_related('employee', 'client')
+        ) + occurrences_for_user(self.request.user, day, day)
+        schedules.sort(key=lambda schedule: schedule.start_time)
+        
+        context['day'] = day
+        context['schedules'] = schedules
+        return context
+
+
 class ScheduleTableView(LoginRequiredMixin, TemplateView):
     """Table view for schedules"""
     template_name = 'schedules/table.html'
@@ -269,7 +400,12 @@ class ScheduleTableView(LoginRequiredMixin, TemplateView):
         if client_filter:
             schedules = schedules.filter(client_id=client_filter)
         
-        context['schedules'] = schedules.order_by('-created_at')
+        query = self.request.GET.get('q', '').strip()
+        if query:
+            context['schedules'] = search.search(schedules, query, user=self.request.user)
+        else:
+            context['schedules'] = schedules.order_by('-created_at')
+        context['query'] = query
         context['clients'] = Client.objects.filter(is_active=True)
         context['status_choices'] = Schedule.STATUS_CHOICES
         
@@ -287,17 +423,18 @@ class ScheduleApprovalsView(LoginRequiredMixin, UserPassesTestMixin, TemplateVie
         context = super().get_context_data(**kwargs)
         
         # Get pending schedules
-        pending_schedules = Schedule.objects.filter(
+        pending_schedules = list(Schedule.objects.filter(
             status='submitted'
-        ).select_related('employee', 'client').order_by('-submitted_at')
+        ).select_related('employee', 'client').order_by('-submitted_at'))
         
         context['pending_schedules'] = pending_schedules
+        context['pending_count'] = len(pending_schedules)
         
         return context
 
 
-class CalendarMonthView(LoginRequiredMixin, TemplateView):
-    """HTMX endpoint for calendar month data"""
+class CalendarMonthView(AsyncLoginRequiredMixin, TemplateView):
+    """HTMX endpoint for calendar month data (async)"""
     template_name = 'schedules/calendar_month.html'
     
     def get_template_names(self):
@@ -306,8 +443,8 @@ class CalendarMonthView(LoginRequiredMixin, TemplateView):
             return ['schedules/calendar_grid.html']
         return [self.template_name]
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
         
         year = kwargs['year']
         month = kwargs['month']
@@ -320,22 +457,22 @@ class CalendarMonthView(LoginRequiredMixin, TemplateView):
         month_start = datetime(year, month, 1).date()
         month_end = datetime(year, month, monthrange(year, month)[1]).date()
         
-        schedules = Schedule.objects.filter(
+        schedules = Schedule.objects.for_user(request.user).filter(
             start_date__gte=month_start,
             start_date__lte=month_end
         ).select_related('employee', 'client')
         
-        if self.request.user.is_employee:
-            schedules = schedules.filter(employee=self.request.user)
-        elif self.request.user.is_client:
-            schedules = schedules.filter(client__name=self.request.user.get_full_name())
+        # Recurring patterns are expanded only for the visible month
+        rows = await sync_to_async(list)(schedules)
+        occurrences = await sync_to_async(occurrences_for_user)(request.user, month_start, month_end)
+        schedules = rows + occurrences
         
         context['schedules'] = schedules
         
         # Generate calendar days
         context['calendar_days'] = self._generate_calendar_days(year, month, schedules)
         
-        return context
+        return self.render_to_response(context)
     
     def _generate_calendar_days(self, year, month, schedules):
         """Generate calendar days for the month view"""
@@ -377,30 +514,267 @@ class CalendarMonthView(LoginRequiredMixin, TemplateView):
         return calendar_days
 
 
-class ScheduleTableDataView(LoginRequiredMixin, TemplateView):
-    """HTMX endpoint for table data"""
+class ScheduleTableDataView(AsyncLoginRequiredMixin, TemplateView):
+    """HTMX endpoint for table data (async)"""
     template_name = 'schedules/table_data.html'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
         
         # Get schedules with filtering
-        schedules = Schedule.objects.select_related('employee', 'client', 'approved_by')
-        
-        if self.request.user.is_employee:
-            schedules = schedules.filter(employee=self.request.user)
-        elif self.request.user.is_client:
-            schedules = schedules.filter(client__name=self.request.user.get_full_name())
+        schedules = Schedule.objects.for_user(request.user).select_related('employee', 'client', 'approved_by')
         
         # Apply filters
-        status_filter = self.request.GET.get('status')
+        status_filter = request.GET.get('status')
         if status_filter:
             schedules = schedules.filter(status=status_filter)
         
-        client_filter = self.request.GET.get('client')
+        client_filter = request.GET.get('client')
         if client_filter:
             schedules = schedules.filter(client_id=client_filter)
         
-        context['schedules'] = schedules.order_by('-created_at')
+        query = request.GET.get('q', '').strip()
+        if query:
+            context['schedules'] = await sync_to_async(search.search)(schedules, query, user=request.user)
+        else:
+            context['schedules'] = await sync_to_async(list)(schedules.order_by('-created_at'))
+        context['query'] = query
         
-        return context
\ No newline at end of file
+        return self.render_to_response(context)
+
+
+class ScheduleCalendarFeedView(View):
+    """Tokenized, read-only ICS feed of the schedules visible to the token owner"""
+    
+    def get(self, request, *args, **kwargs):
+        try:
+            user = User.objects.get(calendar_token=kwargs['token'], is_active=True)
+        except User.DoesNotExist:
+            raise Http404('Unknown calendar feed')
+        
+        schedules = Schedule.objects.for_user(user)
+        
+        # Optional "since" window so calendar clients only pull recent changes
+        since = request.GET.get('since')
+        if since:
+            since_value = parse_datetime(since)
+            if since_value is None:
+                since_date = parse_date(since)
+                if since_date is None:
+                    return HttpResponseBadRequest('Invalid "since" value, expected ISO date or datetime')
+                since_value = datetime.combine(since_date, datetime.min.time())
+            if timezone.is_naive(since_value):
+                since_value = timezone.make_aware(since_value)
+            schedules = schedules.filter(updated_at__gte=since_value)
+        
+        # One aggregate drives both validators; the count catches deletions
+        state = schedules.order_by().aggregate(last_modified=Max('updated_at'), total=Count('id'))
+        last_modified = state['last_modified']
+        etag = '"%s"' % hashlib.md5(
+            f"{user.pk}:{user.calendar_token}:{last_modified}:{state['total']}:{since}".encode()
+        ).hexdigest()
+        last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+        
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+        if not_modified is not None:
+            return not_modified
+        
+        rows = (
+            schedules.order_by('start_date', 'start_time', 'id')
+            .values_list(*ics.FEED_FIELDS)
+            .iterator(chunk_size=2000)
+        )
+        response = StreamingHttpResponse(
+            ics.iter_calendar(rows, f"Schedules - {user.get_full_name()}", request.get_host().split(':')[0]),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'inline; filename="schedules.ics"'
+        response['Cache-Control'] = 'private, no-cache'
+        response['ETag'] = etag
+        if last_modified_ts is not None:
+            response['Last-Modified'] = http_date(last_modified_ts)
+        return response
+
+
+class ScheduleCalendarFeedTokenView(LoginRequiredMixin, View):
+    """Return the current user's ICS feed URL; POST rotates the token"""
+    
+    def get(self, request, *args, **kwargs):
+        return self._feed_response(request, request.user.get_calendar_token())
+    
+    def post(self, request, *args, **kwargs):
+        return self._feed_response(request, request.user.rotate_calendar_token())
+    
+    def _feed_response(self, request, token):
+        url = request.build_absolute_uri(reverse('schedules:calendar_feed', kwargs={'token': token}))
+        return JsonResponse({'feed_url': url})
+
+
+class ScheduleSyncView(LoginRequiredMixin, View):
+    """Delta-sync endpoint returning schedules changed or deleted since a sync token"""
+    
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.GET.get('limit', sync.DEFAULT_PAGE_SIZE))
+            payload = sync.changes_since(request.user, request.GET.get('token'), limit)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid limit'}, status=400)
+        except sync.InvalidSyncToken as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        return JsonResponse(payload)
+
+
+class ScheduleEventStreamView(View):
+    """Server-Sent Events stream of schedule status changes (serve under ASGI)"""
+    
+    async def get(self, request, *args, **kwargs):
+        channels = await sync_to_async(self._get_channels)(request)
+        if channels is None:
+            return HttpResponse('Authentication required', status=401)
+        
+        # Sent by EventSource when it reconnects: the last event it received
+        try:
+            last_event_id = int(request.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            last_event_id = None
+        
+        response = StreamingHttpResponse(
+            broadcast.iter_events(channels, last_event_id),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Stop reverse proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    def _get_channels(self, request):
+        if not request.user.is_authenticated:
+            return None
+        return broadcast.channels_for_user(request.user)
+
+
+class ScheduleAvailabilityView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Find employees free for a client time window (supervisors only)"""
+    template_name = 'schedules/availability.html'
+    
+    def test_func(self):
+        return self.request.user.is_supervisor
+    
+    def get_template_names(self):
+        """Return only the results for HTMX searches"""
+        if self.request.headers.get('HX-Request'):
+            return ['schedules/availability_results.html']
+        return [self.template_name]
+    
+    def get(self, request, *args, **kwargs):
+        form = AvailabilitySearchForm(request.GET or None)
+        results = None
+        if form.is_valid():
+            results = availability.find_available_employees(**form.cleaned_data)
+        
+        if request.GET.get('format') == 'json':
+            if not form.is_valid():
+                return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+            return JsonResponse({'employees': [
+                {
+                    'id': result['employee'].pk,
+                    'name': result['employee'].get_full_name(),
+                    'email': result['employee'].email,
+                    'booked_hours': result['booked_hours'],
+                    'client_visits': result['client_visits'],
+                }
+                for result in results
+            ]})
+        
+        return self.render_to_response(self.get_context_data(form=form, results=results))
+
+
+class ScheduleRecurrenceListView(LoginRequiredMixin, ListView):
+    """List recurring schedule patterns visible to the user"""
+    template_name = 'schedules/recurrence_list.html'
+    context_object_name = 'recurrences'
+    paginate_by = 20
+    
+    def get_queryset(self):
+        return recurrences_for_user(self.request.user).order_by('-created_at')
+
+
+class ScheduleRecurrenceCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
+    """Create a recurring weekly schedule pattern (employees only)"""
+    model = ScheduleRecurrence
+    form_class = ScheduleRecurrenceForm
+    template_name = 'schedules/recurrence_form.html'
+    success_url = reverse_lazy('schedules:recurrences')
+    
+    def test_func(self):
+        return self.request.user.is_employee
+    
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+    
+    def form_valid(self, form):
+        form.instance.employee = self.request.user
+        messages.success(self.request, 'Recurring schedule created successfully!')
+        return super().form_valid(form)
+
+
+class ScheduleOccurrenceView(LoginRequiredMixin, TemplateView):
+    """Show one occurrence of a recurrence; POST edits, submits or skips it"""
+    template_name = 'schedules/occurrence.html'
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        self.recurrence = get_object_or_404(recurrences_for_user(request.user), pk=kwargs['pk'])
+        self.day = parse_date(kwargs['date'])
+        if self.day is None or not self.recurrence.occurs_on(self.day):
+            raise Http404('No occurrence on this date')
+        
+        # Once materialized, the real schedule takes over
+        existing = self.recurrence.occurrences.filter(recurrence_date=self.day).first()
+        if existing:
+            return redirect(existing)
+        # Past occurrences are not shown and could not be materialized
+        if self.day < timezone.now().date():
+            raise Http404('No occurrence on this date')
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['occurrence'] = Occurrence(self.recurrence, self.day)
+        context['can_manage'] = self._can_manage()
+        return context
+    
+    def post(self, request, *args, **kwargs):
+        action = request.POST.get('action')
+        if not self._can_manage() or (action == 'submit' and not request.user.is_employee):
+            messages.error(request, 'You cannot change this recurring schedule.')
+            return redirect('schedules:calendar')
+        
+        if action == 'skip':
+            self.recurrence.skip(self.day)
+            messages.success(request, 'Occurrence skipped.')
+            return redirect('schedules:calendar')
+        if action not in ('edit', 'submit'):
+            return HttpResponseBadRequest('Unknown action')
+        
+        try:
+            schedule = self.recurrence.materialize(self.day)
+        except ValidationError as exc:
+            messages.error(request, ' '.join(exc.messages))
+            return redirect('schedules:calendar')
+        
+        if action == 'edit':
+            return redirect('schedules:update', pk=schedule.pk)
+        try:
+            schedule.submit_for_approval()
+        except ConcurrentUpdateError as exc:
+            return conflict_response(request, exc, schedule.get_absolute_url())
+        messages.success(request, 'Schedule submitted for approval!')
+        return redirect(schedule)
+    
+    def _can_manage(self):
+        user = self.request.user
+        return user.is_supervisor or (user.is_employee and self.recurrence.employee_id == user.pk)